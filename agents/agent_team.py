@@ -3,12 +3,23 @@ from agno.models.openai import OpenAIChat
 from agno.tools.reasoning import ReasoningTools
 from config import (
     OPENROUTER_API_KEY, OPENROUTER_BASE_URL, OPENROUTER_MODEL,
-    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL
+    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL,
+    AGENT_TEAM_MAX_WORKERS, SEMANTIC_CACHE_ENABLED, LEXICAL_INDEX_ENABLED
 )
 from agents.personalization import PersonalizedSmartSearch
 from agents.jira_integration import AgentTaskManager
-from agents.serper_client import SerperAPIClient
+from agents.serper_client import SerperAPIClient, get_serper_cache
 from agents.api_failover import api_failover
+from agents.llm_engine import LLMExecutionEngine, LLMProvider, get_llm_cache
+from agents.rate_limiter import get_rate_limiter
+from agents.semantic_cache import get_semantic_cache
+from agents.query_complexity import get_query_classifier
+from agents.intent_router import get_intent_router
+from agents.evidence import EvidenceContext
+from agents.stage_scheduler import Stage, StageScheduler, StageError
+from agents.streaming import token_event, forward_tokens, trailing_events
+from knowledge.lexical_index import get_lexical_index
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 # Set up logging
@@ -39,11 +50,23 @@ class AgentTeam:
                 "Manage agent workflows and task delegation"
             ]
         )
+        self.engine = LLMExecutionEngine([LLMProvider("openrouter", self.coordinator)])
         
         # Initialize specialized agents
         self.search_agent = PersonalizedSmartSearch()
         self.task_manager = AgentTaskManager()
         self.serper_client = SerperAPIClient() if api_failover.get_available_apis("search") else None
+        self.lexical_index = get_lexical_index() if LEXICAL_INDEX_ENABLED else None
+        
+        # Serve verified answers to near-duplicate queries without running the pipeline
+        self.semantic_cache = get_semantic_cache() if SEMANTIC_CACHE_ENABLED else None
+        
+        # Route query intent locally instead of spending a coordinator call on every search
+        self.intent_router = get_intent_router()
+        
+        # Run independent pipeline stages concurrently
+        self.executor = ThreadPoolExecutor(max_workers=AGENT_TEAM_MAX_WORKERS, thread_name_prefix="agent-team")
+        self.scheduler = StageScheduler(self.executor)
         
         # Track team activities
         self.activities = []
@@ -58,121 +81,195 @@ class AgentTeam:
         """
         Analyze query intent to determine which agents to use.
         
+        The local intent router answers in microseconds; the coordinator LLM is
+        only consulted when the router is unsure.
+        
         Args:
             query (str): Search query
             user_id (str): User identifier
-            
+        
+        Returns:
+            dict: Intent analysis results (query_type, complexity, required_agents,
+                search_strategy, confidence_threshold, confidence, source)
+        """
+        return self.intent_router.route(query, user_id, llm=self.engine.run).to_dict()
+    
+    def _fetch_secondary_context(self, evidence: EvidenceContext):
+        """
+        Fetch secondary Serper context for synthesis, preferring the local lexical index.
+        
+        Args:
+            evidence (EvidenceContext): Request-scoped evidence
+        
+        Returns:
+            list: Secondary context entries (empty when Serper is unavailable)
+        """
+        serper_results = None
+        if self.lexical_index is not None:
+            try:
+                serper_results = self.lexical_index.lookup_serper(evidence.query, 5)
+            except Exception as e:
+                logger.warning(f"Local index lookup failed: {str(e)}")
+        
+        if serper_results is not None:
+            logger.info("Using additional context from the local index")
+            evidence.seed_serper_organic(serper_results)
+        elif not self.serper_client:
+            return []
+        else:
+            logger.info("Fetching additional context from Serper")
+            serper_results = evidence.serper_organic(num_results=5)
+        return [{
+            "source": "serper",
+            "results": serper_results,
+            "timestamp": __import__('datetime').datetime.now().isoformat()
+        }]
+    
+    def _synthesize(self, query: str, primary, secondary: list):
+        """
+        Synthesize primary results with secondary context.
+        
+        Args:
+            query (str): Search query
+            primary: Primary search result
+            secondary (list): Secondary context entries
+        
         Returns:
-            dict: Intent analysis results
+            str: Synthesized answer, or None when there is no secondary context
         """
-        intent_prompt = f"""
-        Analyze this search query and determine the best approach:
+        if not secondary:
+            return None
+        
+        synthesis_prompt = f"""
+        Synthesize these search results:
+        
+        Primary Results:
+        {self._extract_content(primary)}
+        
+        Secondary Context:
+        {secondary}
         
         Query: {query}
-        User ID: {user_id}
-        
-        Consider:
-        1. Query type (factual, opinion, creative, technical, etc.)
-        2. Required search depth
-        3. Need for personalization
-        4. Specialized tools needed
-        5. Confidence requirements
-        
-        Return a JSON object with:
-        - query_type: category of the query
-        - complexity: simple/medium/complex
-        - required_agents: list of agents needed
-        - search_strategy: approach to take
-        - confidence_threshold: minimum acceptable confidence
+        
+        Provide a comprehensive answer that combines all information
+        while maintaining accuracy and citing sources.
         """
         
         try:
-            analysis = self.coordinator.run(intent_prompt)
-            return analysis
+            synthesis = self.engine.run(synthesis_prompt)
+            return self._extract_content(synthesis)
         except Exception as e:
-            logger.warning(f"Intent analysis failed: {str(e)}")
-            # Default analysis
-            return {
-                "query_type": "general",
-                "complexity": "medium",
-                "required_agents": ["search"],
-                "search_strategy": "comprehensive",
-                "confidence_threshold": 70
-            }
+            logger.warning(f"Result synthesis failed: {str(e)}")
+            return self._extract_content(primary)
     
-    def _coordinate_agents(self, query: str, user_id: str = "default", intent_analysis: dict = None):
+    def _build_search_stages(self, query: str, user_id: str, evidence: EvidenceContext,
+                             include_intent: bool = True, include_jira: bool = True):
+        """
+        Declare the search pipeline as a DAG of stages.
+        
+        Jira bookkeeping, intent analysis, the primary search and Serper retrieval
+        have no dependencies on each other and run concurrently. Synthesis waits for
+        the primary and secondary results, and for intent analysis so the coordinator
+        agent is never run twice at once.
+        
+        Args:
+            query (str): Search query
+            user_id (str): User identifier
+            evidence (EvidenceContext): Request-scoped evidence shared by every stage
+            include_intent (bool): Whether to run intent analysis as a stage
+            include_jira (bool): Whether to create the Jira task as a stage
+        
+        Returns:
+            list: Stages for the scheduler
+        """
+        stages = [
+            Stage(
+                name="primary",
+                func=lambda: self.search_agent.search(query, user_id, evidence=evidence)
+            ),
+            Stage(
+                name="serper",
+                func=lambda: self._fetch_secondary_context(evidence),
+                outputs=("secondary",),
+                required=False,
+                default=[]
+            ),
+            Stage(
+                name="synthesis",
+                func=lambda primary, secondary, intent_analysis: self._synthesize(query, primary, secondary),
+                inputs=("primary", "secondary", "intent_analysis"),
+                required=False
+            )
+        ]
+        
+        if include_intent:
+            stages.append(Stage(
+                name="intent",
+                func=lambda: self._analyze_query_intent(query, user_id),
+                outputs=("intent_analysis",),
+                required=False
+            ))
+        
+        if include_jira:
+            stages.append(Stage(
+                name="jira_task",
+                func=lambda: self.task_manager.create_search_task(query, user_id),
+                outputs=("jira_task",),
+                required=False
+            ))
+        
+        return stages
+    
+    def _coordinate_agents(self, query: str, user_id: str = "default", intent_analysis: dict = None,
+                           evidence: EvidenceContext = None, include_jira: bool = False):
         """
         Coordinate multiple agents to handle the query.
         
+        Independent stages run concurrently, so latency follows the critical path
+        (normally the primary search followed by synthesis).
+        
         Args:
             query (str): Search query
             user_id (str): User identifier
-            intent_analysis (dict): Results from intent analysis
-            
+            intent_analysis (dict): Results from intent analysis; analysed concurrently when omitted
+            evidence (EvidenceContext): Request-scoped evidence shared by every stage
+            include_jira (bool): Whether to create the Jira task concurrently
+        
         Returns:
             dict: Coordinated results
         """
-        results = {
-            "primary": None,
-            "secondary": [],
-            "synthesis": None,
-            "confidence": 0
-        }
+        if evidence is None:
+            evidence = EvidenceContext(query, user_id, serper_client=self.serper_client)
+        
+        initial = {}
+        if intent_analysis is not None:
+            initial["intent_analysis"] = intent_analysis
+        
+        stages = self._build_search_stages(
+            query, user_id, evidence,
+            include_intent=intent_analysis is None,
+            include_jira=include_jira
+        )
         
         try:
-            # Execute primary search
-            logger.info("Executing primary search")
-            primary_result = self.search_agent.search(query, user_id)
-            results["primary"] = primary_result
-            results["confidence"] = primary_result.get("confidence", 0)
-            
-            # Get additional context from Serper if available
-            if self.serper_client and intent_analysis:
-                try:
-                    logger.info("Fetching additional context from Serper")
-                    serper_results = self.serper_client.get_organic_search_results(
-                        query, 
-                        num_results=5
-                    )
-                    
-                    # Add Serper context to results
-                    results["secondary"].append({
-                        "source": "serper",
-                        "results": serper_results,
-                        "timestamp": __import__('datetime').datetime.now().isoformat()
-                    })
-                except Exception as e:
-                    logger.warning(f"Serper context fetching failed: {str(e)}")
-            
-            # Synthesize results if needed
-            if results["secondary"]:
-                synthesis_prompt = f"""
-                Synthesize these search results:
-                
-                Primary Results:
-                {self._extract_content(results['primary'])}
-                
-                Secondary Context:
-                {results['secondary']}
-                
-                Query: {query}
-                
-                Provide a comprehensive answer that combines all information
-                while maintaining accuracy and citing sources.
-                """
-                
-                try:
-                    synthesis = self.coordinator.run(synthesis_prompt)
-                    results["synthesis"] = self._extract_content(synthesis)
-                except Exception as e:
-                    logger.warning(f"Result synthesis failed: {str(e)}")
-                    results["synthesis"] = self._extract_content(results['primary'])
-            
-            return results
-            
-        except Exception as e:
+            stage_results = self.scheduler.run(stages, initial)
+        except StageError as e:
             logger.error(f"Agent coordination failed: {str(e)}")
-            raise Exception(f"Agent coordination failed: {str(e)}")
+            raise Exception(f"Agent coordination failed: {str(e.error)}") from e
+        
+        outputs = stage_results.outputs
+        primary_result = outputs["primary"]
+        logger.info(f"Intent analysis: {outputs.get('intent_analysis')}")
+        
+        return {
+            "primary": primary_result,
+            "secondary": outputs.get("secondary") or [],
+            "synthesis": outputs.get("synthesis"),
+            "confidence": primary_result.get("confidence", 0) if isinstance(primary_result, dict) else 0,
+            "intent_analysis": outputs.get("intent_analysis"),
+            "jira_task": outputs.get("jira_task"),
+            "timings": stage_results.timings
+        }
     
     def search(self, query: str, user_id: str = "default"):
         """
@@ -181,30 +278,26 @@ class AgentTeam:
         Args:
             query (str): Search query
             user_id (str): User identifier
-            
+        
         Returns:
             dict: Final search results
         """
         # Log activity
-        activity = {
-            "type": "search",
-            "query": query,
-            "user_id": user_id,
-            "timestamp": __import__('datetime').datetime.now().isoformat()
-        }
-        self.activities.append(activity)
+        self._log_activity(query, user_id)
+        
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.lookup(query, scope=user_id)
+            if cached is not None:
+                logger.info(f"Semantic cache hit for '{query}': {cached['semantic_cache']}")
+                return cached
         
-        # Create Jira task for the search
-        jira_task = self.task_manager.create_search_task(query, user_id)
-        task_key = jira_task.get("key") if jira_task else None
+        # External evidence is fetched once and shared by every stage of this request
+        evidence = EvidenceContext(query, user_id, serper_client=self.serper_client)
         
         try:
-            # Analyze query intent
-            intent_analysis = self._analyze_query_intent(query, user_id)
-            logger.info(f"Intent analysis: {intent_analysis}")
-            
-            # Coordinate agents
-            coordinated_results = self._coordinate_agents(query, user_id, intent_analysis)
+            # Jira task creation, intent analysis, primary search and Serper run concurrently
+            coordinated_results = self._coordinate_agents(query, user_id, evidence=evidence, include_jira=True)
+            task_key = self._task_key(coordinated_results["jira_task"])
             
             # Prepare final results
             if coordinated_results["synthesis"]:
@@ -227,41 +320,139 @@ class AgentTeam:
                     "task_key": task_key
                 }
             
-            # Update Jira task with results
-            if task_key:
-                self.task_manager.update_task_with_results(task_key, result_dict)
-            
-            # Log successful activity
-            self.task_manager.log_agent_activity(
-                "Successful coordinated search",
-                {
-                    "query": query,
-                    "user_id": user_id,
-                    "confidence": result_dict.get("confidence", 0),
-                    "task_key": task_key
-                }
-            )
-            
+            self._record_success(query, user_id, result_dict, task_key)
             return result_dict
-            
+        
         except Exception as e:
-            # Log failed activity
-            self.task_manager.log_agent_activity(
-                "Failed coordinated search",
-                {
-                    "query": query,
-                    "user_id": user_id,
-                    "error": str(e)
-                }
+            # A Jira task created before a required stage failed still records the search
+            partial = e.__cause__.results.outputs if isinstance(e.__cause__, StageError) else {}
+            return self._record_failure(query, user_id, e, self._task_key(partial.get("jira_task")))
+    
+    def _task_key(self, jira_task: dict) -> str:
+        """Issue key of a created task; queued tasks carry a local outbox reference until Jira assigns one."""
+        return (jira_task.get("key") or jira_task.get("ref")) if jira_task else None
+    
+    def _record_success(self, query: str, user_id: str, result_dict: dict, task_key: str = None,
+                        cache: bool = True):
+        """Update the Jira task, log the activity and, if cache is set, cache the answer of a completed search."""
+        # Update Jira task with results
+        if task_key:
+            self.task_manager.update_task_with_results(task_key, result_dict)
+        
+        # Log successful activity
+        self.task_manager.log_agent_activity(
+            "Successful coordinated search",
+            {
+                "query": query,
+                "user_id": user_id,
+                "confidence": result_dict.get("confidence", 0),
+                "task_key": task_key
+            }
+        )
+        
+        if cache and self.semantic_cache is not None and not result_dict.get("error"):
+            # The Jira task belongs to this request, not to later cache hits
+            self.semantic_cache.store(
+                query,
+                {key: value for key, value in result_dict.items() if key != "task_key"},
+                scope=user_id
             )
-            
-            # Return fallback result
-            return {
-                "results": f"Search failed: {str(e)}",
-                "verification": "Error occurred during search",
-                "confidence": 0,
-                "error": True
+    
+    def _record_failure(self, query: str, user_id: str, error: Exception, task_key: str = None) -> dict:
+        """Log a failed search, update its Jira task if one was created, and build its fallback result."""
+        result_dict = {
+            "results": f"Search failed: {str(error)}",
+            "verification": "Error occurred during search",
+            "confidence": 0,
+            "error": True
+        }
+        if task_key:
+            result_dict["task_key"] = task_key
+            self.task_manager.update_task_with_results(task_key, result_dict)
+        
+        # Log failed activity
+        self.task_manager.log_agent_activity(
+            "Failed coordinated search",
+            {
+                "query": query,
+                "user_id": user_id,
+                "error": str(error),
+                "task_key": task_key
             }
+        )
+        
+        # Return fallback result
+        return result_dict
+    
+    def _log_activity(self, query: str, user_id: str):
+        """Record a search in the team activity log."""
+        self.activities.append({
+            "type": "search",
+            "query": query,
+            "user_id": user_id,
+            "timestamp": __import__('datetime').datetime.now().isoformat()
+        })
+    
+    def search_stream(self, query: str, user_id: str = "default"):
+        """
+        Execute a coordinated search, streaming the answer as it is generated.
+        
+        Jira task creation and intent analysis run in the background while the
+        primary search streams its final LLM call. Synthesis is skipped: it could
+        only start once the primary answer is complete, and the primary prompt
+        already carries the request's shared Serper evidence.
+        
+        Args:
+            query (str): Search query
+            user_id (str): User identifier
+        
+        Yields:
+            dict: Token events, then the verification and result events; an error
+                event precedes them when the search fails
+        """
+        self._log_activity(query, user_id)
+        
+        if self.semantic_cache is not None:
+            cached = self.semantic_cache.lookup(query, scope=user_id)
+            if cached is not None:
+                logger.info(f"Semantic cache hit for '{query}': {cached['semantic_cache']}")
+                yield token_event(cached.get("results", ""))
+                yield from trailing_events(cached)
+                return
+        
+        evidence = EvidenceContext(query, user_id, serper_client=self.serper_client)
+        jira_future = self.executor.submit(self.task_manager.create_search_task, query, user_id)
+        intent_future = self.executor.submit(self._analyze_query_intent, query, user_id)
+        
+        try:
+            result_dict = yield from forward_tokens(self.search_agent.search_stream(query, user_id, evidence=evidence))
+        except Exception as e:
+            logger.error(f"Streaming search failed: {str(e)}")
+            yield {"event": "error", "error": str(e)}
+            yield from trailing_events(self._record_failure(query, user_id, e, self._await_task_key(jira_future)))
+            return
+        
+        try:
+            logger.info(f"Intent analysis: {intent_future.result()}")
+        except Exception as e:
+            logger.warning(f"Intent analysis failed: {str(e)}")
+        
+        task_key = self._await_task_key(jira_future)
+        
+        result_dict = dict(result_dict)
+        if task_key:
+            result_dict["task_key"] = task_key
+        # Streamed answers skip synthesis, so they must not be served to non-streaming searches
+        self._record_success(query, user_id, result_dict, task_key, cache=False)
+        yield from trailing_events(result_dict)
+    
+    def _await_task_key(self, jira_future) -> str:
+        """Wait for a background Jira task creation and return its key, or None if it failed."""
+        try:
+            return self._task_key(jira_future.result())
+        except Exception as e:
+            logger.warning(f"Jira task creation failed: {str(e)}")
+            return None
     
     def get_team_status(self):
         """
@@ -279,8 +470,16 @@ class AgentTeam:
         return {
             "team_members": ["coordinator", "search_agent", "task_manager"],
             "available_apis": available_apis,
+            "api_health": api_failover.get_health(),
+            "rate_limits": get_rate_limiter().stats(),
+            "llm_cache": get_llm_cache().stats(),
+            "semantic_cache": self.semantic_cache.stats() if self.semantic_cache else None,
+            "reasoning": get_query_classifier().stats(),
+            "intent_router": self.intent_router.stats(),
             "activities_count": len(self.activities),
-            "jira_integration": self.task_manager.jira is not None
+            "jira_integration": self.task_manager.jira is not None,
+            "jira_outbox": self.task_manager.outbox.stats() if self.task_manager.outbox else None,
+            "serper_cache": get_serper_cache().stats()
         }
 
 # Example usage
@@ -1,15 +1,188 @@
+import random
+import threading
 import time
 import logging
-from typing import Callable, Any, List
+from dataclasses import dataclass
+from typing import Callable, Any, List, Optional
 from config import (
-    OPENROUTER_API_KEY, OPENAI_API_KEY,
-    SERPER_API_KEY, COHERE_API_KEY
+    OPENROUTER_API_KEYS, OPENAI_API_KEYS,
+    SERPER_API_KEYS, COHERE_API_KEYS,
+    FAILOVER_EWMA_ALPHA, FAILOVER_MAX_FAILURES, FAILOVER_BASE_COOLDOWN,
+    FAILOVER_MAX_COOLDOWN, FAILOVER_COOLDOWN_JITTER, FAILOVER_PROBE_TIMEOUT,
+    FAILOVER_ERROR_HALF_LIFE, FAILOVER_EXPLORATION_RATE,
+    KEY_SELECTION_STRATEGY, KEY_RATE_LIMIT_COOLDOWN, KEY_RATE_LIMITS
 )
+from agents.rate_limiter import TokenBucket
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@dataclass
+class ProviderHealth:
+    """Health of one API: EWMA latency and error rate plus circuit breaker state."""
+    
+    latency: Optional[float] = None
+    error_rate: float = 0.0
+    error_updated: float = 0.0
+    state: str = "closed"
+    open_until: float = 0.0
+    probe_started: Optional[float] = None
+    consecutive_failures: int = 0
+    trips: int = 0
+    successes: int = 0
+    failures: int = 0
+    
+    def observe_latency(self, latency: float, alpha: float):
+        self.latency = latency if self.latency is None else alpha * latency + (1 - alpha) * self.latency
+    
+    def current_error_rate(self, now: float, half_life: float) -> float:
+        """
+        Error rate decayed by the time since the last outcome.
+        
+        A provider that stops getting traffic after a failure would otherwise
+        keep its error rate forever and never be routed to again.
+        """
+        if half_life <= 0 or self.error_rate == 0:
+            return self.error_rate
+        return self.error_rate * 0.5 ** (max(0.0, now - self.error_updated) / half_life)
+    
+    def observe_outcome(self, failed: bool, alpha: float, now: float, half_life: float):
+        error_rate = self.current_error_rate(now, half_life)
+        self.error_rate = alpha * float(failed) + (1 - alpha) * error_rate
+        self.error_updated = now
+    
+    def expected_completion(self, default_latency: float, now: float = None, half_life: float = 0.0) -> float:
+        """
+        Expected seconds until a good answer: the latency, inflated by the
+        retries an erroring provider costs (geometric in the error rate).
+        """
+        latency = self.latency if self.latency is not None else default_latency
+        error_rate = self.current_error_rate(now, half_life) if now is not None else self.error_rate
+        return latency / max(1.0 - error_rate, 0.05)
+    
+    def to_dict(self, now: float, half_life: float = 0.0) -> dict:
+        return {
+            "state": self.state,
+            "latency": round(self.latency, 4) if self.latency is not None else None,
+            "error_rate": round(self.current_error_rate(now, half_life), 4),
+            "expected_completion": round(self.expected_completion(self.latency or 0.0, now, half_life), 4),
+            "cooldown_remaining": round(max(0.0, self.open_until - now), 1) if self.state == "open" else 0.0,
+            "successes": self.successes,
+            "failures": self.failures
+        }
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Check whether an error is an upstream 429 / rate limit response.
+    
+    Args:
+        error (Exception): Error raised by an API call
+    
+    Returns:
+        bool: True for rate limit errors
+    """
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    text = str(error).lower()
+    return "429" in text or "rate limit" in text or "too many requests" in text
+
+def retry_after(source: Any) -> Optional[float]:
+    """Retry-After seconds from an HTTP response, or from an error carrying one."""
+    response = getattr(source, "response", None) or source
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+class KeyPool:
+    """
+    Pool of API keys for one provider.
+    
+    Keys are handed out round-robin or least-loaded (fewest calls in flight).
+    Each key has its own token bucket, and a key that answers 429 is parked
+    for its Retry-After (or the configured cooldown) so traffic spills to the
+    other keys of the same provider.
+    """
+    
+    def __init__(self, keys: List[str], rate: float = 0.0, strategy: str = KEY_SELECTION_STRATEGY,
+                 cooldown: float = KEY_RATE_LIMIT_COOLDOWN):
+        if strategy not in ("round_robin", "least_loaded"):
+            raise ValueError(f"Unknown key selection strategy: {strategy}")
+        self.keys = list(keys)
+        self.strategy = strategy
+        self.cooldown = cooldown
+        self.buckets = {key: TokenBucket(rate) for key in self.keys}
+        self.in_flight = {key: 0 for key in self.keys}
+        self.parked_until = {key: 0.0 for key in self.keys}
+        self.rate_limited = 0
+        self._next = 0
+        self._lock = threading.Lock()
+    
+    def _candidates(self, exclude) -> List[str]:
+        """Unparked keys not in exclude, in selection order. Caller holds the lock."""
+        now = time.time()
+        start = self._next % len(self.keys)
+        rotation = self.keys[start:] + self.keys[:start]
+        keys = [key for key in rotation if key not in exclude and self.parked_until[key] <= now]
+        if self.strategy == "least_loaded":
+            keys.sort(key=lambda key: self.in_flight[key])
+        return keys
+    
+    def acquire(self, exclude=(), timeout: float = 0.0) -> Optional[str]:
+        """
+        Take a key with a free token, waiting up to timeout for one to refill.
+        
+        Args:
+            exclude: Keys not to hand out, e.g. ones already rate limited for this call
+            timeout (float): Seconds to wait for a token
+        
+        Returns:
+            Optional[str]: Key to use, or None if none is available in time
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self.keys:
+                    return None
+                candidates = self._candidates(exclude)
+                for key in candidates:
+                    if self.buckets[key].try_acquire():
+                        self.in_flight[key] += 1
+                        self._next = self.keys.index(key) + 1
+                        return key
+                waits = [self.buckets[key].wait_time() for key in candidates]
+            
+            if not waits or time.monotonic() + min(waits) > deadline:
+                return None
+            time.sleep(min(waits))
+    
+    def release(self, key: str):
+        """Mark a call made with key as finished."""
+        with self._lock:
+            if key in self.in_flight:
+                self.in_flight[key] = max(0, self.in_flight[key] - 1)
+    
+    def park(self, key: str, seconds: float = None):
+        """Take a rate limited key out of rotation."""
+        with self._lock:
+            if key in self.parked_until:
+                self.parked_until[key] = time.time() + (seconds if seconds is not None else self.cooldown)
+                self.rate_limited += 1
+    
+    def stats(self) -> dict:
+        """Pool counters; key values are never exposed."""
+        now = time.time()
+        with self._lock:
+            return {
+                "keys": len(self.keys),
+                "parked": sum(1 for until in self.parked_until.values() if until > now),
+                "in_flight": sum(self.in_flight.values()),
+                "rate_limited": self.rate_limited
+            }
+
 class APIFailover:
     """Handle API failover and key rotation for robust API infrastructure."""
     
@@ -19,130 +192,317 @@ class APIFailover:
             "llm": [
                 {
                     "name": "openrouter",
-                    "key": OPENROUTER_API_KEY,
-                    "available": bool(OPENROUTER_API_KEY),
+                    "key": OPENROUTER_API_KEYS[0] if OPENROUTER_API_KEYS else None,
+                    "keys": OPENROUTER_API_KEYS,
+                    "available": bool(OPENROUTER_API_KEYS),
                     "priority": 1
                 },
                 {
                     "name": "openai",
-                    "key": OPENAI_API_KEY,
-                    "available": bool(OPENAI_API_KEY),
+                    "key": OPENAI_API_KEYS[0] if OPENAI_API_KEYS else None,
+                    "keys": OPENAI_API_KEYS,
+                    "available": bool(OPENAI_API_KEYS),
                     "priority": 2
                 }
             ],
             "search": [
                 {
                     "name": "serper",
-                    "key": SERPER_API_KEY,
-                    "available": bool(SERPER_API_KEY),
+                    "key": SERPER_API_KEYS[0] if SERPER_API_KEYS else None,
+                    "keys": SERPER_API_KEYS,
+                    "available": bool(SERPER_API_KEYS),
                     "priority": 1
                 }
             ],
             "reranker": [
                 {
                     "name": "cohere",
-                    "key": COHERE_API_KEY,
-                    "available": bool(COHERE_API_KEY),
+                    "key": COHERE_API_KEYS[0] if COHERE_API_KEYS else None,
+                    "keys": COHERE_API_KEYS,
+                    "available": bool(COHERE_API_KEYS),
                     "priority": 1
                 }
             ]
         }
         
-        # Track API failures
-        self.failure_counts = {}
-        self.cooldown_periods = {}
-        self.max_failures = 3
-        self.cooldown_duration = 300  # 5 minutes
+        # Health state per API, used for routing and the circuit breaker
+        self.health = {
+            api["name"]: ProviderHealth()
+            for apis in self.api_configs.values() for api in apis
+        }
+        self.max_failures = FAILOVER_MAX_FAILURES
+        self.cooldown_duration = FAILOVER_BASE_COOLDOWN
+        self.max_cooldown = FAILOVER_MAX_COOLDOWN
+        self.cooldown_jitter = FAILOVER_COOLDOWN_JITTER
+        self.probe_timeout = FAILOVER_PROBE_TIMEOUT
+        self.alpha = FAILOVER_EWMA_ALPHA
+        self.error_half_life = FAILOVER_ERROR_HALF_LIFE
+        self.exploration_rate = FAILOVER_EXPLORATION_RATE
+        
+        # Key pools per API, created on first use from the configured keys
+        self.key_pools = {}
+        
+        # Guards health and pool bookkeeping; re-entrant because routing reads health
+        self._lock = threading.RLock()
     
-    def get_available_apis(self, api_type: str) -> List[dict]:
+    def _find_api(self, api_name: str) -> Optional[dict]:
+        for apis in self.api_configs.values():
+            for api in apis:
+                if api["name"] == api_name:
+                    return api
+        return None
+    
+    def get_key_pool(self, api_name: str) -> KeyPool:
         """
-        Get available APIs of a specific type, sorted by priority.
+        Get the key pool of an API, creating it from its configured keys on first use.
         
         Args:
-            api_type (str): Type of API (llm, search, reranker)
+            api_name (str): Name of the API
         
         Returns:
-            List[dict]: Available APIs sorted by priority
+            KeyPool: Pool, empty if the API has no keys
+        """
+        with self._lock:
+            if api_name not in self.key_pools:
+                api = self._find_api(api_name) or {}
+                keys = api.get("keys") or ([api["key"]] if api.get("key") else [])
+                self.key_pools[api_name] = KeyPool(keys, KEY_RATE_LIMITS.get(api_name, 0.0))
+            return self.key_pools[api_name]
+    
+    def acquire_key(self, api_name: str, exclude=(), timeout: float = 0.0) -> Optional[str]:
         """
-        if api_type not in self.api_configs:
-            return []
+        Pick a key of an API for one call; release it with release_key.
         
-        available_apis = [
-            api for api in self.api_configs[api_type] 
-            if api["available"] and self._is_api_available(api["name"])
-        ]
+        Args:
+            api_name (str): Name of the API
+            exclude: Keys already tried for this call
+            timeout (float): Seconds to wait for a key's rate limit to refill
         
-        return sorted(available_apis, key=lambda x: x["priority"])
+        Returns:
+            Optional[str]: Key to use, or None if no key is available
+        """
+        return self.get_key_pool(api_name).acquire(exclude, timeout)
     
-    def _is_api_available(self, api_name: str) -> bool:
+    def release_key(self, api_name: str, key: str):
+        """Mark a call made with an acquired key as finished."""
+        self.get_key_pool(api_name).release(key)
+    
+    def report_rate_limited(self, api_name: str, key: str, retry_after: float = None):
         """
-        Check if an API is available (not in cooldown).
+        Park a key that answered 429, without counting it against the API's health.
         
         Args:
             api_name (str): Name of the API
+            key (str): Rate limited key
+            retry_after (float): Seconds from the Retry-After header, if any
+        """
+        self.get_key_pool(api_name).park(key, retry_after)
+        logger.warning(f"API {api_name} key rate limited, spilling to the next key")
+    
+    def _get_health(self, api_name: str) -> ProviderHealth:
+        with self._lock:
+            if api_name not in self.health:
+                self.health[api_name] = ProviderHealth()
+            return self.health[api_name]
+    
+    def get_available_apis(self, api_type: str) -> List[dict]:
+        """
+        Get available APIs of a specific type, best expected completion time first.
+        
+        Listing does not take a half-open API's probe slot; call claim_probe
+        right before actually sending a request to an API. Optionally, a small
+        share of calls (exploration_rate, off by default) moves a random
+        runner-up to the front, marked "explored", so providers behind the
+        leader keep getting measured.
+        
+        Args:
+            api_type (str): Type of API (llm, search, reranker)
+        
+        Returns:
+            List[dict]: Available APIs, fastest expected first, ties broken by priority
+        """
+        with self._lock:
+            if api_type not in self.api_configs:
+                return []
             
+            available_apis = [
+                api for api in self.api_configs[api_type] 
+                if api["available"] and self._is_api_available(api["name"])
+            ]
+            
+            # APIs without latency samples are assumed to be as fast as the average
+            # measured one, so they only overtake a provider that is erroring
+            measured = [self._get_health(api["name"]).latency for api in available_apis]
+            measured = [latency for latency in measured if latency is not None]
+            default_latency = sum(measured) / len(measured) if measured else 0.0
+            
+            now = time.time()
+            ranked = sorted(
+                available_apis,
+                key=lambda x: (
+                    self._get_health(x["name"]).expected_completion(default_latency, now, self.error_half_life),
+                    x["priority"]
+                )
+            )
+        
+        if len(ranked) > 1 and random.random() < self.exploration_rate:
+            explored = ranked.pop(random.randrange(1, len(ranked)))
+            ranked.insert(0, dict(explored, explored=True))
+        return ranked
+    
+    def _is_api_available(self, api_name: str, claim: bool = False) -> bool:
+        """
+        Check if an API may take traffic.
+        
+        A closed breaker always passes. An open breaker blocks until its cooldown
+        expires and then goes half-open, letting a single probe request through;
+        the probe's outcome closes or re-opens it.
+        
+        Args:
+            api_name (str): Name of the API
+            claim (bool): Take the half-open probe slot
+        
         Returns:
             bool: True if API is available
         """
-        if api_name not in self.cooldown_periods:
+        with self._lock:
+            health = self._get_health(api_name)
+            now = time.time()
+            
+            if health.state == "open":
+                if now < health.open_until:
+                    return False
+                health.state = "half_open"
+                health.probe_started = None
+                logger.info(f"API {api_name} cooldown expired, allowing a probe request")
+            
+            if health.state == "half_open":
+                # One probe at a time; a probe that never reported back is given up on
+                if health.probe_started is not None and now - health.probe_started < self.probe_timeout:
+                    return False
+                if claim:
+                    health.probe_started = now
+                return True
+            
             return True
+    
+    def claim_probe(self, api_name: str) -> bool:
+        """
+        Check an API right before sending it a request, taking the probe slot if it is half-open.
         
-        # Check if cooldown has expired
-        if time.time() > self.cooldown_periods[api_name]:
-            # Remove from cooldown
-            del self.cooldown_periods[api_name]
-            if api_name in self.failure_counts:
-                del self.failure_counts[api_name]
-            return True
+        Args:
+            api_name (str): Name of the API
         
-        return False
+        Returns:
+            bool: True if the request may be sent; False while another probe is in flight
+                or the breaker is open
+        """
+        return self._is_api_available(api_name, claim=True)
     
-    def report_failure(self, api_name: str):
+    def release_probe(self, api_name: str):
         """
-        Report an API failure and update failure tracking.
+        Give back a probe slot whose request ended without a success or failure to report.
         
         Args:
-            api_name (str): Name of the failed API
+            api_name (str): Name of the API
         """
-        if api_name not in self.failure_counts:
-            self.failure_counts[api_name] = 0
-        
-        self.failure_counts[api_name] += 1
-        logger.warning(f"API failure reported for {api_name}. Count: {self.failure_counts[api_name]}")
+        with self._lock:
+            health = self._get_health(api_name)
+            if health.state == "half_open":
+                health.probe_started = None
+    
+    def _cooldown(self, trips: int) -> float:
+        """Exponential cooldown for the given consecutive trip count, with jitter."""
+        cooldown = min(self.cooldown_duration * (2 ** (trips - 1)), self.max_cooldown)
+        return cooldown * random.uniform(1 - self.cooldown_jitter, 1 + self.cooldown_jitter)
+    
+    def report_failure(self, api_name: str, latency: float = None):
+        """
+        Report an API failure and update health tracking.
         
-        # Put API in cooldown if too many failures
-        if self.failure_counts[api_name] >= self.max_failures:
-            self.cooldown_periods[api_name] = time.time() + self.cooldown_duration
-            logger.warning(f"API {api_name} put in cooldown for {self.cooldown_duration} seconds")
+        Args:
+            api_name (str): Name of the failed API
+            latency (float): Seconds the failed call took, if known; logged only, since a
+                provider that fails fast must not look fast to routing
+        """
+        with self._lock:
+            health = self._get_health(api_name)
+            health.failures += 1
+            health.consecutive_failures += 1
+            health.observe_outcome(True, self.alpha, time.time(), self.error_half_life)
+            took = f" after {latency:.2f}s" if latency is not None else ""
+            logger.warning(f"API failure reported for {api_name}{took}. Count: {health.consecutive_failures}")
+            
+            # A failed probe re-opens the breaker; otherwise open after too many failures in a row
+            if health.state == "half_open" or health.consecutive_failures >= self.max_failures:
+                health.trips += 1
+                cooldown = self._cooldown(health.trips)
+                health.state = "open"
+                health.open_until = time.time() + cooldown
+                health.probe_started = None
+                logger.warning(f"API {api_name} put in cooldown for {cooldown:.0f} seconds")
     
-    def report_success(self, api_name: str):
+    def report_success(self, api_name: str, latency: float = None):
         """
-        Report an API success and reset failure count.
+        Report an API success, closing its breaker.
         
         Args:
             api_name (str): Name of the successful API
+            latency (float): Seconds the call took, if known
         """
-        if api_name in self.failure_counts:
-            del self.failure_counts[api_name]
-        
-        if api_name in self.cooldown_periods:
-            del self.cooldown_periods[api_name]
+        with self._lock:
+            health = self._get_health(api_name)
+            health.successes += 1
+            health.consecutive_failures = 0
+            health.observe_outcome(False, self.alpha, time.time(), self.error_half_life)
+            if latency is not None:
+                health.observe_latency(latency, self.alpha)
+            
+            if health.state != "closed":
+                logger.info(f"API {api_name} recovered, closing circuit breaker")
+            health.state = "closed"
+            health.trips = 0
+            health.probe_started = None
+            
+            logger.info(f"API success reported for {api_name}")
+    
+    def get_health(self) -> dict:
+        """
+        Get the health state of every configured API.
         
-        logger.info(f"API success reported for {api_name}")
+        Returns:
+            dict: Breaker state, EWMA latency and error rate, expected completion
+                time and counters per API type and name
+        """
+        with self._lock:
+            now = time.time()
+            return {
+                api_type: {
+                    api["name"]: {
+                        **self._get_health(api["name"]).to_dict(now, self.error_half_life),
+                        "keys": self.get_key_pool(api["name"]).stats()
+                    }
+                    for api in apis if api["available"]
+                }
+                for api_type, apis in self.api_configs.items()
+            }
     
     def execute_with_failover(self, api_type: str, operation: Callable, *args, **kwargs) -> Any:
         """
         Execute an operation with failover to backup APIs.
         
+        Each API's keys are tried in turn when a key is rate limited; other
+        errors fail over to the next API.
+        
         Args:
             api_type (str): Type of API to use (llm, search, reranker)
             operation (Callable): Function to execute
             *args: Arguments for the operation
             **kwargs: Keyword arguments for the operation
-            
+        
         Returns:
             Any: Result of the operation
-            
+        
         Raises:
             Exception: If all APIs fail
         """
@@ -154,15 +514,34 @@ class APIFailover:
         last_exception = None
         
         for api in available_apis:
-            try:
-                logger.info(f"Attempting operation with {api['name']} API")
-                result = operation(api["key"], *args, **kwargs)
-                self.report_success(api["name"])
-                return result
-            except Exception as e:
-                logger.warning(f"Operation failed with {api['name']} API: {str(e)}")
-                self.report_failure(api["name"])
-                last_exception = e
+            if not self.claim_probe(api["name"]):
+                last_exception = Exception(f"{api['name']} probe already in flight")
+                continue
+            tried = set()
+            while True:
+                key = self.acquire_key(api["name"], exclude=tried)
+                if key is None:
+                    if not tried:
+                        last_exception = Exception(f"No {api['name']} key available")
+                    break
+                tried.add(key)
+                
+                try:
+                    logger.info(f"Attempting operation with {api['name']} API")
+                    started = time.perf_counter()
+                    result = operation(key, *args, **kwargs)
+                    self.report_success(api["name"], time.perf_counter() - started)
+                    return result
+                except Exception as e:
+                    last_exception = e
+                    if is_rate_limit_error(e):
+                        self.report_rate_limited(api["name"], key, retry_after(e))
+                        continue
+                    logger.warning(f"Operation failed with {api['name']} API: {str(e)}")
+                    self.report_failure(api["name"], time.perf_counter() - started)
+                    break
+                finally:
+                    self.release_key(api["name"], key)
         
         # All APIs failed
         raise Exception(f"All {api_type} APIs failed. Last error: {str(last_exception)}")
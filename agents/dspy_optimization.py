@@ -1,6 +1,7 @@
 import dspy
 from config import OPENROUTER_API_KEY, OPENROUTER_BASE_URL, OPENROUTER_MODEL
 import json
+from agents.streaming import forward_tokens, trailing_events
 import logging
 
 # Set up logging
@@ -139,26 +140,31 @@ class DSPyOptimizedSearchAgent:
         from agents.serper_enhanced_search import SerperEnhancedSearchAgent
         self.base_agent = SerperEnhancedSearchAgent()
     
-    def search(self, query: str, user_id: str = "default"):
+    def _optimize_query(self, query: str, user_id: str = "default"):
+        """Optimize the query for a known user; the default user searches with the query as given."""
+        if user_id == "default":
+            return query
+        optimized_query = self.prompt_optimizer.optimize_search_prompt(user_id, query)
+        logger.info(f"Using optimized query for user {user_id}: {optimized_query}")
+        return optimized_query
+    
+    def search(self, query: str, user_id: str = "default", evidence=None):
         """
         Execute optimized search with user-specific prompt optimization.
         
         Args:
             query (str): Search query
             user_id (str): User identifier
+            evidence (EvidenceContext): Request-scoped evidence shared with other stages
         
         Returns:
             dict: Search results
         """
         # Optimize prompt based on user history
-        if user_id != "default":
-            optimized_query = self.prompt_optimizer.optimize_search_prompt(user_id, query)
-            logger.info(f"Using optimized query for user {user_id}: {optimized_query}")
-        else:
-            optimized_query = query
+        optimized_query = self._optimize_query(query, user_id)
         
         # Execute search with optimized prompt
-        results = self.base_agent.search(optimized_query)
+        results = self.base_agent.search(optimized_query, evidence=evidence)
         
         # Extract content if needed
         if hasattr(results, 'content'):
@@ -179,6 +185,27 @@ class DSPyOptimizedSearchAgent:
                 "confidence": 85,
                 "optimized": user_id != "default"
             }
+    
+    def search_stream(self, query: str, user_id: str = "default", evidence=None):
+        """
+        Execute optimized search, streaming the final search call.
+        
+        Args:
+            query (str): Search query
+            user_id (str): User identifier
+            evidence (EvidenceContext): Request-scoped evidence shared with other stages
+        
+        Yields:
+            dict: Token events, then the verification and result events
+        """
+        optimized_query = self._optimize_query(query, user_id)
+        result = yield from forward_tokens(self.base_agent.search_stream(optimized_query, evidence=evidence))
+        result.update({
+            "verification": "Standard search with DSPy optimization",
+            "confidence": 85,
+            "optimized": user_id != "default"
+        })
+        yield from trailing_events(result)
 
 # Example usage
 if __name__ == "__main__":
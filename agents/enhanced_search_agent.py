@@ -2,16 +2,14 @@ from agno.agent import Agent
 from agno.models.openai import OpenAIChat
 from agno.tools.duckduckgo import DuckDuckGoTools
 from agno.tools.reasoning import ReasoningTools
-from agno.knowledge.url import UrlKnowledge
-from agno.vectordb.lancedb import LanceDb, SearchType
-from agno.embedder.openai import OpenAIEmbedder
-from agno.reranker.cohere import CohereReranker
 from agno.memory.agent import AgentMemory
+from knowledge.knowledge_base import get_knowledge_base
 from config import (
-    OPENROUTER_API_KEY, OPENROUTER_BASE_URL, OPENROUTER_MODEL,
-    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL,
-    COHERE_API_KEY
+    OPENROUTER_API_KEY, OPENROUTER_API_KEYS, OPENROUTER_BASE_URL, OPENROUTER_MODEL,
+    OPENAI_API_KEYS, OPENAI_BASE_URL, OPENAI_MODEL
 )
+from agents.llm_engine import LLMExecutionEngine, LLMProvider, build_keyed_agents
+from agents.query_complexity import get_query_classifier, SEPARATE, FOLD
 import logging
 
 # Set up logging
@@ -23,25 +21,32 @@ class EnhancedSmartSearchAgent:
         # Initialize knowledge base
         self.knowledge = self._create_knowledge_base()
         
-        # Create primary agent with OpenRouter
-        self.primary_agent = self._create_agent(
+        # Create primary agent with OpenRouter, one per pooled key
+        self.primary_agents = build_keyed_agents(OPENROUTER_API_KEYS, lambda api_key: self._create_agent(
             name="Smart Search (Primary)",
-            api_key=OPENROUTER_API_KEY,
+            api_key=api_key,
             base_url=OPENROUTER_BASE_URL,
             model=OPENROUTER_MODEL
-        )
+        ))
+        self.primary_agent = next(iter(self.primary_agents.values()))
         
-        # Create fallback agent with OpenAI
-        self.fallback_agent = self._create_agent(
+        # Create fallback agent with OpenAI, one per pooled key
+        self.fallback_agents = build_keyed_agents(OPENAI_API_KEYS, lambda api_key: self._create_agent(
             name="Smart Search (Fallback)",
-            api_key=OPENAI_API_KEY,
+            api_key=api_key,
             base_url=OPENAI_BASE_URL,
             model=OPENAI_MODEL
-        )
+        ))
+        self.fallback_agent = next(iter(self.fallback_agents.values()))
         
-        # Track which agent is active
-        self.active_agent = self.primary_agent
-        self.using_fallback = False
+        # Route every prompt through the shared execution engine
+        self.engine = LLMExecutionEngine([
+            LLMProvider("openrouter", self.primary_agent, keyed_agents=self.primary_agents),
+            LLMProvider("openai", self.fallback_agent, keyed_agents=self.fallback_agents)
+        ])
+        
+        # Decide per query whether the separate reasoning call is worth its latency
+        self.complexity = get_query_classifier()
     
     def _create_agent(self, name, api_key, base_url, model):
         """Create an agent with the specified configuration."""
@@ -77,61 +82,34 @@ class EnhancedSmartSearchAgent:
         return str(response)
     
     def _create_knowledge_base(self):
-        """Create knowledge base with hybrid search."""
-        return UrlKnowledge(
-            urls=[
-                "https://en.wikipedia.org/wiki/Web_search_engine",
-                "https://en.wikipedia.org/wiki/Information_retrieval"
-            ],
-            vector_db=LanceDb(
-                uri="./data/knowledge",
-                table_name="search_kb",
-                search_type=SearchType.hybrid,
-                embedder=OpenAIEmbedder(
-                    id="text-embedding-3-small",
-                    api_key=OPENROUTER_API_KEY,  # Use OpenRouter for embeddings
-                    base_url=OPENROUTER_BASE_URL
-                ),
-                reranker=CohereReranker(
-                    model="rerank-english-v3.0",
-                    api_key=COHERE_API_KEY
-                )
-            )
-        )
-    
-    def _execute_with_fallback(self, prompt):
-        """Execute a prompt with fallback to OpenAI if OpenRouter fails."""
-        try:
-            logger.info("Attempting to use primary LLM (OpenRouter)")
-            self.active_agent = self.primary_agent
-            self.using_fallback = False
-            result = self.primary_agent.run(prompt)
-            logger.info("Successfully executed with primary LLM")
-            return result
-        except Exception as primary_error:
-            logger.warning(f"Primary LLM failed: {str(primary_error)}")
-            try:
-                logger.info("Falling back to secondary LLM (OpenAI)")
-                self.active_agent = self.fallback_agent
-                self.using_fallback = True
-                result = self.fallback_agent.run(prompt)
-                logger.info("Successfully executed with fallback LLM")
-                return result
-            except Exception as fallback_error:
-                logger.error(f"Both primary and fallback LLMs failed: {str(fallback_error)}")
-                raise Exception(f"Both LLM providers failed. Primary: {str(primary_error)}. Fallback: {str(fallback_error)}")
+        """Get the shared knowledge base with hybrid search."""
+        return get_knowledge_base(api_key=OPENROUTER_API_KEY, base_url=OPENROUTER_BASE_URL)
     
-    def search(self, query: str, use_reasoning: bool = True):
-        """Execute search with optional reasoning and primary/fallback LLM support."""
-        if use_reasoning:
+    def search(self, query: str, use_reasoning: bool = None):
+        """
+        Execute search with primary/fallback LLM support.
+        
+        Args:
+            query (str): Search query
+            use_reasoning (bool): True runs a separate reasoning call first, False searches
+                directly, None lets the query complexity classifier choose (including
+                folding the analysis into the search prompt)
+        
+        Returns:
+            LLMResult: Search response
+        """
+        mode = self.complexity.decide(query, use_reasoning)
+        if mode == SEPARATE:
             # First, use reasoning to understand query
             reasoning_prompt = f"Analyze this search query and identify key concepts: {query}"
             try:
-                analysis = self._execute_with_fallback(reasoning_prompt)
+                analysis = self.engine.run(reasoning_prompt)
             except Exception as e:
                 logger.error(f"Reasoning step failed: {str(e)}")
                 # If reasoning fails, proceed with direct search
-                return self._execute_with_fallback(query)
+                return self.engine.run(query)
+            if not analysis.cached:
+                self.complexity.record_reasoning_latency(analysis.latency)
             
             # Then search with enhanced understanding
             search_prompt = f"""
@@ -141,9 +119,19 @@ class EnhancedSmartSearchAgent:
             
             Provide comprehensive, accurate results with confidence scores.
             """
-            return self._execute_with_fallback(search_prompt)
+            return self.engine.run(search_prompt)
+        elif mode == FOLD:
+            # Analyse and search in a single call
+            search_prompt = f"""
+            Search for: {query}
+            
+            First briefly identify the key concepts of the query, then use them to guide the search.
+            
+            Provide comprehensive, accurate results with confidence scores.
+            """
+            return self.engine.run(search_prompt)
         else:
-            return self._execute_with_fallback(query)
+            return self.engine.run(query)
 
 # Quick test
 if __name__ == "__main__":
@@ -3,10 +3,11 @@ from agno.models.openai import OpenAIChat
 from agno.tools.reasoning import ReasoningTools
 from agno.tools.duckduckgo import DuckDuckGoTools
 from config import (
-    OPENROUTER_API_KEY, OPENROUTER_BASE_URL, OPENROUTER_MODEL,
-    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL
+    OPENROUTER_API_KEYS, OPENROUTER_BASE_URL, OPENROUTER_MODEL,
+    OPENAI_API_KEYS, OPENAI_BASE_URL, OPENAI_MODEL
 )
 from agents.enhanced_search_agent import EnhancedSmartSearchAgent
+from agents.llm_engine import LLMExecutionEngine, LLMProvider, build_keyed_agents
 import logging
 
 # Set up logging
@@ -15,23 +16,29 @@ logger = logging.getLogger(__name__)
 
 class EnhancedVerificationAgent:
     def __init__(self):
-        # Create verification agent with primary/fallback LLM support
-        self.primary_agent = self._create_verification_agent(
+        # Create verification agent with primary/fallback LLM support, one per pooled key
+        self.primary_agents = build_keyed_agents(OPENROUTER_API_KEYS, lambda api_key: self._create_verification_agent(
             name="Fact Checker (Primary)",
-            api_key=OPENROUTER_API_KEY,
+            api_key=api_key,
             base_url=OPENROUTER_BASE_URL,
             model=OPENROUTER_MODEL
-        )
+        ))
+        self.primary_agent = next(iter(self.primary_agents.values()))
         
-        self.fallback_agent = self._create_verification_agent(
+        # Create fallback agent with OpenAI, one per pooled key
+        self.fallback_agents = build_keyed_agents(OPENAI_API_KEYS, lambda api_key: self._create_verification_agent(
             name="Fact Checker (Fallback)",
-            api_key=OPENAI_API_KEY,
+            api_key=api_key,
             base_url=OPENAI_BASE_URL,
             model=OPENAI_MODEL
-        )
-        
-        self.active_agent = self.primary_agent
-        self.using_fallback = False
+        ))
+        self.fallback_agent = next(iter(self.fallback_agents.values()))
+        
+        # Route every prompt through the shared execution engine
+        self.engine = LLMExecutionEngine([
+            LLMProvider("openrouter", self.primary_agent, keyed_agents=self.primary_agents),
+            LLMProvider("openai", self.fallback_agent, keyed_agents=self.fallback_agents)
+        ])
     
     def _create_verification_agent(self, name, api_key, base_url, model):
         """Create a verification agent with the specified configuration."""
@@ -62,28 +69,6 @@ class EnhancedVerificationAgent:
             return response.content
         return str(response)
     
-    def _execute_with_fallback(self, prompt):
-        """Execute a prompt with fallback to OpenAI if OpenRouter fails."""
-        try:
-            logger.info("Attempting to use primary LLM (OpenRouter) for verification")
-            self.active_agent = self.primary_agent
-            self.using_fallback = False
-            result = self.primary_agent.run(prompt)
-            logger.info("Successfully executed verification with primary LLM")
-            return result
-        except Exception as primary_error:
-            logger.warning(f"Primary LLM failed for verification: {str(primary_error)}")
-            try:
-                logger.info("Falling back to secondary LLM (OpenAI) for verification")
-                self.active_agent = self.fallback_agent
-                self.using_fallback = True
-                result = self.fallback_agent.run(prompt)
-                logger.info("Successfully executed verification with fallback LLM")
-                return result
-            except Exception as fallback_error:
-                logger.error(f"Both primary and fallback LLMs failed for verification: {str(fallback_error)}")
-                raise Exception(f"Both LLM providers failed for verification. Primary: {str(primary_error)}. Fallback: {str(fallback_error)}")
-    
     def verify(self, content: str, sources: list = None):
         """Verify content accuracy with primary/fallback LLM support."""
         prompt = f"""
@@ -105,7 +90,7 @@ class EnhancedVerificationAgent:
         - Detailed explanation
         """
         
-        return self._execute_with_fallback(prompt)
+        return self.engine.run(prompt)
     
     def check_hallucination(self, response: str, original_query: str):
         """Check if response contains hallucinations with primary/fallback LLM support."""
@@ -129,7 +114,7 @@ class EnhancedVerificationAgent:
         - Specific issues found (if any)
         """
         
-        return self._execute_with_fallback(prompt)
+        return self.engine.run(prompt)
 
 # Enhanced anti-hallucination wrapper
 class EnhancedAntiHallucinationSearch:
@@ -165,14 +150,14 @@ class EnhancedAntiHallucinationSearch:
             - Say "Information not found" if uncertain
             - Provide confidence scores for all claims
             """
-            results = self.search_agent._execute_with_fallback(strict_prompt)
+            results = self.search_agent.engine.run(strict_prompt)
             results_content = self.verifier._extract_content(results)
         
         return {
             "results": results_content,
             "verification": verification_content,
             "confidence": self._extract_confidence(verification_content),
-            "using_fallback": self.search_agent.using_fallback or self.verifier.using_fallback
+            "using_fallback": getattr(results, "used_fallback", False) or getattr(verification, "used_fallback", False)
         }
     
     def _extract_confidence(self, verification):
@@ -0,0 +1,108 @@
+import threading
+from datetime import datetime
+from typing import Any, Callable
+from agents.serper_client import DEFAULT_NUM_RESULTS
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class EvidenceContext:
+    """
+    Request-scoped store of external evidence for one user request.
+    
+    Every stage of a search pipeline (AgentTeam, PersonalizedSmartSearch,
+    DSPyOptimizedSearchAgent, SerperEnhancedSearchAgent) reads external sources
+    through the same context, so each source is fetched at most once per
+    request. Fetches are single-flight, so stages running concurrently wait for
+    the in-progress fetch instead of issuing a duplicate one.
+    """
+    
+    def __init__(self, query: str, user_id: str = "default", serper_client=None):
+        self.query = query
+        self.user_id = user_id
+        self.serper_client = serper_client
+        self.created = datetime.now().isoformat()
+        
+        self._values = {}
+        self._fetched_at = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+    
+    def _key_lock(self, source: str) -> threading.Lock:
+        with self._lock:
+            if source not in self._key_locks:
+                self._key_locks[source] = threading.Lock()
+            return self._key_locks[source]
+    
+    def get_or_fetch(self, source: str, fetcher: Callable[[], Any]) -> Any:
+        """
+        Return the evidence for a source, fetching it on first use.
+        
+        Args:
+            source (str): Source name, e.g. "serper:organic"
+            fetcher (Callable): Zero-argument function that retrieves the evidence
+        
+        Returns:
+            Any: The evidence; failed fetches raise and are not cached
+        """
+        with self._key_lock(source):
+            if source not in self._values:
+                self._values[source] = fetcher()
+                self._fetched_at[source] = datetime.now().isoformat()
+            return self._values[source]
+    
+    def serper_organic(self, num_results: int = DEFAULT_NUM_RESULTS) -> list:
+        """
+        Get Serper organic results for the request query.
+        
+        Results are fetched once at the largest size any stage has asked for;
+        smaller requests are served as a prefix of that list.
+        
+        Args:
+            num_results (int): Number of results needed
+        
+        Returns:
+            list: Organic search results, or [] when Serper is not configured
+        """
+        if not self.serper_client:
+            return []
+        
+        source = "serper:organic"
+        with self._key_lock(source):
+            fetched = self._values.get(source)
+            if fetched is None or fetched["num"] < num_results:
+                num = max(num_results, DEFAULT_NUM_RESULTS)
+                logger.info(f"Fetching Serper evidence for query: {self.query}")
+                results = self.serper_client.get_organic_search_results(self.query, num)
+                fetched = {"num": num, "results": results}
+                self._values[source] = fetched
+                self._fetched_at[source] = datetime.now().isoformat()
+            return fetched["results"][:num_results]
+    
+    def seed_serper_organic(self, results: list):
+        """
+        Record organic results obtained without a Serper call, e.g. from the local index.
+        
+        Later stages asking for at most len(results) results reuse them; a
+        stage needing more still triggers a fetch.
+        
+        Args:
+            results (list): Organic search results for the request query
+        """
+        source = "serper:organic"
+        with self._key_lock(source):
+            if source not in self._values:
+                self._values[source] = {"num": len(results), "results": list(results)}
+                self._fetched_at[source] = datetime.now().isoformat()
+    
+    def fetched_sources(self) -> dict:
+        """
+        Get the sources fetched so far in this request.
+        
+        Returns:
+            dict: Source name to fetch timestamp
+        """
+        with self._lock:
+            return dict(self._fetched_at)
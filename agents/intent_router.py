@@ -0,0 +1,327 @@
+import json
+import re
+import threading
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from config import INTENT_ROUTER_MIN_CONFIDENCE, INTENT_MODEL_PATH, INTENT_LOG_PATH
+from agents.query_complexity import get_query_classifier
+from knowledge.embeddings import HashingEmbedder
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+QUERY_TYPES = ("factual", "news", "technical", "comparison", "how_to", "opinion", "creative", "general")
+
+# (query type, pattern, weight); weights of matching rules combine as independent evidence
+_RULES = [
+    ("news", r"\b(latest|breaking|news|today|yesterday|this (week|month)|current(ly)?|recent(ly)?|announced|update on)\b", 0.7),
+    ("news", r"\b(election|stock|price|score|weather)\b", 0.5),
+    ("comparison", r"\b(compare|comparison|vs\.?|versus|difference(s)? between|better than|pros and cons|alternatives? to)\b", 0.85),
+    ("how_to", r"^\s*how (to|do i|can i|should i)\b|\b(step by step|tutorial|guide to|set ?up|install|configure)\b", 0.8),
+    ("technical", r"\b(python|java(script)?|rust|golang|sql|api|error|exception|bug|stack ?trace|compile|docker|kubernetes|linux|algorithm|database|library|framework|function|regex)\b", 0.6),
+    ("technical", r"[\w.]+\(\)|\w+\.\w+\(|`[^`]+`|\b\w+Error\b", 0.8),
+    ("factual", r"^\s*(what|who|when|where|which) (is|was|are|were|did)\b|^\s*(define|definition of)\b|\b(capital of|population of|founded|invented|born|meaning of|how (many|much|tall|old|far))\b", 0.75),
+    ("opinion", r"\b(should i|is it worth|best|worst|recommend\w*|opinion|review|overrated|favou?rite)\b", 0.55),
+    ("creative", r"\b(write|compose|poem|story|slogan|brainstorm|ideas? for|names? for|imagine)\b", 0.8)
+]
+_COMPILED_RULES = [(query_type, re.compile(pattern, re.IGNORECASE), weight) for query_type, pattern, weight in _RULES]
+
+# Minimum verification confidence per query type
+_CONFIDENCE_THRESHOLDS = {
+    "factual": 80, "news": 75, "technical": 75, "comparison": 70,
+    "how_to": 70, "opinion": 60, "creative": 50, "general": 70
+}
+
+@dataclass
+class QueryIntent:
+    """Typed result of intent routing."""
+    
+    query_type: str = "general"
+    complexity: str = "medium"
+    required_agents: List[str] = field(default_factory=lambda: ["search"])
+    search_strategy: str = "comprehensive"
+    confidence_threshold: int = 70
+    confidence: float = 0.0
+    source: str = "rules"
+    
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+def train_intent_model(queries: List[str], labels: List[str], dimensions: int = 512,
+                       epochs: int = 200, learning_rate: float = 0.5, l2: float = 1e-4) -> dict:
+    """
+    Train a compact softmax regression intent model over hashed query features.
+    
+    Args:
+        queries (List[str]): Logged queries
+        labels (List[str]): Query type of each query
+        dimensions (int): Hashed feature dimensions
+        epochs (int): Full-batch gradient descent steps
+        learning_rate (float): Step size
+        l2 (float): Weight decay
+    
+    Returns:
+        dict: JSON-serialisable model for IntentRouter
+    """
+    if len(queries) != len(labels) or not queries:
+        raise ValueError("Intent model needs one label per query and at least one query")
+    classes = sorted(set(labels))
+    index = {label: i for i, label in enumerate(classes)}
+    features = np.asarray(HashingEmbedder(dimensions=dimensions).get_embeddings(queries), dtype=np.float64)
+    targets = np.zeros((len(queries), len(classes)))
+    targets[np.arange(len(queries)), [index[label] for label in labels]] = 1.0
+    
+    weights = np.zeros((dimensions, len(classes)))
+    bias = np.zeros(len(classes))
+    for _ in range(epochs):
+        logits = features @ weights + bias
+        probabilities = np.exp(logits - logits.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        error = (probabilities - targets) / len(queries)
+        weights -= learning_rate * (features.T @ error + l2 * weights)
+        bias -= learning_rate * error.sum(axis=0)
+    
+    return {"classes": classes, "dimensions": dimensions, "weights": weights.tolist(), "bias": bias.tolist()}
+
+def load_intent_log(path: str, sources: Tuple[str, ...] = ("llm", "rules", "model"),
+                    min_confidence: float = 0.0) -> Tuple[List[str], List[str]]:
+    """
+    Read (query, query_type) training pairs from an intent log written by IntentRouter.
+    
+    Args:
+        path (str): JSON lines log path
+        sources (Tuple[str, ...]): Routing sources to keep
+        min_confidence (float): Minimum routing confidence to keep
+    
+    Returns:
+        Tuple[List[str], List[str]]: Queries and their labels
+    """
+    queries, labels = [], []
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get("source") in sources and record.get("confidence", 0) >= min_confidence:
+                queries.append(record["query"])
+                labels.append(record["query_type"])
+    return queries, labels
+
+class IntentRouter:
+    """
+    Local query intent router.
+    
+    Keyword/regex rules, and an optional softmax regression model trained from
+    logged queries, pick the query type in microseconds. Complexity comes from
+    the shared query complexity classifier. The LLM is only consulted when the
+    local confidence is below min_confidence; every routed query can be
+    appended to a JSON lines log to train the next model.
+    """
+    
+    def __init__(self, min_confidence: float = INTENT_ROUTER_MIN_CONFIDENCE, model_path: str = INTENT_MODEL_PATH,
+                 log_path: str = INTENT_LOG_PATH, model: Optional[dict] = None, complexity=None):
+        self.min_confidence = min_confidence
+        self.log_path = log_path
+        self.complexity = complexity or get_query_classifier()
+        self._model = self._load_model(model, model_path)
+        self._lock = threading.Lock()
+        self._stats = {"routed": 0, "llm_calls": 0, "llm_failures": 0, "route_time": 0.0,
+                       "sources": {"rules": 0, "model": 0, "llm": 0}}
+    
+    @staticmethod
+    def _load_model(model: Optional[dict], model_path: str) -> Optional[dict]:
+        """Prepare model arrays; None when no model is configured or it cannot be read."""
+        if model is None and model_path:
+            try:
+                with open(model_path) as f:
+                    model = json.load(f)
+            except Exception as e:
+                logger.warning(f"Failed to load intent model from {model_path}: {str(e)}")
+                return None
+        if model is None:
+            return None
+        return {
+            "classes": list(model["classes"]),
+            "embedder": HashingEmbedder(dimensions=int(model["dimensions"])),
+            "weights": np.asarray(model["weights"], dtype=np.float64),
+            "bias": np.asarray(model["bias"], dtype=np.float64)
+        }
+    
+    def _rule_scores(self, query: str) -> Dict[str, float]:
+        """Combine matching rule weights per query type as 1 - prod(1 - w)."""
+        misses = {}
+        for query_type, pattern, weight in _COMPILED_RULES:
+            if pattern.search(query):
+                misses[query_type] = misses.get(query_type, 1.0) * (1.0 - weight)
+        return {query_type: 1.0 - miss for query_type, miss in misses.items()}
+    
+    def _classify_rules(self, query: str) -> Tuple[str, float]:
+        scores = sorted(self._rule_scores(query).items(), key=lambda item: item[1], reverse=True)
+        if not scores:
+            return "general", 0.3
+        runner_up = scores[1][1] if len(scores) > 1 else 0.0
+        # Competing evidence for another type lowers confidence
+        return scores[0][0], scores[0][1] * (1.0 - 0.5 * runner_up)
+    
+    def _classify_model(self, query: str) -> Optional[Tuple[str, float]]:
+        if self._model is None:
+            return None
+        features = np.asarray(self._model["embedder"].get_embedding(query), dtype=np.float64)
+        logits = features @ self._model["weights"] + self._model["bias"]
+        probabilities = np.exp(logits - logits.max())
+        probabilities /= probabilities.sum()
+        best = int(np.argmax(probabilities))
+        return self._model["classes"][best], float(probabilities[best])
+    
+    def _build_intent(self, query: str, user_id: str, query_type: str, confidence: float, source: str) -> QueryIntent:
+        complexity_score = self.complexity.score(query)
+        if complexity_score < self.complexity.skip_below:
+            complexity = "simple"
+        elif complexity_score < self.complexity.separate_above:
+            complexity = "medium"
+        else:
+            complexity = "complex"
+        
+        required_agents = ["search"]
+        if query_type in ("factual", "news", "technical", "comparison"):
+            required_agents.append("verification")
+        if query_type in ("news", "comparison") or complexity != "simple":
+            required_agents.append("serper")
+        if user_id != "default":
+            required_agents.append("personalization")
+        
+        if query_type == "comparison":
+            search_strategy = "multi_source"
+        elif query_type == "news":
+            search_strategy = "recent"
+        else:
+            search_strategy = "direct" if complexity == "simple" else "comprehensive"
+        
+        return QueryIntent(
+            query_type=query_type,
+            complexity=complexity,
+            required_agents=required_agents,
+            search_strategy=search_strategy,
+            confidence_threshold=_CONFIDENCE_THRESHOLDS.get(query_type, 70),
+            confidence=round(confidence, 4),
+            source=source
+        )
+    
+    def _ask_llm(self, query: str, user_id: str, llm: Callable, intent: QueryIntent) -> QueryIntent:
+        """Refine an uncertain intent with one LLM call; keep the local intent on any failure."""
+        prompt = f"""
+        Classify this search query.
+        
+        Query: {query}
+        
+        Return only a JSON object with:
+        - query_type: one of {", ".join(QUERY_TYPES)}
+        - complexity: simple/medium/complex
+        - confidence_threshold: minimum acceptable confidence (0-100)
+        """
+        with self._lock:
+            self._stats["llm_calls"] += 1
+        try:
+            response = llm(prompt)
+            content = response.content if hasattr(response, "content") else str(response)
+            match = re.search(r"\{.*\}", content or "", re.DOTALL)
+            data = json.loads(match.group(0)) if match else {}
+            query_type = data.get("query_type")
+            if query_type not in QUERY_TYPES:
+                raise ValueError(f"Unexpected query type: {query_type}")
+        except Exception as e:
+            logger.warning(f"LLM intent analysis failed: {str(e)}")
+            with self._lock:
+                self._stats["llm_failures"] += 1
+            return intent
+        
+        refined = self._build_intent(query, user_id, query_type, 1.0, "llm")
+        if data.get("complexity") in ("simple", "medium", "complex"):
+            refined.complexity = data["complexity"]
+        try:
+            refined.confidence_threshold = int(data.get("confidence_threshold", refined.confidence_threshold))
+        except (TypeError, ValueError):
+            pass
+        return refined
+    
+    def _log(self, query: str, intent: QueryIntent):
+        if not self.log_path:
+            return
+        record = {"query": query, "query_type": intent.query_type, "source": intent.source,
+                  "confidence": intent.confidence, "timestamp": time.time()}
+        try:
+            with self._lock, open(self.log_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+        except Exception as e:
+            logger.warning(f"Failed to log intent: {str(e)}")
+    
+    def route(self, query: str, user_id: str = "default", llm: Callable = None) -> QueryIntent:
+        """
+        Route a query to a typed intent.
+        
+        Args:
+            query (str): Search query
+            user_id (str): User identifier
+            llm (Callable): Optional prompt -> response callable, used only when unsure
+        
+        Returns:
+            QueryIntent: Routed intent
+        """
+        started = time.perf_counter()
+        query_type, confidence = self._classify_rules(query)
+        source = "rules"
+        predicted = self._classify_model(query)
+        if predicted is not None and predicted[1] > confidence:
+            query_type, confidence = predicted
+            source = "model"
+        intent = self._build_intent(query, user_id, query_type, confidence, source)
+        elapsed = time.perf_counter() - started
+        
+        if confidence < self.min_confidence and llm is not None:
+            intent = self._ask_llm(query, user_id, llm, intent)
+        
+        with self._lock:
+            self._stats["routed"] += 1
+            self._stats["route_time"] += elapsed
+            self._stats["sources"][intent.source] += 1
+        self._log(query, intent)
+        return intent
+    
+    def stats(self) -> dict:
+        """
+        Get routing counters.
+        
+        Returns:
+            dict: Routed queries per source, LLM calls and failures, LLM call rate and
+                average local routing time in microseconds
+        """
+        with self._lock:
+            stats = dict(self._stats, sources=dict(self._stats["sources"]))
+        route_time = stats.pop("route_time")
+        stats["model"] = self._model is not None
+        stats["llm_rate"] = round(stats["llm_calls"] / stats["routed"], 4) if stats["routed"] else 0.0
+        stats["avg_route_us"] = round(route_time / stats["routed"] * 1e6, 1) if stats["routed"] else 0.0
+        return stats
+
+# Global intent router instance
+_intent_router = None
+_intent_router_lock = threading.Lock()
+
+def get_intent_router() -> IntentRouter:
+    """
+    Get the process-wide intent router, creating it on first use.
+    
+    Returns:
+        IntentRouter: Shared router
+    """
+    global _intent_router
+    if _intent_router is None:
+        with _intent_router_lock:
+            if _intent_router is None:
+                _intent_router = IntentRouter()
+    return _intent_router
@@ -1,6 +1,24 @@
 import requests
+import atexit
 import json
-from config import JIRA_API_KEY, JIRA_BASE_URL, JIRA_USERNAME
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from config import (
+    JIRA_API_KEY, JIRA_BASE_URL, JIRA_USERNAME,
+    JIRA_OUTBOX_ENABLED, JIRA_OUTBOX_PATH,
+    JIRA_OUTBOX_MAX_ATTEMPTS, JIRA_OUTBOX_POLL_INTERVAL,
+    JIRA_BULK_CREATE_SIZE, JIRA_BATCH_MAX_WAIT,
+    JIRA_SUMMARY_MAX_EVENTS, JIRA_SUMMARY_INTERVAL,
+    JIRA_COALESCED_ACTIVITIES
+)
+from agents.rate_limiter import get_rate_limiter
 import base64
 import logging
 
@@ -8,6 +26,26 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def is_permanent_error(error: Exception) -> bool:
+    """
+    Check whether a failed Jira call would fail the same way on retry.
+    
+    4xx responses are permanent except 408 and 429; 5xx responses and
+    connection errors are transient.
+    
+    Args:
+        error (Exception): Error raised by a JiraIntegration method
+    
+    Returns:
+        bool: True if retrying is pointless
+    """
+    while error is not None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+        if status is not None:
+            return 400 <= status < 500 and status not in (408, 429)
+        error = error.__cause__
+    return False
+
 class JiraIntegration:
     """Integration with Jira for workflow management and task tracking."""
     
@@ -27,6 +65,12 @@ class JiraIntegration:
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
+        self.rate_limiter = get_rate_limiter()
+    
+    def _request(self, method: str, url: str, **kwargs):
+        """Send a Jira REST request once the shared rate limiter allows it."""
+        self.rate_limiter.acquire("jira")
+        return requests.request(method, url, headers=self.headers, **kwargs)
     
     def create_issue(self, project_key: str, summary: str, description: str = "", 
                     issue_type: str = "Task", priority: str = "Medium"):
@@ -46,28 +90,63 @@ class JiraIntegration:
         url = f"{self.base_url}/rest/api/2/issue"
         
         payload = {
-            "fields": {
-                "project": {
-                    "key": project_key
-                },
-                "summary": summary,
-                "description": description,
-                "issuetype": {
-                    "name": issue_type
-                },
-                "priority": {
-                    "name": priority
-                }
-            }
+            "fields": self._issue_fields(project_key, summary, description, issue_type, priority)
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = self._request("post", url, json=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to create Jira issue: {str(e)}")
-            raise Exception(f"Failed to create Jira issue: {str(e)}")
+            raise Exception(f"Failed to create Jira issue: {str(e)}") from e
+    
+    def _issue_fields(self, project_key: str, summary: str, description: str = "",
+                      issue_type: str = "Task", priority: str = "Medium"):
+        """Build the fields object for a new issue."""
+        return {
+            "project": {
+                "key": project_key
+            },
+            "summary": summary,
+            "description": description,
+            "issuetype": {
+                "name": issue_type
+            },
+            "priority": {
+                "name": priority
+            }
+        }
+    
+    def bulk_create_issues(self, issues: list):
+        """
+        Create several issues in one request.
+        
+        Args:
+            issues (list): Dicts of create_issue keyword arguments
+        
+        Returns:
+            dict: Response from Jira API with "issues" (created, in order) and
+                "errors" (each with the "failedElementNumber" of the rejected issue)
+        """
+        url = f"{self.base_url}/rest/api/2/issue/bulk"
+        
+        payload = {
+            "issueUpdates": [
+                {"fields": self._issue_fields(**issue)} for issue in issues
+            ]
+        }
+        
+        try:
+            response = self._request("post", url, json=payload)
+            # Jira answers 400 with per-element errors when only some issues are rejected
+            if response.status_code == 400 and response.json().get("issues"):
+                return response.json()
+            response.raise_for_status()
+            return response.json()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to bulk create Jira issues: {str(e)}")
+            raise Exception(f"Failed to bulk create Jira issues: {str(e)}") from e
     
     def search_issues(self, jql: str, max_results: int = 50):
         """
@@ -88,12 +167,12 @@ class JiraIntegration:
         }
         
         try:
-            response = requests.get(url, headers=self.headers, params=params)
+            response = self._request("get", url, params=params)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to search Jira issues: {str(e)}")
-            raise Exception(f"Failed to search Jira issues: {str(e)}")
+            raise Exception(f"Failed to search Jira issues: {str(e)}") from e
     
     def update_issue(self, issue_key: str, fields: dict):
         """
@@ -113,12 +192,12 @@ class JiraIntegration:
         }
         
         try:
-            response = requests.put(url, headers=self.headers, json=payload)
+            response = self._request("put", url, json=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to update Jira issue {issue_key}: {str(e)}")
-            raise Exception(f"Failed to update Jira issue {issue_key}: {str(e)}")
+            raise Exception(f"Failed to update Jira issue {issue_key}: {str(e)}") from e
     
     def add_comment(self, issue_key: str, comment: str):
         """
@@ -138,12 +217,12 @@ class JiraIntegration:
         }
         
         try:
-            response = requests.post(url, headers=self.headers, json=payload)
+            response = self._request("post", url, json=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to add comment to Jira issue {issue_key}: {str(e)}")
-            raise Exception(f"Failed to add comment to Jira issue {issue_key}: {str(e)}")
+            raise Exception(f"Failed to add comment to Jira issue {issue_key}: {str(e)}") from e
     
     def get_issue(self, issue_key: str):
         """
@@ -158,20 +237,564 @@ class JiraIntegration:
         url = f"{self.base_url}/rest/api/2/issue/{issue_key}"
         
         try:
-            response = requests.get(url, headers=self.headers)
+            response = self._request("get", url)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
             logger.error(f"Failed to get Jira issue {issue_key}: {str(e)}")
-            raise Exception(f"Failed to get Jira issue {issue_key}: {str(e)}")
+            raise Exception(f"Failed to get Jira issue {issue_key}: {str(e)}") from e
+
+# Durable outbox for Jira writes
+class JiraOutbox:
+    """
+    Durable queue of Jira writes backed by SQLite and drained by a background worker.
+    
+    Writes are persisted before the request returns and retried with exponential
+    backoff, so search latency does not depend on Jira's response time or
+    availability. Issues created through the outbox get a local reference that
+    later operations (comments, updates) can target before the real issue key is
+    known; the worker resolves the reference once the issue exists.
+    
+    The worker flushes when batch_size entries are due or the oldest due entry
+    has waited batch_max_wait seconds, and sends queued creates through Jira's
+    bulk-create endpoint. Entries are claimed before they are sent, so workers
+    sharing one outbox file never send the same entry twice.
+    """
+    
+    REF_PREFIX = "local-"
+    
+    def __init__(self, path: str = JIRA_OUTBOX_PATH, max_attempts: int = JIRA_OUTBOX_MAX_ATTEMPTS,
+                 poll_interval: float = JIRA_OUTBOX_POLL_INTERVAL, base_backoff: float = 2.0,
+                 max_backoff: float = 300.0, batch_size: int = JIRA_BULK_CREATE_SIZE,
+                 batch_max_wait: float = JIRA_BATCH_MAX_WAIT, claim_timeout: float = 300.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.batch_size = batch_size
+        self.batch_max_wait = batch_max_wait
+        self.claim_timeout = claim_timeout
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                op TEXT NOT NULL,
+                issue TEXT,
+                ref TEXT,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS refs (ref TEXT PRIMARY KEY, issue_key TEXT NOT NULL)")
+        self._conn.commit()
+        
+        self._jira = None
+        self._worker = None
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+    
+    @classmethod
+    def is_ref(cls, issue: str) -> bool:
+        """Check whether an issue identifier is a local outbox reference."""
+        return bool(issue) and issue.startswith(cls.REF_PREFIX)
+    
+    def enqueue(self, op: str, payload: dict, issue: str = None, ref: str = None) -> int:
+        """
+        Persist a Jira write for the background worker.
+        
+        Args:
+            op (str): Operation - "create_issue", "add_comment" or "update_issue"
+            payload (dict): Keyword arguments for the JiraIntegration method
+            issue (str): Target issue key or local reference (comments and updates)
+            ref (str): Local reference assigned to the issue being created
+        
+        Returns:
+            int: Outbox entry id
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (op, issue, ref, payload, next_attempt_at, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (op, issue, ref, json.dumps(payload), now, now)
+            )
+            self._conn.commit()
+        self._wakeup.set()
+        return cursor.lastrowid
+    
+    def new_ref(self) -> str:
+        """Create a local reference for an issue that has not been created yet."""
+        return f"{self.REF_PREFIX}{uuid.uuid4().hex[:12]}"
+    
+    def resolve(self, issue: str):
+        """
+        Resolve a local reference to its Jira issue key.
+        
+        Args:
+            issue (str): Issue key or local reference
+        
+        Returns:
+            str: Issue key, or None if the referenced issue has not been created yet
+        """
+        if not self.is_ref(issue):
+            return issue
+        with self._lock:
+            row = self._conn.execute("SELECT issue_key FROM refs WHERE ref = ?", (issue,)).fetchone()
+        return row[0] if row else None
+    
+    def _claim_due(self, limit: int):
+        """
+        Claim due entries for sending.
+        
+        Entries are selected and marked 'sending' in one write transaction, so
+        another worker, in this process or another, cannot claim them too. A
+        claim whose worker died before settling it expires after claim_timeout.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                entries = self._conn.execute(
+                    "SELECT id, op, issue, ref, payload, attempts FROM outbox "
+                    "WHERE status IN ('pending', 'sending') AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                    (now, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE outbox SET status = 'sending', next_attempt_at = ? WHERE id = ?",
+                    [(now + self.claim_timeout, entry[0]) for entry in entries]
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return entries
+    
+    def _mark_done(self, entry_id: int, ref: str = None, issue_key: str = None):
+        with self._lock:
+            if ref and issue_key:
+                self._conn.execute("INSERT OR REPLACE INTO refs (ref, issue_key) VALUES (?, ?)", (ref, issue_key))
+            self._conn.execute("UPDATE outbox SET status = 'done', last_error = NULL WHERE id = ?", (entry_id,))
+            self._conn.commit()
+    
+    def _mark_failed(self, entry_id: int, attempts: int, error: str, permanent: bool = False):
+        """Schedule a retry with backoff, or give up after max_attempts or on a permanent error."""
+        attempts += 1
+        if permanent:
+            status, next_attempt_at = "failed", time.time()
+            logger.error(f"Jira outbox entry {entry_id} failed permanently: {error}")
+        elif attempts >= self.max_attempts:
+            status, next_attempt_at = "failed", time.time()
+            logger.error(f"Giving up on Jira outbox entry {entry_id} after {attempts} attempts: {error}")
+        else:
+            # Exponential backoff, waiting a random time between half and all of the delay
+            delay = min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+            status, next_attempt_at = "pending", time.time() + random.uniform(delay / 2, delay)
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (status, attempts, next_attempt_at, error, entry_id)
+            )
+            self._conn.commit()
+    
+    def _defer(self, entry_id: int, seconds: float):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET status = 'pending', next_attempt_at = ? WHERE id = ?",
+                (time.time() + seconds, entry_id)
+            )
+            self._conn.commit()
+    
+    def _ref_failed(self, ref: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM outbox WHERE ref = ? AND op = 'create_issue' AND status = 'failed'", (ref,)
+            ).fetchone()
+        return row is not None
+    
+    def _send_creates(self, jira: "JiraIntegration", entries: list) -> int:
+        """Send queued creates in bulk-create batches and record the assigned keys."""
+        sent = 0
+        for i in range(0, len(entries), self.batch_size):
+            batch = entries[i:i + self.batch_size]
+            
+            if len(batch) == 1 or not hasattr(jira, "bulk_create_issues"):
+                for entry_id, ref, kwargs, attempts in batch:
+                    try:
+                        created = jira.create_issue(**kwargs)
+                        self._mark_done(entry_id, ref, created.get("key"))
+                        sent += 1
+                    except Exception as e:
+                        logger.warning(f"Jira outbox entry {entry_id} (create_issue) failed: {str(e)}")
+                        self._mark_failed(entry_id, attempts, str(e), is_permanent_error(e))
+                continue
+            
+            try:
+                response = jira.bulk_create_issues([kwargs for _, _, kwargs, _ in batch])
+            except Exception as e:
+                logger.warning(f"Jira bulk create of {len(batch)} issues failed: {str(e)}")
+                for entry_id, _, _, attempts in batch:
+                    self._mark_failed(entry_id, attempts, str(e), is_permanent_error(e))
+                continue
+            
+            # Created issues come back in request order, skipping rejected elements
+            failed = {
+                error.get("failedElementNumber"): json.dumps(error.get("elementErrors", error))
+                for error in response.get("errors", [])
+            }
+            created = iter(response.get("issues", []))
+            for index, (entry_id, ref, _, attempts) in enumerate(batch):
+                if index in failed:
+                    # Rejected elements fail validation and would be rejected again
+                    self._mark_failed(entry_id, attempts, failed[index], permanent=True)
+                    continue
+                issue = next(created, None)
+                if issue is None:
+                    self._mark_failed(entry_id, attempts, "Missing issue in bulk create response")
+                    continue
+                self._mark_done(entry_id, ref, issue.get("key"))
+                sent += 1
+            logger.info(f"Bulk created {len(batch) - len(failed)} Jira issues")
+        
+        return sent
+    
+    def drain_once(self, jira: "JiraIntegration", limit: int = 500) -> int:
+        """
+        Send every due outbox entry once.
+        
+        Creates are sent first, in bulk, so comments and updates queued against
+        their local references can resolve in the same pass.
+        
+        Args:
+            jira (JiraIntegration): Client used to perform the writes
+            limit (int): Maximum number of entries to process
+        
+        Returns:
+            int: Number of entries sent successfully
+        """
+        entries = self._claim_due(limit)
+        creates = [
+            (entry_id, ref, json.loads(payload), attempts)
+            for entry_id, op, issue, ref, payload, attempts in entries if op == "create_issue"
+        ]
+        sent = self._send_creates(jira, creates)
+        
+        for entry_id, op, issue, ref, payload, attempts in entries:
+            if op == "create_issue":
+                continue
+            kwargs = json.loads(payload)
+            
+            issue_key = self.resolve(issue) if issue else None
+            if issue_key is None:
+                if not issue or self._ref_failed(issue):
+                    self._mark_failed(entry_id, attempts, f"Referenced issue {issue} was never created", permanent=True)
+                else:
+                    # Wait for the create that assigns this reference
+                    self._defer(entry_id, self.poll_interval)
+                continue
+            
+            try:
+                if op == "add_comment":
+                    jira.add_comment(issue_key, **kwargs)
+                elif op == "update_issue":
+                    jira.update_issue(issue_key, **kwargs)
+                else:
+                    self._mark_failed(entry_id, attempts, f"Unknown outbox operation: {op}", permanent=True)
+                    continue
+                self._mark_done(entry_id)
+                sent += 1
+            except Exception as e:
+                logger.warning(f"Jira outbox entry {entry_id} ({op}) failed: {str(e)}")
+                self._mark_failed(entry_id, attempts, str(e), is_permanent_error(e))
+        
+        return sent
+    
+    def flush_due(self) -> bool:
+        """
+        Check whether the size or time threshold for a flush has been reached.
+        
+        Returns:
+            bool: True if the worker should drain now
+        """
+        with self._lock:
+            count, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(next_attempt_at) FROM outbox "
+                "WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?",
+                (time.time(),)
+            ).fetchone()
+        if not count:
+            return False
+        return count >= self.batch_size or time.time() - oldest >= self.batch_max_wait
+    
+    def start(self, jira: "JiraIntegration"):
+        """
+        Start the background worker if it is not already running.
+        
+        Args:
+            jira (JiraIntegration): Client used to perform the writes
+        """
+        with self._lock:
+            self._jira = jira
+            if self._worker is not None and self._worker.is_alive():
+                return
+            self._stopped.clear()
+            self._worker = threading.Thread(target=self._run, name="jira-outbox", daemon=True)
+            self._worker.start()
+    
+    def stop(self, timeout: float = 5.0):
+        """Stop the background worker."""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._worker is not None:
+            self._worker.join(timeout)
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                if self.flush_due():
+                    self.drain_once(self._jira)
+            except Exception as e:
+                logger.error(f"Jira outbox worker error: {str(e)}")
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+    
+    def stats(self) -> dict:
+        """
+        Get outbox entry counts by status.
+        
+        Returns:
+            dict: Counts of pending, done and failed entries, plus sending ones while a drain is running
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall()
+        stats = {"pending": 0, "done": 0, "failed": 0}
+        stats.update(dict(rows))
+        return stats
+
+# Process-wide outbox shared by every task manager
+_jira_outbox = None
+_jira_outbox_lock = threading.Lock()
+
+def get_jira_outbox():
+    """
+    Get the process-wide Jira outbox, creating it on first use.
+    
+    Returns:
+        JiraOutbox: Shared outbox
+    """
+    global _jira_outbox
+    if _jira_outbox is None:
+        with _jira_outbox_lock:
+            if _jira_outbox is None:
+                _jira_outbox = JiraOutbox()
+    return _jira_outbox
+
+# Worker for summary flushes that would otherwise call Jira on the request thread
+_summary_executor = None
+_summary_executor_lock = threading.Lock()
+
+def get_summary_executor() -> ThreadPoolExecutor:
+    """
+    Get the process-wide executor used to write activity summaries, creating it on first use.
+    
+    Returns:
+        ThreadPoolExecutor: Shared single-worker executor
+    """
+    global _summary_executor
+    if _summary_executor is None:
+        with _summary_executor_lock:
+            if _summary_executor is None:
+                _summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jira-summary")
+    return _summary_executor
+
+# Coalescers whose open windows are written out when the process exits
+_coalescers = weakref.WeakSet()
+
+def flush_activity_summaries():
+    """Write summary issues for every open activity window of every coalescer."""
+    for coalescer in list(_coalescers):
+        coalescer.flush()
+
+atexit.register(flush_activity_summaries)
+
+class ActivityCoalescer:
+    """
+    Fold repeated agent activities into periodic summary issues.
+    
+    High-volume events such as "Successful coordinated search" are counted in
+    memory and written as one summary issue when max_events accumulate or the
+    window has been open for interval seconds, instead of one issue per event.
+    Windows still open at interpreter exit are flushed then. With an executor,
+    the max_events flush runs there instead of on the thread adding the event.
+    """
+    
+    def __init__(self, flush_fn, max_events: int = JIRA_SUMMARY_MAX_EVENTS,
+                 interval: float = JIRA_SUMMARY_INTERVAL, max_samples: int = 20,
+                 executor: ThreadPoolExecutor = None):
+        self.flush_fn = flush_fn
+        self.max_events = max_events
+        self.interval = interval
+        self.max_samples = max_samples
+        self.executor = executor
+        
+        self._windows = {}
+        self._lock = threading.Lock()
+        _coalescers.add(self)
+    
+    def add(self, activity: str, details: dict = None):
+        """
+        Record one occurrence of an activity.
+        
+        Args:
+            activity (str): Description of activity
+            details (dict): Additional details
+        """
+        flush_now = False
+        with self._lock:
+            window = self._windows.get(activity)
+            if window is None:
+                window = {
+                    "count": 0,
+                    "started": datetime.now().isoformat(),
+                    "users": set(),
+                    "confidence_total": 0.0,
+                    "confidence_count": 0,
+                    "samples": []
+                }
+                self._windows[activity] = window
+                # Time threshold: flush this window even if no further events arrive
+                timer = threading.Timer(self.interval, self.flush, args=(activity,))
+                timer.daemon = True
+                timer.start()
+                window["timer"] = timer
+            
+            details = details or {}
+            window["count"] += 1
+            if details.get("user_id"):
+                window["users"].add(details["user_id"])
+            if isinstance(details.get("confidence"), (int, float)):
+                window["confidence_total"] += details["confidence"]
+                window["confidence_count"] += 1
+            if len(window["samples"]) < self.max_samples:
+                window["samples"].append(details)
+            
+            flush_now = window["count"] >= self.max_events
+        
+        if flush_now:
+            if self.executor is not None:
+                self.executor.submit(self.flush, activity)
+            else:
+                self.flush(activity)
+    
+    def flush(self, activity: str = None):
+        """
+        Write summary issues for one activity, or for every open window.
+        
+        Args:
+            activity (str): Activity to flush; all activities when omitted
+        """
+        with self._lock:
+            names = [activity] if activity else list(self._windows)
+            windows = [(name, self._windows.pop(name)) for name in names if name in self._windows]
+        
+        for name, window in windows:
+            window["timer"].cancel()
+            confidence = (
+                round(window["confidence_total"] / window["confidence_count"], 1)
+                if window["confidence_count"] else "N/A"
+            )
+            summary = f"Agent Activity Summary: {window['count']} x {name[:40]}"
+            description = f"""
+            Automated agent activity summary
+            
+            Activity: {name}
+            Occurrences: {window['count']}
+            Window: {window['started']} to {datetime.now().isoformat()}
+            Distinct users: {len(window['users'])}
+            Average confidence: {confidence}
+            
+            Sample details:
+            {json.dumps(window['samples'], indent=2, default=str)}
+            
+            Logged by Smart Search agent.
+            """
+            try:
+                self.flush_fn(summary, description)
+            except Exception as e:
+                logger.error(f"Failed to write activity summary for {name}: {str(e)}")
 
 # Agent task management with Jira integration
 class AgentTaskManager:
     """Manage agent tasks and workflows using Jira integration."""
     
-    def __init__(self, project_key: str = "AI"):
+    def __init__(self, project_key: str = "AI", outbox: JiraOutbox = None, use_outbox: bool = JIRA_OUTBOX_ENABLED):
         self.jira = JiraIntegration() if all([JIRA_API_KEY, JIRA_BASE_URL, JIRA_USERNAME]) else None
         self.project_key = project_key
+        
+        # Queue writes in the durable outbox instead of calling Jira on the request path
+        self.outbox = None
+        if self.jira and use_outbox:
+            try:
+                self.outbox = outbox or get_jira_outbox()
+                self.outbox.start(self.jira)
+            except Exception as e:
+                logger.warning(f"Jira outbox unavailable, writing to Jira synchronously: {str(e)}")
+                self.outbox = None
+        
+        # Repeated high-volume activities are written as periodic summary issues; without
+        # the outbox a summary is a synchronous Jira call, so it is written off the request thread
+        self.coalesced_activities = set(JIRA_COALESCED_ACTIVITIES)
+        self.coalescer = ActivityCoalescer(
+            lambda summary, description: self._create_issue(summary, description, priority="Low"),
+            executor=None if self.outbox else get_summary_executor()
+        )
+    
+    def _create_issue(self, summary: str, description: str, priority: str):
+        """
+        Create an issue directly, or queue it in the outbox.
+        
+        Returns:
+            dict: Jira issue details, or {"key": None, "ref": ...} when queued
+        """
+        fields = {
+            "project_key": self.project_key,
+            "summary": summary,
+            "description": description,
+            "issue_type": "Task",
+            "priority": priority
+        }
+        
+        if self.outbox:
+            ref = self.outbox.new_ref()
+            self.outbox.enqueue("create_issue", fields, ref=ref)
+            return {"key": None, "ref": ref, "queued": True}
+        
+        return self.jira.create_issue(**fields)
+    
+    def resolve_task_key(self, task_key: str):
+        """
+        Resolve a task key or local outbox reference to the Jira issue key.
+        
+        Args:
+            task_key (str): Issue key or local outbox reference
+        
+        Returns:
+            str: Jira issue key, or None if the issue has not been created yet
+        """
+        if self.outbox:
+            return self.outbox.resolve(task_key)
+        return task_key
     
     def create_search_task(self, query: str, user_id: str = "default"):
         """
@@ -200,15 +823,9 @@ class AgentTaskManager:
             Task created by Smart Search agent.
             """
             
-            issue = self.jira.create_issue(
-                project_key=self.project_key,
-                summary=summary,
-                description=description,
-                issue_type="Task",
-                priority="Medium"
-            )
+            issue = self._create_issue(summary, description, priority="Medium")
             
-            logger.info(f"Created Jira task {issue.get('key')} for search query")
+            logger.info(f"Created Jira task {issue.get('key') or issue.get('ref')} for search query")
             return issue
         except Exception as e:
             logger.error(f"Failed to create search task in Jira: {str(e)}")
@@ -219,7 +836,7 @@ class AgentTaskManager:
         Update a Jira task with search results.
         
         Args:
-            issue_key (str): Jira issue key
+            issue_key (str): Jira issue key or local outbox reference
             results (dict): Search results
         
         Returns:
@@ -243,12 +860,16 @@ class AgentTaskManager:
             {results.get('verification', 'No verification data')}
             """
             
-            self.jira.add_comment(issue_key, results_comment)
-            
-            # Update issue status
-            self.jira.update_issue(issue_key, {
-                "status": "Done"
-            })
+            if self.outbox:
+                self.outbox.enqueue("add_comment", {"comment": results_comment}, issue=issue_key)
+                self.outbox.enqueue("update_issue", {"fields": {"status": "Done"}}, issue=issue_key)
+            else:
+                self.jira.add_comment(issue_key, results_comment)
+                
+                # Update issue status
+                self.jira.update_issue(issue_key, {
+                    "status": "Done"
+                })
             
             logger.info(f"Updated Jira task {issue_key} with search results")
             return True
@@ -270,6 +891,10 @@ class AgentTaskManager:
         if not self.jira:
             return None
         
+        if activity in self.coalesced_activities:
+            self.coalescer.add(activity, details)
+            return {"key": None, "coalesced": True}
+        
         try:
             summary = f"Agent Activity: {activity[:50]}{'...' if len(activity) > 50 else ''}"
             description = f"""
@@ -283,15 +908,9 @@ class AgentTaskManager:
             Logged by Smart Search agent.
             """
             
-            issue = self.jira.create_issue(
-                project_key=self.project_key,
-                summary=summary,
-                description=description,
-                issue_type="Task",
-                priority="Low"
-            )
+            issue = self._create_issue(summary, description, priority="Low")
             
-            logger.info(f"Logged agent activity in Jira task {issue.get('key')}")
+            logger.info(f"Logged agent activity in Jira task {issue.get('key') or issue.get('ref')}")
             return issue
         except Exception as e:
             logger.error(f"Failed to log agent activity in Jira: {str(e)}")
@@ -0,0 +1,696 @@
+import hashlib
+import json
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    ThreadPoolExecutor, Future, TimeoutError as FutureTimeoutError, wait, FIRST_COMPLETED
+)
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import numpy as np
+from config import (
+    LLM_TIMEOUT, LLM_MAX_CONCURRENCY, LLM_EXECUTOR_WORKERS,
+    LLM_HEDGING_ENABLED, LLM_HEDGE_PERCENTILE, LLM_HEDGE_BUDGET,
+    LLM_HEDGE_MIN_SAMPLES, LLM_LATENCY_WINDOW,
+    LLM_CACHE_ENABLED, LLM_CACHE_TTL, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_PATH
+)
+from utils.cache import TTLCache, SQLiteCacheBackend
+from agents.api_failover import api_failover, is_rate_limit_error, retry_after
+from agents.rate_limiter import RateLimiter, RateLimitExceeded, get_rate_limiter
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+@dataclass
+class LLMProvider:
+    """
+    An LLM agent registered with the engine under its api_failover name.
+    
+    `keyed_agents` maps each key of the provider's api_failover pool to an
+    agent using it; when set, every call takes a key from the pool and a
+    rate limited key spills to the next one.
+    """
+    
+    name: str
+    agent: Any
+    max_concurrency: int = LLM_MAX_CONCURRENCY
+    timeout: float = LLM_TIMEOUT
+    keyed_agents: Dict[str, Any] = field(default_factory=dict)
+
+def build_keyed_agents(keys: List[str], factory: Callable[[Optional[str]], Any]) -> Dict[Optional[str], Any]:
+    """
+    Create one agent per pooled API key.
+    
+    Args:
+        keys (List[str]): Keys of the provider, possibly empty
+        factory (Callable): Builds an agent for an API key
+    
+    Returns:
+        Dict[Optional[str], Any]: Agent per key; a single agent under None when there are no keys
+    """
+    return {key: factory(key) for key in (keys or [None])}
+
+@dataclass
+class LLMResult:
+    """
+    Outcome of one engine call.
+    
+    Exposes `content` like an agno RunResponse, so existing `_extract_content`
+    helpers keep working, plus metadata about how the call was served.
+    """
+    
+    content: Any
+    response: Any
+    provider: str
+    latency: float
+    input_tokens: int = 0
+    output_tokens: int = 0
+    used_fallback: bool = False
+    explored: bool = False
+    hedged: bool = False
+    cached: bool = False
+    errors: List[str] = field(default_factory=list)
+
+def _token_count(metrics: Any, key: str) -> int:
+    """Read a token counter from RunResponse metrics, which may hold a value or a list per model call."""
+    if not isinstance(metrics, dict):
+        return 0
+    value = metrics.get(key, 0)
+    if isinstance(value, list):
+        return int(sum(v or 0 for v in value))
+    return int(value or 0)
+
+def _stream_delta(event: Any) -> Optional[str]:
+    """Text delta of an agno stream event; plain strings pass through and other events are skipped."""
+    if isinstance(event, str):
+        return event
+    if getattr(event, "event", "RunResponseContent") != "RunResponseContent":
+        return None
+    content = getattr(event, "content", None)
+    return content if isinstance(content, str) else None
+
+# Model settings that change what a completion looks like
+_SAMPLING_PARAMS = ("id", "temperature", "top_p", "max_tokens", "seed", "frequency_penalty", "presence_penalty")
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace, so the indentation of triple-quoted prompt templates does not matter."""
+    return " ".join(str(prompt).split())
+
+def completion_key(agent: Any, prompt: str, params: dict = None) -> str:
+    """
+    Build the completion cache key for running a prompt on an agent.
+    
+    The key covers the model id and sampling parameters, a hash of everything
+    the agent adds to the prompt (role, description, instructions, tools), the
+    normalized prompt and any extra Agent.run arguments.
+    
+    Args:
+        agent: Agent the prompt runs on
+        prompt (str): Prompt text
+        params (dict): Extra arguments for Agent.run
+    
+    Returns:
+        str: SHA-256 hex digest
+    """
+    model = getattr(agent, "model", None)
+    sampling = {name: getattr(model, name, None) for name in _SAMPLING_PARAMS}
+    tools = [getattr(tool, "name", type(tool).__name__) for tool in (getattr(agent, "tools", None) or [])]
+    instructions = hashlib.sha256(json.dumps([
+        getattr(agent, "role", None),
+        getattr(agent, "description", None),
+        getattr(agent, "instructions", None),
+        getattr(agent, "expected_output", None),
+        tools
+    ], sort_keys=True, default=str).encode()).hexdigest()
+    
+    payload = json.dumps([sampling, instructions, normalize_prompt(prompt), params or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+# Process-wide completion cache shared by every engine
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache() -> TTLCache:
+    """
+    Get the process-wide LLM completion cache, creating it on first use.
+    
+    Returns:
+        TTLCache: Shared cache, backed by SQLite when LLM_CACHE_PATH is set
+    """
+    global _llm_cache
+    if _llm_cache is None:
+        with _llm_cache_lock:
+            if _llm_cache is None:
+                backend = None
+                if LLM_CACHE_PATH:
+                    try:
+                        backend = SQLiteCacheBackend(LLM_CACHE_PATH, table="llm_completions")
+                    except Exception as e:
+                        logger.warning(f"Persistent LLM cache unavailable, using memory only: {str(e)}")
+                _llm_cache = TTLCache(max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL, backend=backend)
+    return _llm_cache
+
+# Shared worker pool for LLM calls, so timeouts do not block the caller
+_llm_executor = None
+_llm_executor_lock = threading.Lock()
+
+def get_llm_executor() -> ThreadPoolExecutor:
+    """
+    Get the process-wide executor used to run LLM calls, creating it on first use.
+    
+    Returns:
+        ThreadPoolExecutor: Shared executor
+    """
+    global _llm_executor
+    if _llm_executor is None:
+        with _llm_executor_lock:
+            if _llm_executor is None:
+                _llm_executor = ThreadPoolExecutor(max_workers=LLM_EXECUTOR_WORKERS, thread_name_prefix="llm")
+    return _llm_executor
+
+# Concurrency slots per provider, shared by every engine in the process so the
+# limit holds per provider rather than per engine
+_provider_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_provider_semaphores_lock = threading.Lock()
+
+def get_provider_semaphore(provider: LLMProvider,
+                           registry: Dict[str, threading.BoundedSemaphore] = None) -> threading.BoundedSemaphore:
+    """
+    Get the concurrency slots of a provider, creating them on first use.
+    
+    The first engine to register a provider sets its limit.
+    
+    Args:
+        provider (LLMProvider): Provider, keyed by name
+        registry (Dict[str, threading.BoundedSemaphore]): Registry to use; the process-wide one by default
+    
+    Returns:
+        threading.BoundedSemaphore: Slots shared by every engine using the registry
+    """
+    registry = _provider_semaphores if registry is None else registry
+    with _provider_semaphores_lock:
+        semaphore = registry.get(provider.name)
+        if semaphore is None:
+            semaphore = registry[provider.name] = threading.BoundedSemaphore(provider.max_concurrency)
+    return semaphore
+
+class ConcurrencyLimitExceeded(Exception):
+    """Raised when a provider has no free concurrency slot in time; local backpressure, not a provider fault."""
+
+def _check_abandoned(provider: LLMProvider, abandoned: Optional[threading.Event]):
+    """Stop a call before its next attempt once its result is no longer wanted."""
+    if abandoned is not None and abandoned.is_set():
+        raise Exception(f"{provider.name} call abandoned")
+
+class LLMExecutionEngine:
+    """
+    Run prompts against an ordered list of LLM providers with failover.
+    
+    Providers are tried in the order api_failover routes them (best expected
+    completion time first), skipping those in cooldown. Each provider has a
+    concurrency limit, shared by every engine in the process, and a timeout,
+    and every call returns an LLMResult describing which provider answered, so
+    no per-request state is kept on the engine or the agents using it.
+    
+    Completions are cached by model, sampling parameters, agent instructions
+    and normalized prompt, so repeat prompts are answered without a call.
+    
+    With hedging enabled, a primary call that is still running after the
+    configured percentile of its recent latency is duplicated to the next
+    provider and the first good answer wins. Hedges are capped at a fraction
+    of requests so the tail latency drops without doubling cost.
+    """
+    
+    def __init__(self, providers: List[LLMProvider], failover=api_failover, executor: ThreadPoolExecutor = None,
+                 hedging: bool = LLM_HEDGING_ENABLED, hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+                 hedge_budget: float = LLM_HEDGE_BUDGET, hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+                 rate_limiter: RateLimiter = None, use_cache: bool = LLM_CACHE_ENABLED, cache: TTLCache = None,
+                 semaphores: Dict[str, threading.BoundedSemaphore] = None):
+        if not providers:
+            raise ValueError("LLMExecutionEngine needs at least one provider")
+        self.providers = providers
+        self.failover = failover
+        self.executor = executor or get_llm_executor()
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.cache = (cache if cache is not None else get_llm_cache()) if use_cache else None
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.hedge_min_samples = hedge_min_samples
+        self._semaphores = {p.name: get_provider_semaphore(p, semaphores) for p in providers}
+        self._latencies = {p.name: deque(maxlen=LLM_LATENCY_WINDOW) for p in providers}
+        self._lock = threading.Lock()
+        self._stats = {
+            p.name: {"calls": 0, "failures": 0, "timeouts": 0, "rejected": 0, "throttled": 0, "latency": 0.0}
+            for p in providers
+        }
+        self._hedge_stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "running_losers": 0}
+        self._cache_stats = {"hits": 0, "misses": 0}
+        self._stream_stats = {"streams": 0, "first_token": 0.0}
+    
+    def _ordered_providers(self) -> Tuple[List[LLMProvider], bool, Optional[str]]:
+        """
+        Providers not in cooldown, in api_failover's routing order; all of them if every one is cooling down.
+        
+        Returns:
+            tuple: (providers, routed, explored); routed is False for the cooling-down fallback,
+                explored names the provider api_failover moved to the front to measure it
+        """
+        by_name = {p.name: p for p in self.providers}
+        apis = [api for api in self.failover.get_available_apis("llm") if api["name"] in by_name]
+        if not apis:
+            return list(self.providers), False, None
+        explored = next((api["name"] for api in apis if api.get("explored")), None)
+        return [by_name[api["name"]] for api in apis], True, explored
+    
+    def _claim(self, provider: LLMProvider, routed: bool, errors: List[str]) -> bool:
+        """
+        Clear a provider right before sending it a request, taking its probe slot if it is half-open.
+        
+        Providers tried only because every one is cooling down are not held back.
+        """
+        if not routed or self.failover.claim_probe(provider.name):
+            return True
+        errors.append(f"{provider.name}: probe already in flight")
+        return False
+    
+    def _record(self, provider: str, outcome: str, latency: float = 0.0):
+        with self._lock:
+            stats = self._stats[provider]
+            if outcome == "success":
+                stats["calls"] += 1
+                stats["latency"] += latency
+            else:
+                stats[outcome] += 1
+    
+    def _fail(self, provider: str, error: Exception, errors: List[str], latency: float = None):
+        """Record a failed provider call; local throttling and backpressure are not held against the provider's health."""
+        logger.warning(f"LLM provider {provider} failed: {str(error)}")
+        errors.append(f"{provider}: {str(error)}")
+        if isinstance(error, RateLimitExceeded):
+            self._record(provider, "throttled")
+            return
+        if isinstance(error, ConcurrencyLimitExceeded):
+            # Already counted as rejected when the slot was not acquired
+            return
+        self._record(provider, "failures")
+        self.failover.report_failure(provider, latency)
+    
+    def _submit(self, provider: LLMProvider, prompt: str, block: bool = True, abandoned: threading.Event = None,
+                **kwargs) -> Future:
+        """Start one provider call under its concurrency limit; setting abandoned stops it before its next attempt."""
+        semaphore = self._semaphores[provider.name]
+        acquired = semaphore.acquire(timeout=provider.timeout) if block else semaphore.acquire(blocking=False)
+        if not acquired:
+            self._record(provider.name, "rejected")
+            raise ConcurrencyLimitExceeded(f"{provider.name} concurrency limit reached")
+        
+        started = time.perf_counter()
+        try:
+            future = self.executor.submit(self._run_agent, provider, prompt, abandoned, **kwargs)
+        except Exception:
+            semaphore.release()
+            raise
+        
+        def finished(done: Future):
+            # The slot is freed when the call really finishes, even after a timeout
+            semaphore.release()
+            # Every completed call feeds the latency window, including hedge losers
+            if not done.cancelled() and done.exception() is None:
+                with self._lock:
+                    self._latencies[provider.name].append(time.perf_counter() - started)
+        
+        future.add_done_callback(finished)
+        return future
+    
+    def _limited_run(self, provider: LLMProvider, agent: Any, prompt: str, **kwargs):
+        """Run an agent once the shared rate limiter has capacity, then settle its actual token use."""
+        # Roughly four characters per token until the response reports real usage
+        estimate = len(str(prompt)) // 4
+        self.rate_limiter.acquire(provider.name, tokens=estimate)
+        response = agent.run(prompt, **kwargs)
+        
+        metrics = getattr(response, "metrics", None)
+        used = _token_count(metrics, "input_tokens") + _token_count(metrics, "output_tokens")
+        self.rate_limiter.record_tokens(provider.name, used - estimate)
+        return response
+    
+    def _run_agent(self, provider: LLMProvider, prompt: str, abandoned: threading.Event = None, **kwargs):
+        """Run the provider's agent, rotating through its pooled keys on rate limits."""
+        if not provider.keyed_agents or None in provider.keyed_agents:
+            _check_abandoned(provider, abandoned)
+            return self._limited_run(provider, provider.agent, prompt, **kwargs)
+        
+        tried = set()
+        last_error = None
+        while True:
+            # A call whose race is already decided does not take another key
+            _check_abandoned(provider, abandoned)
+            key = self.failover.acquire_key(provider.name, exclude=tried, timeout=provider.timeout)
+            if key is None:
+                raise last_error or Exception(f"No {provider.name} key available")
+            tried.add(key)
+            
+            try:
+                return self._limited_run(provider, provider.keyed_agents.get(key, provider.agent), prompt, **kwargs)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                self.failover.report_rate_limited(provider.name, key, retry_after(e))
+                last_error = e
+            finally:
+                self.failover.release_key(provider.name, key)
+    
+    def _stream_agent(self, provider: LLMProvider, prompt: str, **kwargs) -> Iterator[str]:
+        """Stream text deltas from the provider's agent, holding its concurrency slot and a pooled key."""
+        semaphore = self._semaphores[provider.name]
+        if not semaphore.acquire(timeout=provider.timeout):
+            self._record(provider.name, "rejected")
+            raise ConcurrencyLimitExceeded(f"{provider.name} concurrency limit reached")
+        
+        key = None
+        try:
+            agent = provider.agent
+            if provider.keyed_agents and None not in provider.keyed_agents:
+                key = self.failover.acquire_key(provider.name, timeout=provider.timeout)
+                if key is None:
+                    raise Exception(f"No {provider.name} key available")
+                agent = provider.keyed_agents.get(key, provider.agent)
+            
+            self.rate_limiter.acquire(provider.name, tokens=len(str(prompt)) // 4)
+            for event in agent.run(prompt, stream=True, **kwargs):
+                delta = _stream_delta(event)
+                if delta:
+                    yield delta
+        except Exception as e:
+            if key is not None and is_rate_limit_error(e):
+                self.failover.report_rate_limited(provider.name, key, retry_after(e))
+            raise
+        finally:
+            if key is not None:
+                self.failover.release_key(provider.name, key)
+            semaphore.release()
+    
+    def _call(self, provider: LLMProvider, prompt: str, **kwargs):
+        """Run one provider call under its concurrency limit and timeout."""
+        future = self._submit(provider, prompt, **kwargs)
+        try:
+            return future.result(timeout=provider.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            self._record(provider.name, "timeouts")
+            raise Exception(f"{provider.name} timed out after {provider.timeout}s")
+    
+    def _hedge_delay(self, provider: str) -> Optional[float]:
+        """Configured percentile of the provider's recent latency, or None without enough samples."""
+        with self._lock:
+            samples = list(self._latencies[provider])
+        if len(samples) < self.hedge_min_samples:
+            return None
+        return float(np.percentile(samples, self.hedge_percentile))
+    
+    def _take_hedge(self) -> bool:
+        """Spend hedge budget if the hedge rate, counting losers still running, stays within it."""
+        with self._lock:
+            spent = self._hedge_stats["hedges"] + self._hedge_stats["running_losers"]
+            if spent + 1 > self.hedge_budget * self._hedge_stats["requests"]:
+                return False
+            self._hedge_stats["hedges"] += 1
+            return True
+    
+    def _abandon(self, losers, abandoned: threading.Event):
+        """
+        Cancel calls whose race is decided.
+        
+        A loser that is already running cannot be interrupted; it holds its
+        concurrency slot and key until it returns, so it counts against the
+        hedge budget until then.
+        """
+        abandoned.set()
+        for loser in losers:
+            if loser.cancel():
+                continue
+            with self._lock:
+                self._hedge_stats["running_losers"] += 1
+            loser.add_done_callback(self._loser_finished)
+    
+    def _loser_finished(self, future: Future):
+        with self._lock:
+            self._hedge_stats["running_losers"] -= 1
+    
+    def _run_hedged(self, primary: LLMProvider, secondary: LLMProvider, prompt: str, errors: List[str],
+                    routed: bool = True, **kwargs):
+        """
+        Run the primary, duplicating to the secondary if it is slow.
+        
+        Returns:
+            tuple: (provider, response, latency, hedged, tried provider names); provider is None if all tried failed
+        """
+        with self._lock:
+            self._hedge_stats["requests"] += 1
+        delay = self._hedge_delay(primary.name)
+        
+        started = time.perf_counter()
+        abandoned = threading.Event()
+        futures = {self._submit(primary, prompt, abandoned=abandoned, **kwargs): primary}
+        deadline = started + primary.timeout
+        hedged = False
+        
+        if delay is not None:
+            done, _ = wait(futures, timeout=delay)
+            if not done and self._take_hedge():
+                try:
+                    if not self._claim(secondary, routed, []):
+                        raise Exception(f"{secondary.name} probe already in flight")
+                    futures[self._submit(secondary, prompt, block=False, abandoned=abandoned, **kwargs)] = secondary
+                    hedged = True
+                    deadline = max(deadline, time.perf_counter() + secondary.timeout)
+                    logger.info(f"{primary.name} slower than {delay:.2f}s, hedging with {secondary.name}")
+                except Exception as e:
+                    logger.warning(f"Could not hedge with {secondary.name}: {str(e)}")
+        
+        tried = [provider.name for provider in futures.values()]
+        while futures:
+            done, _ = wait(futures, timeout=max(0.0, deadline - time.perf_counter()), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                provider = futures.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    self._fail(provider.name, e, errors)
+                    continue
+                
+                # First good answer wins; the loser is stopped as soon as it can be
+                self._abandon(futures, abandoned)
+                if hedged and provider is secondary:
+                    with self._lock:
+                        self._hedge_stats["hedge_wins"] += 1
+                return provider, response, time.perf_counter() - started, hedged, tried
+        
+        self._abandon(futures, abandoned)
+        for provider in futures.values():
+            self._record(provider.name, "timeouts")
+            self._record(provider.name, "failures")
+            self.failover.report_failure(provider.name, time.perf_counter() - started)
+            errors.append(f"{provider.name}: timed out after {provider.timeout}s")
+        return None, None, 0.0, hedged, tried
+    
+    def _result(self, provider: LLMProvider, response: Any, latency: float, errors: List[str],
+                hedged: bool = False, explored: str = None) -> LLMResult:
+        """Record a success and describe it; an exploration pick that answered is not a fallback."""
+        self._record(provider.name, "success", latency)
+        self.failover.report_success(provider.name, latency)
+        
+        metrics = getattr(response, "metrics", None)
+        return LLMResult(
+            content=getattr(response, "content", response),
+            response=response,
+            provider=provider.name,
+            latency=round(latency, 4),
+            input_tokens=_token_count(metrics, "input_tokens"),
+            output_tokens=_token_count(metrics, "output_tokens"),
+            used_fallback=provider.name not in (self.providers[0].name, explored),
+            explored=provider.name == explored,
+            hedged=hedged,
+            errors=errors
+        )
+    
+    def _cache_lookup(self, providers: List[LLMProvider], prompt: str, kwargs: dict):
+        """Find a cached completion for any of the providers' agents; returns (result, keys per provider)."""
+        started = time.perf_counter()
+        keys = {}
+        for provider in providers:
+            key = keys[provider.name] = completion_key(provider.agent, prompt, kwargs)
+            cached = self.cache.get(key)
+            if cached is not None:
+                with self._lock:
+                    self._cache_stats["hits"] += 1
+                return LLMResult(
+                    content=cached["content"],
+                    response=None,
+                    provider=provider.name,
+                    latency=round(time.perf_counter() - started, 6),
+                    cached=True
+                ), keys
+        with self._lock:
+            self._cache_stats["misses"] += 1
+        return None, keys
+    
+    def run(self, prompt: str, **kwargs) -> LLMResult:
+        """
+        Execute a prompt, answering from the completion cache or failing over (or hedging) between providers.
+        
+        Args:
+            prompt (str): Prompt to run
+            **kwargs: Extra arguments for Agent.run
+        
+        Returns:
+            LLMResult: Response with provider, latency, token, fallback and cache metadata
+        
+        Raises:
+            Exception: If every provider fails
+        """
+        providers, routed, explored = self._ordered_providers()
+        if self.cache is None:
+            return self._execute(prompt, providers, routed, explored, **kwargs)
+        
+        result, keys = self._cache_lookup(providers, prompt, kwargs)
+        if result is not None:
+            return result
+        
+        result = self._execute(prompt, providers, routed, explored, **kwargs)
+        if isinstance(result.content, str) and result.provider in keys:
+            self.cache.set(keys[result.provider], {"content": result.content})
+        return result
+    
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """
+        Execute a prompt, yielding text as the provider produces it.
+        
+        Providers are tried in routing order until one produces its first token;
+        after that a failure ends the stream, since the text already yielded
+        cannot be taken back. Cached completions are yielded as one chunk.
+        Hedging and the per-call timeout do not apply, because the call runs in
+        the consuming thread.
+        
+        Use as `result = yield from engine.stream(prompt)` to get the LLMResult.
+        
+        Args:
+            prompt (str): Prompt to run
+            **kwargs: Extra arguments for Agent.run
+        
+        Yields:
+            str: Text deltas
+        
+        Returns:
+            LLMResult: The complete response with provider, latency and fallback metadata
+        
+        Raises:
+            Exception: If every provider fails before its first token, or one fails mid-stream
+        """
+        providers, routed, explored = self._ordered_providers()
+        keys = {}
+        if self.cache is not None:
+            cached, keys = self._cache_lookup(providers, prompt, kwargs)
+            if cached is not None:
+                if cached.content:
+                    yield cached.content
+                return cached
+        
+        errors = []
+        for provider in providers:
+            if not self._claim(provider, routed, errors):
+                continue
+            started = time.perf_counter()
+            chunks = []
+            try:
+                logger.info(f"Streaming prompt with {provider.name}")
+                for chunk in self._stream_agent(provider, prompt, **kwargs):
+                    if not chunks:
+                        with self._lock:
+                            self._stream_stats["streams"] += 1
+                            self._stream_stats["first_token"] += time.perf_counter() - started
+                    chunks.append(chunk)
+                    yield chunk
+            except GeneratorExit:
+                # The consumer walked away: the call neither succeeded nor failed, so hand back the probe slot
+                if routed:
+                    self.failover.release_probe(provider.name)
+                raise
+            except Exception as e:
+                self._fail(provider.name, e, errors, time.perf_counter() - started)
+                if chunks:
+                    raise Exception(f"{provider.name} failed mid-stream: {str(e)}")
+                continue
+            
+            result = self._result(provider, "".join(chunks), time.perf_counter() - started, errors, explored=explored)
+            if self.cache is not None and provider.name in keys:
+                self.cache.set(keys[provider.name], {"content": result.content})
+            return result
+        
+        raise Exception(f"All LLM providers failed. {'; '.join(errors)}")
+    
+    def _execute(self, prompt: str, providers: List[LLMProvider], routed: bool = True, explored: str = None,
+                 **kwargs) -> LLMResult:
+        """Run a prompt on the providers, in order, with hedging when enabled."""
+        errors = []
+        
+        if self.hedging and len(providers) > 1:
+            tried = [providers[0].name]
+            if self._claim(providers[0], routed, errors):
+                try:
+                    provider, response, latency, hedged, tried = self._run_hedged(
+                        providers[0], providers[1], prompt, errors, routed, **kwargs
+                    )
+                except Exception as e:
+                    self._fail(providers[0].name, e, errors)
+                    provider = None
+                if provider is not None:
+                    return self._result(provider, response, latency, errors, hedged, explored)
+            providers = [p for p in providers if p.name not in tried]
+        
+        for provider in providers:
+            if not self._claim(provider, routed, errors):
+                continue
+            started = time.perf_counter()
+            try:
+                logger.info(f"Running prompt with {provider.name}")
+                response = self._call(provider, prompt, **kwargs)
+            except Exception as e:
+                self._fail(provider.name, e, errors, time.perf_counter() - started)
+                continue
+            
+            return self._result(provider, response, time.perf_counter() - started, errors, explored=explored)
+        
+        raise Exception(f"All LLM providers failed. {'; '.join(errors)}")
+    
+    def stats(self) -> dict:
+        """
+        Get per-provider counters.
+        
+        Returns:
+            dict: Calls, failures, timeouts, rejections and average latency per provider,
+                plus hedge counters under "hedging", completion cache counters under "cache"
+                and streams with their average time to first token under "streaming"
+        """
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+            hedging = dict(self._hedge_stats)
+        for values in stats.values():
+            total = values.pop("latency")
+            values["avg_latency"] = round(total / values["calls"], 4) if values["calls"] else 0.0
+        hedging["enabled"] = self.hedging
+        hedging["rate"] = round(hedging["hedges"] / hedging["requests"], 4) if hedging["requests"] else 0.0
+        stats["hedging"] = hedging
+        with self._lock:
+            stats["cache"] = dict(self._cache_stats, enabled=self.cache is not None)
+            streaming = dict(self._stream_stats)
+        first_token = streaming.pop("first_token")
+        streaming["avg_first_token"] = round(first_token / streaming["streams"], 4) if streaming["streams"] else 0.0
+        stats["streaming"] = streaming
+        return stats
@@ -6,6 +6,8 @@ from config import (
     OPENROUTER_API_KEY, OPENROUTER_BASE_URL, OPENROUTER_MODEL,
     OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL
 )
+from agents.llm_engine import LLMExecutionEngine, LLMProvider
+from agents.streaming import token_event, stream_tokens, forward_tokens, trailing_events
 import json
 from datetime import datetime
 import logging
@@ -33,6 +35,7 @@ class PersonalizationEngine:
                 "Adapt response tone/style to user preferences"
             ]
         )
+        self.engine = LLMExecutionEngine([LLMProvider("openrouter", self.agent)])
         self.user_profiles = {}
     
     def _extract_content(self, response):
@@ -94,7 +97,7 @@ class PersonalizationEngine:
                 Identify top 5 user interests/topics.
                 Also determine preferred communication style (formal/casual/technical).
                 """
-                interests = self.agent.run(interests_prompt)
+                interests = self.engine.run(interests_prompt)
                 # Extract content from RunResponse if needed
                 interests_content = self._extract_content(interests)
                 profile["interests"] = interests_content
@@ -103,17 +106,14 @@ class PersonalizationEngine:
         
         return profile
     
-    def personalize_results(self, user_id: str, search_results: str, query: str = ""):
-        """Re-rank and adapt results based on user profile"""
+    def _personalization_prompt(self, user_id: str, search_results_content: str, query: str = ""):
+        """Build the re-ranking prompt, or None when the user has no profile data"""
         profile = self.user_profiles.get(user_id, {})
         
         if not profile.get("interests") and not profile.get("preferred_tone"):
-            return search_results
+            return None
         
-        # Extract content from search_results if it's a RunResponse
-        search_results_content = self._extract_content(search_results)
-        
-        personalization_prompt = f"""
+        return f"""
         User interests: {profile.get('interests', 'Not available')}
         Preferred tone: {profile.get('preferred_tone', 'neutral')}
         Preferred depth: {profile.get('preferred_depth', 'standard')}
@@ -133,12 +133,44 @@ class PersonalizationEngine:
         5. Maintain factual accuracy
         6. Consider user feedback in personalization
         """
+    
+    def personalize_results(self, user_id: str, search_results: str, query: str = ""):
+        """Re-rank and adapt results based on user profile"""
+        # Extract content from search_results if it's a RunResponse
+        search_results_content = self._extract_content(search_results)
+        
+        personalization_prompt = self._personalization_prompt(user_id, search_results_content, query)
+        if personalization_prompt is None:
+            return search_results
+        
+        try:
+            return self.engine.run(personalization_prompt)
+        except Exception as e:
+            logger.warning(f"Personalization failed: {str(e)}")
+            return search_results_content
+    
+    def personalize_results_stream(self, user_id: str, search_results: str, query: str = ""):
+        """Re-rank and adapt results, yielding token events; returns the personalized content"""
+        search_results_content = self._extract_content(search_results)
         
+        personalization_prompt = self._personalization_prompt(user_id, search_results_content, query)
+        if personalization_prompt is None:
+            yield token_event(search_results_content)
+            return search_results_content
+        
+        streamed = []
         try:
-            return self.agent.run(personalization_prompt)
+            for event in stream_tokens(self.engine.stream(personalization_prompt)):
+                streamed.append(event["content"])
+                yield event
         except Exception as e:
+            if streamed:
+                raise
+            # Nothing was sent yet, so the unpersonalized results can still be used
             logger.warning(f"Personalization failed: {str(e)}")
+            yield token_event(search_results_content)
             return search_results_content
+        return "".join(streamed)
 
 # Main search with all features
 class PersonalizedSmartSearch:
@@ -148,13 +180,13 @@ class PersonalizedSmartSearch:
         self.search_agent = DSPyOptimizedSearchAgent()
         self.personalization = PersonalizationEngine()
     
-    def search(self, query: str, user_id: str = "default"):
+    def search(self, query: str, user_id: str = "default", evidence=None):
         """Complete search pipeline with personalization"""
         # Track query
         self.personalization.update_profile(user_id, {"query": query})
         
         # Search with verification and optimization
-        search_result = self.search_agent.search(query, user_id)
+        search_result = self.search_agent.search(query, user_id, evidence=evidence)
         
         # Extract content from search results
         search_results_content = self.search_agent.base_agent._extract_content(search_result)
@@ -194,4 +226,44 @@ class PersonalizedSmartSearch:
                 "verification": "Standard search results",
                 "confidence": 80,  # Default confidence for standard results
                 "personalized": False
-            }
\ No newline at end of file
+            }
+    
+    def search_stream(self, query: str, user_id: str = "default", evidence=None):
+        """
+        Complete search pipeline with personalization, streaming the final LLM call.
+        
+        For the default user that is the search call. For known users it is the
+        personalization rewrite, so the search itself runs to completion first.
+        
+        Args:
+            query (str): Search query
+            user_id (str): User identifier
+            evidence (EvidenceContext): Request-scoped evidence shared with other stages
+        
+        Yields:
+            dict: Token events, then the verification and result events
+        """
+        # Track query
+        self.personalization.update_profile(user_id, {"query": query})
+        
+        if user_id == "default":
+            result = yield from forward_tokens(self.search_agent.search_stream(query, user_id, evidence=evidence))
+            result["personalized"] = False
+            yield from trailing_events(result)
+            return
+        
+        search_result = self.search_agent.search(query, user_id, evidence=evidence)
+        if not isinstance(search_result, dict):
+            search_result = {
+                "results": self.search_agent.base_agent._extract_content(search_result),
+                "verification": "Personalized results",
+                "confidence": 85  # Default confidence for personalized results
+            }
+        
+        search_result["results"] = yield from self.personalization.personalize_results_stream(
+            user_id,
+            search_result.get("results", ""),
+            query
+        )
+        search_result["personalized"] = True
+        yield from trailing_events(search_result)
@@ -0,0 +1,196 @@
+import json
+import re
+import threading
+from typing import Optional
+import numpy as np
+from config import (
+    QUERY_COMPLEXITY_SKIP_BELOW, QUERY_COMPLEXITY_SEPARATE_ABOVE, QUERY_COMPLEXITY_MODEL_PATH
+)
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Reasoning modes, from cheapest to most expensive
+SKIP = "skip"          # search directly
+FOLD = "fold"          # ask for the analysis inside the search prompt (one call)
+SEPARATE = "separate"  # separate reasoning call before the search call
+MODES = (SKIP, FOLD, SEPARATE)
+
+_PATTERNS = {
+    "comparison": re.compile(r"\b(compare|comparison|vs\.?|versus|difference(s)? between|better than|pros and cons|trade-?offs?)\b", re.IGNORECASE),
+    "causal": re.compile(r"\b(why|how (does|do|did|can|could|would)|explain|impact|effects?|causes?|relationship|implications?)\b", re.IGNORECASE),
+    "open_ended": re.compile(r"\b(strateg(y|ies)|recommend\w*|should (i|we)|best way|plan|analy[sz]e|evaluate|assess|predict)\b", re.IGNORECASE),
+    "constraints": re.compile(r"\b(\d{4}|between|without|except|only|under|within|given|assuming)\b", re.IGNORECASE),
+    "lookup": re.compile(r"^\s*(what|who|when|where) (is|was|are|were)\b|^\s*(define|definition of|capital of|population of)\b|\b(meaning of|stands for)\b", re.IGNORECASE)
+}
+_CLAUSE_PATTERN = re.compile(r",|;|\b(and|or|but|while|whereas|then|if)\b", re.IGNORECASE)
+
+FEATURES = ("words", "clauses", "questions", "comparison", "causal", "open_ended", "constraints", "lookup")
+
+# Hand-tuned weights used when no trained model is configured
+_HEURISTIC_WEIGHTS = np.array([0.25, 0.15, 0.25, 0.35, 0.4, 0.3, 0.1, -0.3])
+
+def query_features(query: str) -> np.ndarray:
+    """
+    Extract the classifier feature vector of a query.
+    
+    Args:
+        query (str): Search query
+    
+    Returns:
+        np.ndarray: Feature values in [0, 1], in FEATURES order
+    """
+    words = len(query.split())
+    values = [
+        min(words / 30.0, 1.0),
+        min(len(_CLAUSE_PATTERN.findall(query)) / 3.0, 1.0),
+        1.0 if query.count("?") > 1 else 0.0
+    ]
+    values.extend(1.0 if _PATTERNS[name].search(query) else 0.0 for name in FEATURES[3:])
+    return np.array(values)
+
+class QueryComplexityClassifier:
+    """
+    Decide per query whether the search needs a reasoning pass.
+    
+    Queries are scored in [0, 1] from cheap lexical features, either with
+    hand-tuned weights or with an optional logistic regression model loaded
+    from JSON ({"bias": b, "weights": {feature: w}}). Low scores skip the
+    reasoning call, mid scores fold the analysis into the search prompt and
+    high scores keep the separate reasoning call. Decisions and reasoning call
+    latencies are counted so the latency saved can be reported.
+    """
+    
+    def __init__(self, skip_below: float = QUERY_COMPLEXITY_SKIP_BELOW,
+                 separate_above: float = QUERY_COMPLEXITY_SEPARATE_ABOVE,
+                 model_path: str = QUERY_COMPLEXITY_MODEL_PATH, model: Optional[dict] = None):
+        if not 0 <= skip_below <= separate_above <= 1:
+            raise ValueError(f"Invalid query complexity thresholds: {skip_below}, {separate_above}")
+        self.skip_below = skip_below
+        self.separate_above = separate_above
+        self._bias, self._weights = self._load_model(model, model_path)
+        self._lock = threading.Lock()
+        self._decisions = {mode: 0 for mode in MODES}
+        self._forced = 0
+        self._reasoning_calls = 0
+        self._reasoning_latency = 0.0
+    
+    @staticmethod
+    def _load_model(model: Optional[dict], model_path: str):
+        """Read logistic regression weights; (None, None) selects the heuristic weights."""
+        if model is None and model_path:
+            try:
+                with open(model_path) as f:
+                    model = json.load(f)
+            except Exception as e:
+                logger.warning(f"Failed to load query complexity model from {model_path}: {str(e)}")
+                return None, None
+        if model is None:
+            return None, None
+        weights = np.array([float(model.get("weights", {}).get(name, 0.0)) for name in FEATURES])
+        return float(model.get("bias", 0.0)), weights
+    
+    @property
+    def uses_model(self) -> bool:
+        return self._weights is not None
+    
+    def score(self, query: str) -> float:
+        """
+        Score how much a query benefits from a reasoning pass.
+        
+        Args:
+            query (str): Search query
+        
+        Returns:
+            float: Complexity in [0, 1]
+        """
+        features = query_features(query)
+        if self._weights is not None:
+            return float(1.0 / (1.0 + np.exp(-(self._bias + features @ self._weights))))
+        return float(np.clip(features @ _HEURISTIC_WEIGHTS, 0.0, 1.0))
+    
+    def decide(self, query: str, use_reasoning: Optional[bool] = None) -> str:
+        """
+        Pick the reasoning mode of a search.
+        
+        Args:
+            query (str): Search query
+            use_reasoning (Optional[bool]): True forces a separate reasoning call, False
+                skips it, None lets the classifier decide
+        
+        Returns:
+            str: SKIP, FOLD or SEPARATE
+        """
+        if use_reasoning is not None:
+            mode = SEPARATE if use_reasoning else SKIP
+        else:
+            complexity = self.score(query)
+            if complexity < self.skip_below:
+                mode = SKIP
+            elif complexity < self.separate_above:
+                mode = FOLD
+            else:
+                mode = SEPARATE
+        with self._lock:
+            if use_reasoning is None:
+                self._decisions[mode] += 1
+            else:
+                self._forced += 1
+        return mode
+    
+    def record_reasoning_latency(self, seconds: float):
+        """
+        Record the latency of a separate reasoning call.
+        
+        Args:
+            seconds (float): Call latency; cached responses should not be recorded
+        """
+        with self._lock:
+            self._reasoning_calls += 1
+            self._reasoning_latency += seconds
+    
+    def stats(self) -> dict:
+        """
+        Get decision counters.
+        
+        Returns:
+            dict: Decisions per mode, forced decisions, the share of classified queries that
+                avoided a separate reasoning call, average reasoning latency and the latency
+                saved by avoiding it (estimated from that average)
+        """
+        with self._lock:
+            decisions = dict(self._decisions)
+            forced = self._forced
+            calls = self._reasoning_calls
+            latency = self._reasoning_latency
+        classified = sum(decisions.values())
+        avoided = decisions[SKIP] + decisions[FOLD]
+        avg_latency = latency / calls if calls else 0.0
+        return {
+            "decisions": decisions,
+            "forced": forced,
+            "model": self.uses_model,
+            "skip_rate": round(avoided / classified, 4) if classified else 0.0,
+            "avg_reasoning_latency": round(avg_latency, 4),
+            "estimated_latency_saved": round(avoided * avg_latency, 4)
+        }
+
+# Global classifier instance
+_query_classifier = None
+_query_classifier_lock = threading.Lock()
+
+def get_query_classifier() -> QueryComplexityClassifier:
+    """
+    Get the process-wide query complexity classifier, creating it on first use.
+    
+    Returns:
+        QueryComplexityClassifier: Shared classifier
+    """
+    global _query_classifier
+    if _query_classifier is None:
+        with _query_classifier_lock:
+            if _query_classifier is None:
+                _query_classifier = QueryComplexityClassifier()
+    return _query_classifier
@@ -0,0 +1,275 @@
+import asyncio
+import threading
+import time
+from typing import Dict
+from config import RATE_LIMITS, RATE_LIMIT_MODE, RATE_LIMIT_TIMEOUT
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    Thread-safe token bucket.
+    
+    Holds up to `capacity` tokens and refills at `rate` tokens per second. A
+    rate of zero or less disables limiting, so every acquire succeeds.
+    """
+    
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+    
+    def _refill(self, now: float):
+        """Add the tokens earned since the last update. Caller holds the lock."""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+    
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        """
+        Take tokens if they are available right now.
+        
+        Args:
+            tokens (float): Tokens to take
+        
+        Returns:
+            bool: True if the tokens were taken
+        """
+        if self.unlimited:
+            return True
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+    
+    def wait_time(self, tokens: float = 1.0) -> float:
+        """
+        Seconds until the tokens could be taken.
+        
+        Args:
+            tokens (float): Tokens wanted
+        
+        Returns:
+            float: 0 when available now
+        """
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            missing = min(tokens, self.capacity) - self._tokens
+            return max(0.0, missing / self.rate)
+    
+    def available(self) -> float:
+        """Tokens currently in the bucket."""
+        if self.unlimited:
+            return float("inf")
+        with self._lock:
+            self._refill(time.monotonic())
+            return self._tokens
+    
+    def consume(self, tokens: float):
+        """
+        Take tokens unconditionally, possibly leaving the bucket in deficit.
+        
+        Used to settle usage that is only known after a call, such as the
+        tokens an LLM response actually used.
+        """
+        if self.unlimited or tokens <= 0:
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= tokens
+
+class RateLimitExceeded(Exception):
+    """Raised when a fail-fast acquire finds no capacity, or a blocking one times out."""
+
+class RateLimiter:
+    """
+    Client-side rate limits shared by every outbound API client.
+    
+    Each provider has a requests-per-second bucket and, optionally, a
+    tokens-per-minute bucket. Callers either block until both have capacity,
+    await it from an event loop, or fail fast. The number of callers waiting
+    per provider is tracked so queue depth can be observed from status.
+    """
+    
+    MODES = ("block", "fail_fast")
+    
+    def __init__(self, limits: Dict[str, dict] = None, mode: str = RATE_LIMIT_MODE,
+                 timeout: float = RATE_LIMIT_TIMEOUT):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown rate limit mode: {mode}")
+        self.mode = mode
+        self.timeout = timeout
+        self._providers = {}
+        self._lock = threading.Lock()
+        for provider, limit in (limits or {}).items():
+            self.configure(provider, **limit)
+    
+    def configure(self, provider: str, requests_per_second: float = 0.0, tokens_per_minute: float = 0.0,
+                  burst: float = None):
+        """
+        Set the limits of a provider.
+        
+        Args:
+            provider (str): Provider name, e.g. "openrouter" or "serper"
+            requests_per_second (float): Request rate, 0 for unlimited
+            tokens_per_minute (float): LLM token rate, 0 for unlimited
+            burst (float): Requests allowed in a burst; defaults to one second's worth
+        """
+        with self._lock:
+            self._providers[provider] = self._new_state(requests_per_second, tokens_per_minute, burst)
+    
+    @staticmethod
+    def _new_state(requests_per_second: float = 0.0, tokens_per_minute: float = 0.0, burst: float = None) -> dict:
+        return {
+            "requests": TokenBucket(requests_per_second, burst),
+            "tokens": TokenBucket(tokens_per_minute / 60.0, tokens_per_minute or None),
+            "lock": threading.Lock(),
+            "stats": {"acquired": 0, "throttled": 0, "rejected": 0, "waiting": 0, "max_waiting": 0}
+        }
+    
+    def _get(self, provider: str) -> dict:
+        with self._lock:
+            if provider not in self._providers:
+                # Unknown providers are unlimited but still counted
+                self._providers[provider] = self._new_state()
+            return self._providers[provider]
+    
+    def _try(self, state: dict, tokens: float) -> float:
+        """Take a request and tokens if both are available; otherwise return the wait in seconds."""
+        with state["lock"]:
+            wait = max(state["requests"].wait_time(1), state["tokens"].wait_time(tokens) if tokens else 0.0)
+            if wait > 0:
+                return wait
+            state["requests"].consume(1)
+            state["tokens"].consume(tokens)
+            state["stats"]["acquired"] += 1
+            return 0.0
+    
+    def _waiting(self, state: dict, delta: int):
+        with state["lock"]:
+            stats = state["stats"]
+            stats["waiting"] += delta
+            stats["max_waiting"] = max(stats["max_waiting"], stats["waiting"])
+    
+    def _reject(self, state: dict, provider: str, message: str):
+        with state["lock"]:
+            state["stats"]["rejected"] += 1
+        raise RateLimitExceeded(f"{provider} {message}")
+    
+    def acquire(self, provider: str, tokens: float = 0, mode: str = None, timeout: float = None):
+        """
+        Wait for capacity to make one request.
+        
+        Args:
+            provider (str): Provider name
+            tokens (float): Estimated LLM tokens the request will use
+            mode (str): "block" or "fail_fast"; defaults to the limiter's mode
+            timeout (float): Longest wait when blocking; defaults to the limiter's timeout
+        
+        Raises:
+            RateLimitExceeded: When failing fast without capacity, or on timeout
+        """
+        state = self._get(provider)
+        wait = self._try(state, tokens)
+        if wait == 0:
+            return
+        if (mode or self.mode) == "fail_fast":
+            self._reject(state, provider, "rate limit reached")
+        
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with state["lock"]:
+            state["stats"]["throttled"] += 1
+        self._waiting(state, 1)
+        try:
+            while wait > 0:
+                if time.monotonic() + wait > deadline:
+                    self._reject(state, provider, "rate limit wait timed out")
+                time.sleep(wait)
+                wait = self._try(state, tokens)
+        finally:
+            self._waiting(state, -1)
+    
+    async def acquire_async(self, provider: str, tokens: float = 0, mode: str = None, timeout: float = None):
+        """
+        Wait for capacity without blocking the event loop.
+        
+        Args:
+            provider (str): Provider name
+            tokens (float): Estimated LLM tokens the request will use
+            mode (str): "block" (await) or "fail_fast"; defaults to the limiter's mode
+            timeout (float): Longest wait; defaults to the limiter's timeout
+        
+        Raises:
+            RateLimitExceeded: When failing fast without capacity, or on timeout
+        """
+        state = self._get(provider)
+        wait = self._try(state, tokens)
+        if wait == 0:
+            return
+        if (mode or self.mode) == "fail_fast":
+            self._reject(state, provider, "rate limit reached")
+        
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        with state["lock"]:
+            state["stats"]["throttled"] += 1
+        self._waiting(state, 1)
+        try:
+            while wait > 0:
+                if time.monotonic() + wait > deadline:
+                    self._reject(state, provider, "rate limit wait timed out")
+                await asyncio.sleep(wait)
+                wait = self._try(state, tokens)
+        finally:
+            self._waiting(state, -1)
+    
+    def record_tokens(self, provider: str, tokens: float):
+        """
+        Charge tokens used beyond the estimate given to acquire.
+        
+        Args:
+            provider (str): Provider name
+            tokens (float): Additional tokens; the bucket may go into deficit
+        """
+        if tokens > 0:
+            self._get(provider)["tokens"].consume(tokens)
+    
+    def stats(self) -> dict:
+        """
+        Get per-provider counters.
+        
+        Returns:
+            dict: Acquired, throttled and rejected requests, current and peak queue depth
+        """
+        with self._lock:
+            providers = dict(self._providers)
+        return {provider: dict(state["stats"]) for provider, state in providers.items()}
+
+# Global rate limiter instance
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+def get_rate_limiter() -> RateLimiter:
+    """
+    Get the process-wide rate limiter, configured from RATE_LIMITS on first use.
+    
+    Returns:
+        RateLimiter: Shared limiter
+    """
+    global _rate_limiter
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                _rate_limiter = RateLimiter(RATE_LIMITS)
+    return _rate_limiter
@@ -2,12 +2,11 @@ from agno.agent import Agent
 from agno.models.openai import OpenAIChat
 from agno.tools.duckduckgo import DuckDuckGoTools
 from agno.tools.reasoning import ReasoningTools
-from agno.knowledge.url import UrlKnowledge
-from agno.vectordb.lancedb import LanceDb, SearchType
-from agno.embedder.openai import OpenAIEmbedder
-from agno.reranker.cohere import CohereReranker
 from agno.memory.agent import AgentMemory
-from config import OPENAI_API_KEY, COHERE_API_KEY
+from knowledge.knowledge_base import get_knowledge_base
+from agents.llm_engine import LLMExecutionEngine, LLMProvider
+from agents.query_complexity import get_query_classifier, SEPARATE, FOLD
+from config import OPENAI_API_KEY
 
 class SmartSearchAgent:
     def __init__(self):
@@ -38,6 +37,8 @@ class SmartSearchAgent:
             show_tool_calls=True,
             markdown=True
         )
+        self.engine = LLMExecutionEngine([LLMProvider("openrouter", self.agent)])
+        self.complexity = get_query_classifier()
     
     def _extract_content(self, response):
         """Extract content from RunResponse or return string representation"""
@@ -46,34 +47,18 @@ class SmartSearchAgent:
         return str(response)
     
     def _create_knowledge_base(self):
-        """Create knowledge base with hybrid search"""
-        return UrlKnowledge(
-            urls=[
-                "https://en.wikipedia.org/wiki/Web_search_engine",
-                "https://en.wikipedia.org/wiki/Information_retrieval"
-            ],
-            vector_db=LanceDb(
-                uri="./data/knowledge",
-                table_name="search_kb",
-                search_type=SearchType.hybrid,
-                embedder=OpenAIEmbedder(
-                    id="text-embedding-3-small",
-                    api_key=OPENAI_API_KEY,
-                    base_url="https://openrouter.ai/api/v1"  # OpenRouter endpoint
-                ),
-                reranker=CohereReranker(
-                    model="rerank-english-v3.0",
-                    api_key=COHERE_API_KEY
-                )
-            )
-        )
+        """Get the shared knowledge base with hybrid search"""
+        return get_knowledge_base(api_key=OPENAI_API_KEY, base_url="https://openrouter.ai/api/v1")
     
-    def search(self, query: str, use_reasoning: bool = True):
-        """Execute search with optional reasoning"""
-        if use_reasoning:
+    def search(self, query: str, use_reasoning: bool = None):
+        """Execute search with optional reasoning (None lets the query complexity classifier decide)"""
+        mode = self.complexity.decide(query, use_reasoning)
+        if mode == SEPARATE:
             # First, use reasoning to understand query
             reasoning_prompt = f"Analyze this search query and identify key concepts: {query}"
-            analysis = self.agent.run(reasoning_prompt)
+            analysis = self.engine.run(reasoning_prompt)
+            if not analysis.cached:
+                self.complexity.record_reasoning_latency(analysis.latency)
             
             # Then search with enhanced understanding
             search_prompt = f"""
@@ -83,9 +68,19 @@ class SmartSearchAgent:
             
             Provide comprehensive, accurate results.
             """
-            return self.agent.run(search_prompt)
+            return self.engine.run(search_prompt)
+        elif mode == FOLD:
+            # Analyse and search in a single call
+            search_prompt = f"""
+            Search for: {query}
+            
+            First briefly identify the key concepts of the query, then use them to guide the search.
+            
+            Provide comprehensive, accurate results.
+            """
+            return self.engine.run(search_prompt)
         else:
-            return self.agent.run(query)
+            return self.engine.run(query)
 
 # Quick test
 if __name__ == "__main__":
@@ -0,0 +1,294 @@
+import copy
+import re
+import threading
+import time
+from typing import Any, Dict, Optional
+import numpy as np
+from config import (
+    SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_MIN_CONFIDENCE,
+    SEMANTIC_CACHE_EMBEDDER, SEMANTIC_CACHE_TTLS,
+    OPENROUTER_API_KEY, OPENROUTER_BASE_URL
+)
+from agents.serper_client import normalize_query
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Queries whose answers go stale quickly, and ones whose answers rarely change
+_TIME_SENSITIVE = re.compile(
+    r"\b(today|tonight|tomorrow|yesterday|now|current(ly)?|latest|recent(ly)?|news|breaking|live|"
+    r"this (week|month|year)|price|stock|weather|forecast|score|election)\b",
+    re.IGNORECASE
+)
+_EVERGREEN = re.compile(
+    r"^(what|who) (is|was|are|were)\b|\b(define|definition|meaning of|history of|capital of|invented|born)\b",
+    re.IGNORECASE
+)
+
+_PUNCTUATION = re.compile(r"[^\w\s]+", re.UNICODE)
+
+def _normalize(query: str) -> str:
+    """Normalize a query for embedding (case, whitespace and punctuation insensitive)."""
+    return normalize_query(_PUNCTUATION.sub(" ", query))
+
+def classify_query(query: str) -> str:
+    """
+    Pick the TTL class of a query.
+    
+    Args:
+        query (str): Search query
+    
+    Returns:
+        str: "time_sensitive", "evergreen" or "default"
+    """
+    if _TIME_SENSITIVE.search(query):
+        return "time_sensitive"
+    if _EVERGREEN.search(query):
+        return "evergreen"
+    return "default"
+
+class SemanticCache:
+    """
+    Cache of verified answers looked up by query meaning rather than exact text.
+    
+    Normalized queries are embedded and kept as unit vectors in one NumPy
+    matrix, so a lookup is a single matrix-vector product over every live
+    entry. An answer is served when the best match in the caller's scope
+    reaches the similarity threshold. Entries expire by query class and the
+    oldest are evicted beyond max_entries.
+    
+    The min_confidence gate is only as good as the confidence the pipeline
+    reports. The search agents currently report a fixed 85 rather than a
+    verified score, so in practice the gate only keeps out error and fallback
+    results.
+    """
+    
+    def __init__(self, embedder=None, threshold: float = SEMANTIC_CACHE_THRESHOLD,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES, ttls: Dict[str, float] = None,
+                 min_confidence: float = SEMANTIC_CACHE_MIN_CONFIDENCE):
+        self._embedder = embedder
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttls = dict(ttls or SEMANTIC_CACHE_TTLS)
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._vectors = None
+        self._expires = np.zeros(0, dtype=np.float64)
+        self._scopes = np.empty(0, dtype=object)
+        self._classes = np.empty(0, dtype=object)
+        self._entries = []
+        self._size = 0
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "invalidations": 0}
+    
+    @property
+    def embedder(self):
+        """The query embedder, created from SEMANTIC_CACHE_EMBEDDER on first use."""
+        if self._embedder is None:
+            from knowledge.embeddings import create_embedder
+            self._embedder = create_embedder(
+                SEMANTIC_CACHE_EMBEDDER, api_key=OPENROUTER_API_KEY, base_url=OPENROUTER_BASE_URL
+            )
+        return self._embedder
+    
+    def _embed(self, query: str) -> Optional[np.ndarray]:
+        """Unit vector of the normalized query, or None if embedding fails."""
+        try:
+            vector = np.asarray(self.embedder.get_embedding(_normalize(query)), dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"Semantic cache embedding failed: {str(e)}")
+            return None
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else None
+    
+    def _similarities(self, vector: np.ndarray) -> np.ndarray:
+        """Cosine similarity to every stored entry. Caller holds the lock."""
+        if self._size == 0 or self._vectors.shape[1] != vector.shape[0]:
+            return np.full(self._size, -1.0, dtype=np.float32)
+        return self._vectors[:self._size] @ vector
+    
+    def _keep(self, keep: np.ndarray):
+        """Compact storage to the rows where keep is True. Caller holds the lock."""
+        n = int(keep.sum())
+        if n == self._size:
+            return
+        if self._vectors is not None:
+            self._vectors[:n] = self._vectors[:self._size][keep]
+        self._expires[:n] = self._expires[:self._size][keep]
+        self._scopes[:n] = self._scopes[:self._size][keep]
+        self._classes[:n] = self._classes[:self._size][keep]
+        self._entries = [entry for entry, kept in zip(self._entries, keep) if kept]
+        self._size = n
+    
+    def _grow(self, dimensions: int):
+        """Double the row capacity, allocating the matrix on first store. Caller holds the lock."""
+        capacity = max(16, 2 * len(self._expires))
+        vectors = np.zeros((capacity, dimensions), dtype=np.float32)
+        if self._vectors is not None:
+            vectors[:self._size] = self._vectors[:self._size]
+        self._vectors = vectors
+        self._expires = np.resize(self._expires, capacity)
+        self._scopes = np.resize(self._scopes, capacity)
+        self._classes = np.resize(self._classes, capacity)
+    
+    def lookup(self, query: str, scope: str = "default") -> Optional[dict]:
+        """
+        Find a cached answer for a query with the same meaning.
+        
+        Args:
+            query (str): Search query
+            scope (str): Cache scope, e.g. the user id for personalized answers
+        
+        Returns:
+            Optional[dict]: Copy of the cached result with cache metadata, or None on a miss
+        """
+        vector = self._embed(query)
+        with self._lock:
+            if vector is None or self._size == 0:
+                self._stats["misses"] += 1
+                return None
+            
+            scores = self._similarities(vector)
+            live = (self._expires[:self._size] > time.time()) & (self._scopes[:self._size] == scope)
+            scores = np.where(live, scores, -1.0)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self._stats["misses"] += 1
+                return None
+            
+            self._stats["hits"] += 1
+            entry = self._entries[best]
+            result = copy.deepcopy(entry["result"])
+        
+        result["cached"] = True
+        result["semantic_cache"] = {
+            "matched_query": entry["query"],
+            "similarity": round(float(scores[best]), 4),
+            "query_class": entry["query_class"]
+        }
+        return result
+    
+    def store(self, query: str, result: Any, scope: str = "default", query_class: str = None) -> bool:
+        """
+        Cache a verified answer.
+        
+        Only dict results at or above min_confidence are kept (see the class
+        docstring on what that confidence means). A stored query with the same
+        meaning in the same scope is replaced.
+        
+        Args:
+            query (str): Search query
+            result (Any): Pipeline result
+            scope (str): Cache scope
+            query_class (str): TTL class; classified from the query when omitted
+        
+        Returns:
+            bool: True if the answer was cached
+        """
+        if not isinstance(result, dict) or result.get("confidence", 0) < self.min_confidence:
+            return False
+        vector = self._embed(query)
+        if vector is None:
+            return False
+        
+        query_class = query_class or classify_query(query)
+        ttl = self.ttls.get(query_class, self.ttls.get("default", 3600))
+        if ttl <= 0:
+            return False
+        
+        with self._lock:
+            if self._vectors is not None and self._vectors.shape[1] != vector.shape[0]:
+                # The embedder changed dimensions; old entries cannot be compared
+                self._vectors, self._size, self._entries = None, 0, []
+            
+            duplicates = (self._similarities(vector) >= 0.999) & (self._scopes[:self._size] == scope)
+            self._keep(~duplicates)
+            
+            if self._vectors is None or self._size == len(self._expires):
+                self._grow(vector.shape[0])
+            
+            row = self._size
+            self._vectors[row] = vector
+            self._expires[row] = time.time() + ttl
+            self._scopes[row] = scope
+            self._classes[row] = query_class
+            self._entries.append({"query": query, "query_class": query_class, "result": copy.deepcopy(result)})
+            self._size += 1
+            self._stats["stores"] += 1
+            
+            # Drop expired entries, then the oldest beyond the size bound
+            keep = self._expires[:self._size] > time.time()
+            overflow = int(keep.sum()) - self.max_entries
+            if overflow > 0:
+                keep[np.flatnonzero(keep)[:overflow]] = False
+                self._stats["evictions"] += overflow
+            self._keep(keep)
+        return True
+    
+    def invalidate(self, query: str = None, scope: str = None, query_class: str = None) -> int:
+        """
+        Remove cached answers.
+        
+        Filters combine; with none given every entry is removed.
+        
+        Args:
+            query (str): Remove answers to queries with the same meaning as this one
+            scope (str): Only remove entries in this scope
+            query_class (str): Only remove entries of this TTL class
+        
+        Returns:
+            int: Number of entries removed
+        """
+        vector = self._embed(query) if query else None
+        if query and vector is None:
+            return 0
+        
+        with self._lock:
+            remove = np.ones(self._size, dtype=bool)
+            if vector is not None:
+                remove &= self._similarities(vector) >= self.threshold
+            if scope is not None:
+                remove &= self._scopes[:self._size] == scope
+            if query_class is not None:
+                remove &= self._classes[:self._size] == query_class
+            
+            removed = int(remove.sum())
+            self._keep(~remove)
+            self._stats["invalidations"] += removed
+        return removed
+    
+    def __len__(self):
+        return self._size
+    
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+        
+        Returns:
+            dict: Hits, misses, stores, evictions, invalidations, size and hit rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+# Global semantic cache instance
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+def get_semantic_cache() -> SemanticCache:
+    """
+    Get the process-wide semantic answer cache, creating it on first use.
+    
+    Returns:
+        SemanticCache: Shared cache
+    """
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache()
+    return _semantic_cache
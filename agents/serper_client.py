@@ -1,21 +1,178 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import httpx
+import asyncio
 import json
-from config import SERPER_API_KEY
+import re
+import threading
+from functools import cached_property
+from typing import List, Union
+from config import (
+    SERPER_API_KEY, SERPER_POOL_SIZE,
+    SERPER_CONNECT_TIMEOUT, SERPER_READ_TIMEOUT,
+    SERPER_MAX_RETRIES, SERPER_BACKOFF_FACTOR,
+    SERPER_MAX_CONCURRENCY, SERPER_CACHE_TTL,
+    SERPER_CACHE_MAX_ENTRIES, SERPER_CACHE_PATH
+)
+from utils.cache import TTLCache, SQLiteCacheBackend
+from agents.api_failover import api_failover, retry_after
+from agents.rate_limiter import get_rate_limiter
 import logging
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Process-wide HTTP session shared by every Serper client
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+def create_session(pool_size: int = SERPER_POOL_SIZE, max_retries: int = SERPER_MAX_RETRIES,
+                   backoff_factor: float = SERPER_BACKOFF_FACTOR):
+    """
+    Create a keep-alive HTTP session with a bounded connection pool.
+    
+    Args:
+        pool_size (int): Maximum number of pooled connections per host
+        max_retries (int): Retries for connection errors and 5xx responses
+        backoff_factor (float): Exponential backoff factor between retries
+    
+    Returns:
+        requests.Session: Configured session
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        # 429s are not retried here: the client parks the throttled key and spills to the next one
+        status_forcelist=(500, 502, 503, 504),
+        allowed_methods=frozenset(["GET", "POST"]),  # Serper searches are idempotent
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=retry,
+        pool_block=False
+    )
+    
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+def get_shared_session():
+    """
+    Get the process-wide Serper session, creating it on first use.
+    
+    The underlying urllib3 pool is thread-safe, so every agent in the
+    process can issue requests through the same session concurrently.
+    
+    Returns:
+        requests.Session: Shared session
+    """
+    global _shared_session
+    if _shared_session is None:
+        with _shared_session_lock:
+            if _shared_session is None:
+                _shared_session = create_session()
+    return _shared_session
+
+# Serper returns this many organic results when "num" is not given
+DEFAULT_NUM_RESULTS = 10
+
+# Facet lookups for one query share a response for this long, even with the response cache off
+RECENT_RESPONSE_TTL = 30.0
+RECENT_RESPONSE_MAX_ENTRIES = 64
+
+class SerperResponse:
+    """Parsed Serper response exposing each result section as a lazy view."""
+    
+    def __init__(self, query: str, raw: dict, search_type: str = "search", params: dict = None):
+        self.query = query
+        self.raw = raw or {}
+        self.search_type = search_type
+        self.params = params or {}
+    
+    @cached_property
+    def organic(self) -> list:
+        """Organic web results."""
+        return self.raw.get("organic", [])
+    
+    @cached_property
+    def knowledge_graph(self) -> dict:
+        """Knowledge graph panel, if any."""
+        return self.raw.get("knowledgeGraph", {})
+    
+    @cached_property
+    def related_searches(self) -> list:
+        """Related search suggestions."""
+        return self.raw.get("relatedSearches", [])
+    
+    @cached_property
+    def news(self) -> list:
+        """News results, from the news endpoint or the top stories block of a web search."""
+        return self.raw.get("news") or self.raw.get("topStories", [])
+    
+    @cached_property
+    def people_also_ask(self) -> list:
+        """Questions and answers from the "People also ask" block."""
+        return self.raw.get("peopleAlsoAsk", [])
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for cache lookups (case and whitespace insensitive)."""
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+def _response_key(query: str, search_type: str, params: dict) -> str:
+    """Build a stable cache key for one (query, search type, params) request."""
+    return json.dumps([search_type, normalize_query(query), params], sort_keys=True, default=str)
+
+# Process-wide Serper response cache shared by the sync and async clients
+_serper_cache = None
+_serper_cache_lock = threading.Lock()
+
+def get_serper_cache():
+    """
+    Get the process-wide Serper response cache, creating it on first use.
+    
+    Returns:
+        TTLCache: Shared cache, backed by SQLite when SERPER_CACHE_PATH is set
+    """
+    global _serper_cache
+    if _serper_cache is None:
+        with _serper_cache_lock:
+            if _serper_cache is None:
+                backend = None
+                if SERPER_CACHE_PATH:
+                    try:
+                        backend = SQLiteCacheBackend(SERPER_CACHE_PATH, table="serper_responses")
+                    except Exception as e:
+                        logger.warning(f"Persistent Serper cache unavailable, using memory only: {str(e)}")
+                _serper_cache = TTLCache(
+                    max_entries=SERPER_CACHE_MAX_ENTRIES,
+                    ttl=SERPER_CACHE_TTL,
+                    backend=backend
+                )
+    return _serper_cache
+
 class SerperAPIClient:
     """Client for interacting with the Serper API for enhanced search capabilities."""
     
-    def __init__(self):
+    def __init__(self, session: requests.Session = None, timeout: tuple = None, cache: TTLCache = None):
         self.api_key = SERPER_API_KEY
         self.base_url = "https://google.serper.dev"
         
         if not self.api_key:
             raise ValueError("SERPER_API_KEY is required for Serper API client")
+        
+        # Reuse pooled keep-alive connections across all clients by default
+        self.session = session or get_shared_session()
+        self.timeout = timeout or (SERPER_CONNECT_TIMEOUT, SERPER_READ_TIMEOUT)
+        self.cache = cache if cache is not None else get_serper_cache()
+        self.recent = TTLCache(max_entries=RECENT_RESPONSE_MAX_ENTRIES, ttl=RECENT_RESPONSE_TTL)
+        self.rate_limiter = get_rate_limiter()
     
     def search(self, query: str, search_type: str = "search", **kwargs):
         """
@@ -36,23 +193,244 @@ class SerperAPIClient:
             **kwargs
         }
         
-        headers = {
-            "X-API-KEY": self.api_key,
-            "Content-Type": "application/json"
-        }
+        # Pooled keys are tried in turn; a key answering 429 spills to the next one
+        tried = set()
+        while True:
+            key = api_failover.acquire_key("serper", exclude=tried)
+            if key is None and tried:
+                raise Exception("Serper API request failed: every key is rate limited")
+            tried.add(key)
+            
+            headers = {
+                "X-API-KEY": key or self.api_key,
+                "Content-Type": "application/json"
+            }
+            
+            try:
+                self.rate_limiter.acquire("serper")
+                response = self.session.post(url, headers=headers, json=payload, timeout=self.timeout)
+                if response.status_code == 429 and key is not None:
+                    api_failover.report_rate_limited("serper", key, retry_after(response))
+                    continue
+                response.raise_for_status()
+                return response.json()
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Serper API request failed: {str(e)}")
+                raise Exception(f"Serper API request failed: {str(e)}")
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to decode Serper API response: {str(e)}")
+                raise Exception(f"Failed to decode Serper API response: {str(e)}")
+            finally:
+                if key is not None:
+                    api_failover.release_key("serper", key)
+    
+    def fetch(self, query: str, search_type: str = "search", **kwargs) -> SerperResponse:
+        """
+        Fetch a parsed Serper response, served from the response cache when possible.
         
+        Recent responses are also kept on the client, so the facet helpers for one
+        query share a round trip even when the response cache is disabled.
+        
+        Args:
+            query (str): The search query
+            search_type (str): Type of search - "search", "images", "videos", "news", "shopping"
+            **kwargs: Additional parameters for the search
+        
+        Returns:
+            SerperResponse: Parsed response with lazy section views
+        """
+        key = _response_key(query, search_type, kwargs)
+        raw = self.cache.get(key) if SERPER_CACHE_TTL > 0 else None
+        if raw is not None:
+            return SerperResponse(query, raw, search_type, kwargs)
+        
+        response = self.recent.get(key)
+        if response is None:
+            response = SerperResponse(query, self.search(query, search_type, **kwargs), search_type, kwargs)
+            self.recent.set(key, response)
+            if SERPER_CACHE_TTL > 0:
+                self.cache.set(key, response.raw)
+        return response
+    
+    def get_organic_search_results(self, query: str, num_results: int = DEFAULT_NUM_RESULTS):
+        """
+        Get organic search results for a query.
+        
+        Args:
+            query (str): The search query
+            num_results (int): Number of results to return (max 100)
+        
+        Returns:
+            list: List of organic search results
+        """
         try:
-            response = requests.post(url, headers=headers, json=payload)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Serper API request failed: {str(e)}")
-            raise Exception(f"Serper API request failed: {str(e)}")
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to decode Serper API response: {str(e)}")
-            raise Exception(f"Failed to decode Serper API response: {str(e)}")
-    
-    def get_organic_search_results(self, query: str, num_results: int = 10):
+            return self.fetch(query, num=num_results).organic
+        except Exception as e:
+            logger.error(f"Failed to get organic search results: {str(e)}")
+            return []
+    
+    def get_knowledge_graph(self, query: str, num_results: int = DEFAULT_NUM_RESULTS):
+        """
+        Get knowledge graph information for a query.
+        
+        Args:
+            query (str): The search query
+            num_results (int): Number of organic results requested alongside
+        
+        Returns:
+            dict: Knowledge graph information
+        """
+        try:
+            return self.fetch(query, num=num_results).knowledge_graph
+        except Exception as e:
+            logger.error(f"Failed to get knowledge graph: {str(e)}")
+            return {}
+    
+    def get_related_searches(self, query: str, num_results: int = DEFAULT_NUM_RESULTS):
+        """
+        Get related searches for a query.
+        
+        Args:
+            query (str): The search query
+            num_results (int): Number of organic results requested alongside
+        
+        Returns:
+            list: List of related searches
+        """
+        try:
+            return self.fetch(query, num=num_results).related_searches
+        except Exception as e:
+            logger.error(f"Failed to get related searches: {str(e)}")
+            return []
+
+class AsyncSerperAPIClient:
+    """Asyncio client for the Serper API, suited to fanning out many searches from one event loop."""
+    
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    
+    def __init__(self, client: httpx.AsyncClient = None, max_concurrency: int = SERPER_MAX_CONCURRENCY,
+                 cache: TTLCache = None):
+        self.api_key = SERPER_API_KEY
+        self.base_url = "https://google.serper.dev"
+        
+        if not self.api_key:
+            raise ValueError("SERPER_API_KEY is required for Serper API client")
+        
+        self._client = client
+        self._owns_client = client is None
+        self.max_concurrency = max_concurrency
+        self.cache = cache if cache is not None else get_serper_cache()
+        self.recent = TTLCache(max_entries=RECENT_RESPONSE_MAX_ENTRIES, ttl=RECENT_RESPONSE_TTL)
+        self.rate_limiter = get_rate_limiter()
+    
+    def _get_client(self):
+        """Create the pooled keep-alive HTTP client on first use."""
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=SERPER_POOL_SIZE,
+                    max_keepalive_connections=SERPER_POOL_SIZE
+                ),
+                timeout=httpx.Timeout(SERPER_READ_TIMEOUT, connect=SERPER_CONNECT_TIMEOUT),
+                transport=httpx.AsyncHTTPTransport(retries=SERPER_MAX_RETRIES)
+            )
+        return self._client
+    
+    async def aclose(self):
+        """Close the underlying HTTP client if this instance created it."""
+        if self._client is not None and self._owns_client:
+            await self._client.aclose()
+            self._client = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+    
+    async def search(self, query: str, search_type: str = "search", **kwargs):
+        """
+        Perform a search using the Serper API.
+        
+        Args:
+            query (str): The search query
+            search_type (str): Type of search - "search", "images", "videos", "news", "shopping"
+            **kwargs: Additional parameters for the search
+        
+        Returns:
+            dict: Search results from Serper API
+        """
+        url = f"{self.base_url}/{search_type}"
+        
+        payload = {
+            "q": query,
+            **kwargs
+        }
+        
+        client = self._get_client()
+        tried = set()
+        
+        for attempt in range(SERPER_MAX_RETRIES + 1):
+            key = api_failover.acquire_key("serper", exclude=tried)
+            tried.add(key)
+            headers = {
+                "X-API-KEY": key or self.api_key,
+                "Content-Type": "application/json"
+            }
+            
+            try:
+                await self.rate_limiter.acquire_async("serper")
+                response = await client.post(url, headers=headers, json=payload)
+                if response.status_code in self.RETRY_STATUSES and attempt < SERPER_MAX_RETRIES:
+                    if response.status_code == 429 and key is not None:
+                        # Spill to the next pooled key straight away; back off once all are throttled
+                        api_failover.report_rate_limited("serper", key, retry_after(response))
+                        if len(tried) < len(api_failover.get_key_pool("serper").keys):
+                            continue
+                    # Mirror the sync client's urllib3 Retry backoff for throttling and 5xx
+                    await asyncio.sleep(SERPER_BACKOFF_FACTOR * (2 ** attempt))
+                    continue
+                response.raise_for_status()
+                return response.json()
+            except httpx.HTTPError as e:
+                logger.error(f"Serper API request failed: {str(e)}")
+                raise Exception(f"Serper API request failed: {str(e)}")
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to decode Serper API response: {str(e)}")
+                raise Exception(f"Failed to decode Serper API response: {str(e)}")
+            finally:
+                if key is not None:
+                    api_failover.release_key("serper", key)
+    
+    async def fetch(self, query: str, search_type: str = "search", **kwargs) -> SerperResponse:
+        """
+        Fetch a parsed Serper response, served from the response cache when possible.
+        
+        Recent responses are also kept on the client, so the facet helpers for one
+        query share a round trip even when the response cache is disabled.
+        
+        Args:
+            query (str): The search query
+            search_type (str): Type of search - "search", "images", "videos", "news", "shopping"
+            **kwargs: Additional parameters for the search
+        
+        Returns:
+            SerperResponse: Parsed response with lazy section views
+        """
+        key = _response_key(query, search_type, kwargs)
+        raw = self.cache.get(key) if SERPER_CACHE_TTL > 0 else None
+        if raw is not None:
+            return SerperResponse(query, raw, search_type, kwargs)
+        
+        response = self.recent.get(key)
+        if response is None:
+            response = SerperResponse(query, await self.search(query, search_type, **kwargs), search_type, kwargs)
+            self.recent.set(key, response)
+            if SERPER_CACHE_TTL > 0:
+                self.cache.set(key, response.raw)
+        return response
+    
+    async def get_organic_search_results(self, query: str, num_results: int = DEFAULT_NUM_RESULTS):
         """
         Get organic search results for a query.
         
@@ -64,45 +442,73 @@ class SerperAPIClient:
             list: List of organic search results
         """
         try:
-            response = self.search(query, num=num_results)
-            return response.get("organic", [])
+            return (await self.fetch(query, num=num_results)).organic
         except Exception as e:
             logger.error(f"Failed to get organic search results: {str(e)}")
             return []
     
-    def get_knowledge_graph(self, query: str):
+    async def get_knowledge_graph(self, query: str, num_results: int = DEFAULT_NUM_RESULTS):
         """
         Get knowledge graph information for a query.
         
         Args:
             query (str): The search query
+            num_results (int): Number of organic results requested alongside
         
         Returns:
             dict: Knowledge graph information
         """
         try:
-            response = self.search(query)
-            return response.get("knowledgeGraph", {})
+            return (await self.fetch(query, num=num_results)).knowledge_graph
         except Exception as e:
             logger.error(f"Failed to get knowledge graph: {str(e)}")
             return {}
     
-    def get_related_searches(self, query: str):
+    async def get_related_searches(self, query: str, num_results: int = DEFAULT_NUM_RESULTS):
         """
         Get related searches for a query.
         
         Args:
             query (str): The search query
+            num_results (int): Number of organic results requested alongside
         
         Returns:
             list: List of related searches
         """
         try:
-            response = self.search(query)
-            return response.get("relatedSearches", [])
+            return (await self.fetch(query, num=num_results)).related_searches
         except Exception as e:
             logger.error(f"Failed to get related searches: {str(e)}")
             return []
+    
+    async def search_many(self, queries: List[str], types: Union[str, List[str]] = "search", **kwargs):
+        """
+        Run many Serper searches concurrently under a concurrency limit, through the response cache.
+        
+        Args:
+            queries (List[str]): Search queries
+            types (Union[str, List[str]]): One search type for all queries, or one per query
+            **kwargs: Additional parameters applied to every search
+        
+        Returns:
+            list: Search results in the same order as the queries; failed searches yield {}
+        """
+        if isinstance(types, str):
+            types = [types] * len(queries)
+        if len(types) != len(queries):
+            raise ValueError("types must be a single search type or match the number of queries")
+        
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run_one(query, search_type):
+            async with semaphore:
+                try:
+                    return (await self.fetch(query, search_type, **kwargs)).raw
+                except Exception as e:
+                    logger.error(f"Search for '{query}' ({search_type}) failed: {str(e)}")
+                    return {}
+        
+        return await asyncio.gather(*(run_one(q, t) for q, t in zip(queries, types)))
 
 # Example usage
 if __name__ == "__main__":
@@ -2,17 +2,19 @@ from agno.agent import Agent
 from agno.models.openai import OpenAIChat
 from agno.tools.duckduckgo import DuckDuckGoTools
 from agno.tools.reasoning import ReasoningTools
-from agno.knowledge.url import UrlKnowledge
-from agno.vectordb.lancedb import LanceDb, SearchType
-from agno.embedder.openai import OpenAIEmbedder
-from agno.reranker.cohere import CohereReranker
 from agno.memory.agent import AgentMemory
+from knowledge.knowledge_base import get_knowledge_base
+from knowledge.lexical_index import get_lexical_index
 from config import (
-    OPENROUTER_API_KEY, OPENROUTER_BASE_URL, OPENROUTER_MODEL,
-    OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL,
-    COHERE_API_KEY, SERPER_API_KEY
+    OPENROUTER_API_KEY, OPENROUTER_API_KEYS, OPENROUTER_BASE_URL, OPENROUTER_MODEL,
+    OPENAI_API_KEYS, OPENAI_BASE_URL, OPENAI_MODEL,
+    SERPER_API_KEY, LEXICAL_INDEX_ENABLED
 )
 from agents.serper_client import SerperAPIClient
+from agents.evidence import EvidenceContext
+from agents.llm_engine import LLMExecutionEngine, LLMProvider, build_keyed_agents
+from agents.query_complexity import get_query_classifier, SEPARATE, FOLD, SKIP
+from agents.streaming import stream_tokens, trailing_events
 import logging
 
 # Set up logging
@@ -24,28 +26,38 @@ class SerperEnhancedSearchAgent:
         # Initialize Serper client
         self.serper_client = SerperAPIClient() if SERPER_API_KEY else None
         
+        # Local BM25 index of previously retrieved Serper results
+        self.lexical_index = get_lexical_index() if LEXICAL_INDEX_ENABLED else None
+        
         # Initialize knowledge base
         self.knowledge = self._create_knowledge_base()
         
-        # Create primary agent with OpenRouter
-        self.primary_agent = self._create_agent(
+        # Create primary agent with OpenRouter, one per pooled key
+        self.primary_agents = build_keyed_agents(OPENROUTER_API_KEYS, lambda api_key: self._create_agent(
             name="Serper Enhanced Search (Primary)",
-            api_key=OPENROUTER_API_KEY,
+            api_key=api_key,
             base_url=OPENROUTER_BASE_URL,
             model=OPENROUTER_MODEL
-        )
+        ))
+        self.primary_agent = next(iter(self.primary_agents.values()))
         
-        # Create fallback agent with OpenAI
-        self.fallback_agent = self._create_agent(
+        # Create fallback agent with OpenAI, one per pooled key
+        self.fallback_agents = build_keyed_agents(OPENAI_API_KEYS, lambda api_key: self._create_agent(
             name="Serper Enhanced Search (Fallback)",
-            api_key=OPENAI_API_KEY,
+            api_key=api_key,
             base_url=OPENAI_BASE_URL,
             model=OPENAI_MODEL
-        )
+        ))
+        self.fallback_agent = next(iter(self.fallback_agents.values()))
         
-        # Track which agent is active
-        self.active_agent = self.primary_agent
-        self.using_fallback = False
+        # Route every prompt through the shared execution engine
+        self.engine = LLMExecutionEngine([
+            LLMProvider("openrouter", self.primary_agent, keyed_agents=self.primary_agents),
+            LLMProvider("openai", self.fallback_agent, keyed_agents=self.fallback_agents)
+        ])
+        
+        # Decide per query whether the separate reasoning call is worth its latency
+        self.complexity = get_query_classifier()
     
     def _create_agent(self, name, api_key, base_url, model):
         """Create an agent with the specified configuration."""
@@ -82,64 +94,62 @@ class SerperEnhancedSearchAgent:
         return str(response)
     
     def _create_knowledge_base(self):
-        """Create knowledge base with hybrid search."""
-        return UrlKnowledge(
-            urls=[
-                "https://en.wikipedia.org/wiki/Web_search_engine",
-                "https://en.wikipedia.org/wiki/Information_retrieval"
-            ],
-            vector_db=LanceDb(
-                uri="./data/knowledge",
-                table_name="search_kb",
-                search_type=SearchType.hybrid,
-                embedder=OpenAIEmbedder(
-                    id="text-embedding-3-small",
-                    api_key=OPENROUTER_API_KEY,  # Use OpenRouter for embeddings
-                    base_url=OPENROUTER_BASE_URL
-                ),
-                reranker=CohereReranker(
-                    model="rerank-english-v3.0",
-                    api_key=COHERE_API_KEY
-                )
-            )
-        )
+        """Get the shared knowledge base with hybrid search."""
+        return get_knowledge_base(api_key=OPENROUTER_API_KEY, base_url=OPENROUTER_BASE_URL)
     
-    def _execute_with_fallback(self, prompt):
-        """Execute a prompt with fallback to OpenAI if OpenRouter fails."""
-        try:
-            logger.info("Attempting to use primary LLM (OpenRouter)")
-            self.active_agent = self.primary_agent
-            self.using_fallback = False
-            result = self.primary_agent.run(prompt)
-            logger.info("Successfully executed with primary LLM")
-            return result
-        except Exception as primary_error:
-            logger.warning(f"Primary LLM failed: {str(primary_error)}")
+    def _get_serper_results(self, query: str, num_results: int = 10, evidence: EvidenceContext = None):
+        """Get enhanced search results, preferring local evidence over the Serper API."""
+        # Request evidence is always keyed on the original user query
+        lookup_query = evidence.query if evidence is not None else query
+        
+        local_results = self._get_local_results(lookup_query, num_results)
+        if local_results is not None:
+            logger.info(f"Using {len(local_results)} Serper results from the local index")
+            if evidence is not None:
+                evidence.seed_serper_organic(local_results)
+            return local_results
+        
+        if evidence is not None:
             try:
-                logger.info("Falling back to secondary LLM (OpenAI)")
-                self.active_agent = self.fallback_agent
-                self.using_fallback = True
-                result = self.fallback_agent.run(prompt)
-                logger.info("Successfully executed with fallback LLM")
-                return result
-            except Exception as fallback_error:
-                logger.error(f"Both primary and fallback LLMs failed: {str(fallback_error)}")
-                raise Exception(f"Both LLM providers failed. Primary: {str(primary_error)}. Fallback: {str(fallback_error)}")
-    
-    def _get_serper_results(self, query: str, num_results: int = 10):
-        """Get enhanced search results from Serper API."""
-        if not self.serper_client:
-            logger.warning("Serper API key not configured, skipping Serper search")
-            return []
+                results = evidence.serper_organic(num_results)
+                logger.info(f"Using {len(results)} Serper results from request evidence")
+            except Exception as e:
+                logger.error(f"Failed to fetch Serper results: {str(e)}")
+                return []
+        else:
+            if not self.serper_client:
+                logger.warning("Serper API key not configured, skipping Serper search")
+                return []
+            
+            try:
+                logger.info(f"Fetching Serper results for query: {query}")
+                results = self.serper_client.get_organic_search_results(query, num_results)
+                logger.info(f"Retrieved {len(results)} results from Serper")
+            except Exception as e:
+                logger.error(f"Failed to fetch Serper results: {str(e)}")
+                return []
         
+        self._index_results(lookup_query, results)
+        return results
+    
+    def _get_local_results(self, query: str, num_results: int):
+        """Look up a repeat query in the local lexical index."""
+        if self.lexical_index is None:
+            return None
         try:
-            logger.info(f"Fetching Serper results for query: {query}")
-            results = self.serper_client.get_organic_search_results(query, num_results)
-            logger.info(f"Retrieved {len(results)} results from Serper")
-            return results
+            return self.lexical_index.lookup_serper(query, num_results)
         except Exception as e:
-            logger.error(f"Failed to fetch Serper results: {str(e)}")
-            return []
+            logger.warning(f"Local index lookup failed: {str(e)}")
+            return None
+    
+    def _index_results(self, query: str, results: list):
+        """Queue retrieved Serper results for the local lexical index."""
+        if self.lexical_index is None or not results:
+            return
+        try:
+            self.lexical_index.queue_serper_results(query, results)
+        except Exception as e:
+            logger.warning(f"Failed to index Serper results: {str(e)}")
     
     def _format_serper_results(self, results: list) -> str:
         """Format Serper results for inclusion in prompts."""
@@ -155,13 +165,26 @@ class SerperEnhancedSearchAgent:
         
         return "Enhanced Search Results:\n" + "\n".join(formatted_results)
     
-    def search(self, query: str, use_reasoning: bool = True):
-        """Execute enhanced search with Serper API integration."""
+    def _search_prompt(self, query: str, use_reasoning: bool = None, evidence: EvidenceContext = None) -> str:
+        """
+        Build the prompt of the final search call, running the reasoning call first when chosen.
+        
+        Args:
+            query (str): Search query
+            use_reasoning (bool): True runs a separate reasoning call first, False searches
+                directly, None lets the query complexity classifier choose (including
+                folding the analysis into the search prompt)
+            evidence (EvidenceContext): Request-scoped evidence to reuse Serper results from
+        
+        Returns:
+            str: Search prompt
+        """
         # Get Serper results
-        serper_results = self._get_serper_results(query)
+        serper_results = self._get_serper_results(query, evidence=evidence)
         formatted_serper_results = self._format_serper_results(serper_results)
         
-        if use_reasoning:
+        mode = self.complexity.decide(query, use_reasoning)
+        if mode == SEPARATE:
             # First, use reasoning to understand query
             reasoning_prompt = f"""
             Analyze this search query and identify key concepts: {query}
@@ -170,22 +193,17 @@ class SerperEnhancedSearchAgent:
             {formatted_serper_results}
             """
             try:
-                analysis = self._execute_with_fallback(reasoning_prompt)
+                analysis = self.engine.run(reasoning_prompt)
             except Exception as e:
                 logger.error(f"Reasoning step failed: {str(e)}")
                 # If reasoning fails, proceed with direct search
-                direct_prompt = f"""
-                Search for: {query}
+                mode = SKIP
+            else:
+                if not analysis.cached:
+                    self.complexity.record_reasoning_latency(analysis.latency)
                 
-                Additional context from enhanced search:
-                {formatted_serper_results}
-                
-                Provide comprehensive, accurate results with confidence scores.
-                """
-                return self._execute_with_fallback(direct_prompt)
-            
-            # Then search with enhanced understanding
-            search_prompt = f"""
+                # Then search with enhanced understanding
+                return f"""
             Based on this analysis: {self._extract_content(analysis)}
             
             Now search for: {query}
@@ -196,9 +214,22 @@ class SerperEnhancedSearchAgent:
             Provide comprehensive, accurate results with confidence scores.
             Prioritize information from the enhanced search results when relevant.
             """
-            return self._execute_with_fallback(search_prompt)
-        else:
-            direct_prompt = f"""
+        
+        if mode == FOLD:
+            # Analyse and search in a single call
+            return f"""
+            Search for: {query}
+            
+            Additional context from enhanced search:
+            {formatted_serper_results}
+            
+            First briefly identify the key concepts of the query, then use them to guide the search.
+            
+            Provide comprehensive, accurate results with confidence scores.
+            Prioritize information from the enhanced search results when relevant.
+            """
+        
+        return f"""
             Search for: {query}
             
             Additional context from enhanced search:
@@ -206,7 +237,42 @@ class SerperEnhancedSearchAgent:
             
             Provide comprehensive, accurate results with confidence scores.
             """
-            return self._execute_with_fallback(direct_prompt)
+    
+    def search(self, query: str, use_reasoning: bool = None, evidence: EvidenceContext = None):
+        """
+        Execute enhanced search with Serper API integration.
+        
+        Args:
+            query (str): Search query
+            use_reasoning (bool): True runs a separate reasoning call first, False searches
+                directly, None lets the query complexity classifier choose (including
+                folding the analysis into the search prompt)
+            evidence (EvidenceContext): Request-scoped evidence to reuse Serper results from
+        
+        Returns:
+            LLMResult: Search response
+        """
+        return self.engine.run(self._search_prompt(query, use_reasoning, evidence))
+    
+    def search_stream(self, query: str, use_reasoning: bool = None, evidence: EvidenceContext = None):
+        """
+        Execute enhanced search, streaming the final search call.
+        
+        Args:
+            query (str): Search query
+            use_reasoning (bool): As for search
+            evidence (EvidenceContext): Request-scoped evidence to reuse Serper results from
+        
+        Yields:
+            dict: Token events, then the verification and result events
+        """
+        result = yield from stream_tokens(self.engine.stream(self._search_prompt(query, use_reasoning, evidence)))
+        yield from trailing_events({
+            "results": result.content,
+            "verification": "Serper enhanced search",
+            "confidence": 85,
+            "using_fallback": result.used_fallback
+        })
 
 # Quick test
 if __name__ == "__main__":
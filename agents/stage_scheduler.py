@@ -0,0 +1,144 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Tuple
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Stage:
+    """
+    One step of a pipeline with declared inputs and outputs.
+    
+    The stage function is called with its inputs as keyword arguments. A stage
+    with one output returns the value directly; a stage with several outputs
+    returns a dict keyed by output name. Stages that are not required fall back
+    to `default` for each output when they fail, so dependents still run.
+    """
+    
+    name: str
+    func: Callable[..., Any]
+    inputs: Tuple[str, ...] = ()
+    outputs: Tuple[str, ...] = ()
+    required: bool = True
+    default: Any = None
+    
+    def __post_init__(self):
+        self.inputs = tuple(self.inputs)
+        self.outputs = tuple(self.outputs) or (self.name,)
+
+@dataclass
+class StageResults:
+    """Outputs of a scheduler run plus per-stage wall-clock timings in seconds."""
+    
+    outputs: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+class StageError(Exception):
+    """Raised when a required stage fails, carrying the outputs of the stages that finished."""
+    
+    def __init__(self, stage: str, error: Exception, results: StageResults = None):
+        super().__init__(f"Stage '{stage}' failed: {str(error)}")
+        self.stage = stage
+        self.error = error
+        self.results = results or StageResults()
+
+class StageScheduler:
+    """Run a DAG of stages, executing every stage as soon as its inputs are ready."""
+    
+    def __init__(self, executor: ThreadPoolExecutor):
+        self.executor = executor
+    
+    def _validate(self, stages: List[Stage], available: set):
+        """Check that every input is produced exactly once and the graph is acyclic."""
+        producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in producers or output in available:
+                    raise ValueError(f"Output '{output}' is produced more than once")
+                producers[output] = stage.name
+        
+        for stage in stages:
+            for name in stage.inputs:
+                if name not in producers and name not in available:
+                    raise ValueError(f"Stage '{stage.name}' needs unknown input '{name}'")
+        
+        # Kahn's algorithm: every stage must become ready eventually
+        ready = set(available)
+        remaining = list(stages)
+        while remaining:
+            runnable = [s for s in remaining if all(i in ready for i in s.inputs)]
+            if not runnable:
+                raise ValueError(f"Stage graph has a cycle among: {[s.name for s in remaining]}")
+            for stage in runnable:
+                ready.update(stage.outputs)
+                remaining.remove(stage)
+    
+    def _run_stage(self, stage: Stage, kwargs: dict):
+        started = time.perf_counter()
+        value = stage.func(**kwargs)
+        return value, time.perf_counter() - started
+    
+    def run(self, stages: List[Stage], initial: Dict[str, Any] = None) -> StageResults:
+        """
+        Execute the stages concurrently in dependency order.
+        
+        Args:
+            stages (List[Stage]): Stages to run
+            initial (Dict[str, Any]): Values available before any stage runs
+        
+        Returns:
+            StageResults: Outputs of every stage with timings and optional-stage errors
+        
+        Raises:
+            StageError: If a required stage fails; no further stages are started, and
+                the ones already running are waited for so their outputs are kept
+        """
+        results = StageResults(outputs=dict(initial or {}))
+        self._validate(stages, set(results.outputs))
+        
+        pending = list(stages)
+        running = {}
+        failure = None
+        
+        try:
+            while pending or running:
+                for stage in [s for s in pending if all(i in results.outputs for i in s.inputs)]:
+                    kwargs = {name: results.outputs[name] for name in stage.inputs}
+                    running[self.executor.submit(self._run_stage, stage, kwargs)] = stage
+                    pending.remove(stage)
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        value, elapsed = future.result()
+                        results.timings[stage.name] = round(elapsed, 4)
+                    except Exception as e:
+                        results.errors[stage.name] = str(e)
+                        if stage.required:
+                            failure = failure or StageError(stage.name, e, results)
+                            continue
+                        logger.warning(f"Optional stage '{stage.name}' failed: {str(e)}")
+                        value = {o: stage.default for o in stage.outputs} if len(stage.outputs) > 1 else stage.default
+                    
+                    if len(stage.outputs) == 1:
+                        results.outputs[stage.outputs[0]] = value
+                    else:
+                        for output in stage.outputs:
+                            results.outputs[output] = value.get(output, stage.default)
+                
+                if failure is not None:
+                    pending = []
+                    if not running:
+                        raise failure from failure.error
+        finally:
+            for future in running:
+                future.cancel()
+        
+        logger.info(f"Stage timings: {results.timings}")
+        return results
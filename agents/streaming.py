@@ -0,0 +1,102 @@
+import asyncio
+from typing import Any, AsyncIterator, Iterator
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Search streams yield "token" events as the final LLM call produces text, then a
+# "verification" event and a closing "result" event carrying the full result dict.
+
+def token_event(content: str) -> dict:
+    return {"event": "token", "content": content}
+
+def trailing_events(result: dict) -> Iterator[dict]:
+    """
+    Yield the events that close a search stream.
+    
+    Args:
+        result (dict): Final search result
+    
+    Yields:
+        dict: The verification event, then the result event
+    """
+    yield {
+        "event": "verification",
+        "verification": result.get("verification"),
+        "confidence": result.get("confidence", 0)
+    }
+    yield {"event": "result", "result": result}
+
+def stream_tokens(chunks: Iterator[str]):
+    """
+    Wrap an LLMExecutionEngine.stream text stream as token events.
+    
+    Use as `result = yield from stream_tokens(engine.stream(prompt))`.
+    
+    Args:
+        chunks (Iterator[str]): Text deltas
+    
+    Returns:
+        Any: The wrapped stream's return value (the LLMResult)
+    """
+    while True:
+        try:
+            chunk = next(chunks)
+        except StopIteration as stop:
+            return stop.value
+        yield token_event(chunk)
+
+def forward_tokens(events: Iterator[dict]):
+    """
+    Pass on the token events of an inner search stream and capture its result.
+    
+    Use as `result = yield from forward_tokens(agent.search_stream(query))`; the
+    inner trailing events are consumed so the caller can emit its own.
+    
+    Args:
+        events (Iterator[dict]): Inner search stream
+    
+    Returns:
+        dict: Result carried by the inner stream's result event
+    
+    Raises:
+        Exception: If the inner stream ends without a result event
+    """
+    result = None
+    for event in events:
+        if event["event"] == "token":
+            yield event
+        elif event["event"] == "result":
+            result = event["result"]
+    if result is None:
+        raise Exception("Search stream ended without a result")
+    return result
+
+async def astream(events: Iterator[Any]) -> AsyncIterator[Any]:
+    """
+    Iterate a blocking stream from an event loop.
+    
+    Each step runs in the default executor, so the LLM and HTTP calls behind
+    the stream never block the loop.
+    
+    Args:
+        events (Iterator[Any]): Blocking stream
+    
+    Yields:
+        Any: Items of the stream
+    """
+    loop = asyncio.get_running_loop()
+    done = object()
+    try:
+        while True:
+            item = await loop.run_in_executor(None, next, events, done)
+            if item is done:
+                return
+            yield item
+    finally:
+        close = getattr(events, "close", None)
+        if close is not None:
+            # Releases provider slots and keys held by an abandoned stream
+            await loop.run_in_executor(None, close)
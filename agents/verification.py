@@ -4,6 +4,7 @@ from agno.tools.reasoning import ReasoningTools
 from agno.tools.duckduckgo import DuckDuckGoTools
 from config import OPENAI_API_KEY
 from agents.search_agent import SmartSearchAgent
+from agents.llm_engine import LLMExecutionEngine, LLMProvider
 
 class VerificationAgent:
     def __init__(self):
@@ -26,6 +27,7 @@ class VerificationAgent:
                 "Be skeptical of unsupported claims"
             ]
         )
+        self.engine = LLMExecutionEngine([LLMProvider("openrouter", self.agent)])
     
     def _extract_content(self, response):
         """Extract content from RunResponse or return string representation"""
@@ -53,7 +55,7 @@ class VerificationAgent:
         - Any issues found
         """
         
-        return self.agent.run(prompt)
+        return self.engine.run(prompt)
     
     def check_hallucination(self, response: str, original_query: str):
         """Check if response contains hallucinations"""
@@ -73,7 +75,7 @@ class VerificationAgent:
         Return: Is this hallucination-free? (Yes/No) and explain why.
         """
         
-        return self.agent.run(prompt)
+        return self.engine.run(prompt)
 
 # Anti-hallucination wrapper
 class AntiHallucinationSearch:
@@ -107,7 +109,7 @@ class AntiHallucinationSearch:
             - Explicitly cite every source
             - Say "Information not found" if uncertain
             """
-            results = self.search_agent.agent.run(strict_prompt)
+            results = self.search_agent.engine.run(strict_prompt)
             results_content = self.verifier._extract_content(results)
         
         return {
@@ -1,11 +1,14 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional
+import json
 import sys
 sys.path.append('..')
 
 from agents.agent_team import AgentTeam
+from agents.streaming import astream
 
 app = FastAPI(title="Smart Search API")
 
@@ -32,6 +35,12 @@ class SearchResponse(BaseModel):
     using_fallback: Optional[bool] = False
     optimized: Optional[bool] = False
     task_key: Optional[str] = None
+    cached: Optional[bool] = False
+
+class CacheInvalidationRequest(BaseModel):
+    query: Optional[str] = None
+    user_id: Optional[str] = None
+    query_class: Optional[str] = None
 
 @app.get("/")
 def read_root():
@@ -53,12 +62,22 @@ async def search(request: SearchRequest):
             personalized=result.get("personalized", False),
             using_fallback=result.get("using_fallback", False),
             optimized=result.get("optimized", False),
-            task_key=result.get("task_key")
+            task_key=result.get("task_key"),
+            cached=result.get("cached", False)
         )
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/search/stream")
+async def search_stream(request: SearchRequest):
+    """Stream the answer as newline-delimited JSON events: tokens, then verification and the final result"""
+    async def events():
+        async for event in astream(search_system.search_stream(query=request.query, user_id=request.user_id)):
+            yield json.dumps(event, default=str) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @app.post("/feedback")
 async def feedback(user_id: str, result_id: str, feedback: str):
     """Track user clicks/feedback"""
@@ -71,6 +90,18 @@ async def feedback(user_id: str, result_id: str, feedback: str):
     )
     return {"status": "recorded"}
 
+@app.post("/cache/invalidate")
+async def invalidate_cache(request: CacheInvalidationRequest):
+    """Drop cached answers matching a query, user and/or query class; all of them when none is given"""
+    if search_system.semantic_cache is None:
+        return {"invalidated": 0}
+    invalidated = search_system.semantic_cache.invalidate(
+        query=request.query,
+        scope=request.user_id,
+        query_class=request.query_class
+    )
+    return {"invalidated": invalidated}
+
 @app.get("/status")
 async def get_status():
     """Get system status"""
@@ -49,10 +49,19 @@ Examples:
                        help='Interactive mode')
     parser.add_argument('-u', '--user-id', default=None,
                        help='User ID for personalization (default: auto-generated)')
+    parser.add_argument('--ingest', action='store_true',
+                       help='Incrementally ingest the knowledge base sources and exit')
     parser.add_argument('--version', action='version', version='Smart Search CLI 0.1.0')
     
     args = parser.parse_args()
     
+    if args.ingest:
+        from knowledge.knowledge_base import ingest_knowledge_base
+        report = ingest_knowledge_base()
+        print(f"Ingested {report['new']} new chunks, {report['unchanged']} unchanged, "
+              f"{report['removed']} removed in {report['elapsed']}s")
+        return
+    
     # If no query and not in interactive mode, show help
     if not args.query and not args.interactive:
         parser.print_help()
@@ -84,10 +93,10 @@ def interactive_mode(search_system, user_id):
             if query.lower() in ['quit', 'exit', 'q']:
                 print("👋 Goodbye!")
                 break
-                
+            
             if not query:
                 continue
-                
+            
             print("Searching...")
             result = execute_search(search_system, query, user_id)
             
@@ -97,7 +106,7 @@ def interactive_mode(search_system, user_id):
                 print("⚠️  Using fallback LLM provider")
             print("-" * 40)
             print(result['results'])
-            
+        
         except KeyboardInterrupt:
             print("\n\n👋 Goodbye!")
             break
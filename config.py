@@ -3,27 +3,194 @@ import os
 
 load_dotenv()
 
+def _key_pool(name: str) -> list:
+    """Keys from a comma-separated environment variable, e.g. OPENROUTER_API_KEY=key1,key2"""
+    return [key.strip() for key in os.getenv(name, "").split(",") if key.strip()]
+
 # Primary LLM provider - OpenRouter
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+OPENROUTER_API_KEYS = _key_pool("OPENROUTER_API_KEY")
+OPENROUTER_API_KEY = OPENROUTER_API_KEYS[0] if OPENROUTER_API_KEYS else None
 OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
 OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "gpt-4o-mini")
 
 # Fallback LLM provider - OpenAI
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")  # Real OpenAI key for fallback
+OPENAI_API_KEYS = _key_pool("OPENAI_API_KEY")  # Real OpenAI key(s) for fallback
+OPENAI_API_KEY = OPENAI_API_KEYS[0] if OPENAI_API_KEYS else None
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
 # Search Enhancement APIs
-SERPER_API_KEY = os.getenv("SERPER_API_KEY")
+SERPER_API_KEYS = _key_pool("SERPER_API_KEY")
+SERPER_API_KEY = SERPER_API_KEYS[0] if SERPER_API_KEYS else None
 RESPONSE_API_KEY = os.getenv("RESPONSE_API_KEY")
 
+# Serper HTTP connection pool
+SERPER_POOL_SIZE = int(os.getenv("SERPER_POOL_SIZE", "20"))
+SERPER_CONNECT_TIMEOUT = float(os.getenv("SERPER_CONNECT_TIMEOUT", "3.05"))
+SERPER_READ_TIMEOUT = float(os.getenv("SERPER_READ_TIMEOUT", "10"))
+SERPER_MAX_RETRIES = int(os.getenv("SERPER_MAX_RETRIES", "3"))
+SERPER_BACKOFF_FACTOR = float(os.getenv("SERPER_BACKOFF_FACTOR", "0.3"))
+SERPER_MAX_CONCURRENCY = int(os.getenv("SERPER_MAX_CONCURRENCY", "50"))
+
+# Serper response cache (set SERPER_CACHE_PATH to persist across restarts)
+SERPER_CACHE_TTL = float(os.getenv("SERPER_CACHE_TTL", "3600"))
+SERPER_CACHE_MAX_ENTRIES = int(os.getenv("SERPER_CACHE_MAX_ENTRIES", "2000"))
+SERPER_CACHE_PATH = os.getenv("SERPER_CACHE_PATH", "")
+
 # Workflow Integration
 JIRA_API_KEY = os.getenv("JIRA_API_KEY")
 JIRA_BASE_URL = os.getenv("JIRA_BASE_URL")
 JIRA_USERNAME = os.getenv("JIRA_USERNAME")
 
+# Jira writes are queued in a durable outbox and sent by a background worker
+JIRA_OUTBOX_ENABLED = os.getenv("JIRA_OUTBOX_ENABLED", "true").lower() == "true"
+JIRA_OUTBOX_PATH = os.getenv("JIRA_OUTBOX_PATH", "./data/jira_outbox.db")
+JIRA_OUTBOX_MAX_ATTEMPTS = int(os.getenv("JIRA_OUTBOX_MAX_ATTEMPTS", "8"))
+JIRA_OUTBOX_POLL_INTERVAL = float(os.getenv("JIRA_OUTBOX_POLL_INTERVAL", "2"))
+
+# Jira write batching: bulk creates and periodic activity summaries
+JIRA_BULK_CREATE_SIZE = int(os.getenv("JIRA_BULK_CREATE_SIZE", "50"))
+JIRA_BATCH_MAX_WAIT = float(os.getenv("JIRA_BATCH_MAX_WAIT", "5"))
+JIRA_SUMMARY_MAX_EVENTS = int(os.getenv("JIRA_SUMMARY_MAX_EVENTS", "100"))
+JIRA_SUMMARY_INTERVAL = float(os.getenv("JIRA_SUMMARY_INTERVAL", "300"))
+JIRA_COALESCED_ACTIVITIES = [
+    activity.strip()
+    for activity in os.getenv("JIRA_COALESCED_ACTIVITIES", "Successful coordinated search").split(",")
+    if activity.strip()
+]
+
 # Cohere for reranking (kept for backward compatibility)
-COHERE_API_KEY = os.getenv("COHERE_API_KEY")
+COHERE_API_KEYS = _key_pool("COHERE_API_KEY")
+COHERE_API_KEY = COHERE_API_KEYS[0] if COHERE_API_KEYS else None
+
+# Knowledge base ingestion manifest and embedding batch size
+KNOWLEDGE_MANIFEST_PATH = os.getenv("KNOWLEDGE_MANIFEST_PATH", "./data/knowledge_manifest.db")
+KNOWLEDGE_INGEST_BATCH_SIZE = int(os.getenv("KNOWLEDGE_INGEST_BATCH_SIZE", "32"))
+
+# Persistent embedding cache (float32 vectors in memory-mapped files)
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./data/embeddings")
+
+# Embedder backend: "openai" (remote), "onnx" (local model) or "hashing" (local, no model)
+EMBEDDER_BACKEND = os.getenv("EMBEDDER_BACKEND", "openai")
+EMBEDDER_DIMENSIONS = int(os.getenv("EMBEDDER_DIMENSIONS", "384"))
+EMBEDDER_BATCH_SIZE = int(os.getenv("EMBEDDER_BATCH_SIZE", "64"))
+ONNX_MODEL_PATH = os.getenv("ONNX_MODEL_PATH", "")
+ONNX_TOKENIZER_PATH = os.getenv("ONNX_TOKENIZER_PATH", "")
+
+# Local BM25 index of knowledge chunks and Serper results (empty path keeps it in memory)
+LEXICAL_INDEX_ENABLED = os.getenv("LEXICAL_INDEX_ENABLED", "true").lower() == "true"
+LEXICAL_INDEX_PATH = os.getenv("LEXICAL_INDEX_PATH", "./data/lexical_index")
+LEXICAL_REUSE_MAX_AGE = float(os.getenv("LEXICAL_REUSE_MAX_AGE", str(SERPER_CACHE_TTL)))
+LEXICAL_FLUSH_INTERVAL = float(os.getenv("LEXICAL_FLUSH_INTERVAL", "2"))
+
+# LanceDB vector index: built once the table reaches VECTOR_INDEX_MIN_ROWS rows
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "IVF_PQ")
+VECTOR_INDEX_MIN_ROWS = int(os.getenv("VECTOR_INDEX_MIN_ROWS", "50000"))
+KNOWLEDGE_SEARCH_DEPTH = os.getenv("KNOWLEDGE_SEARCH_DEPTH", "standard")
+
+# Knowledge reranking: "local" (RRF hybrid, Cohere only when ambiguous) or "cohere"
+RERANKER_BACKEND = os.getenv("RERANKER_BACKEND", "local")
+
+# LLM execution engine: per-provider timeout and concurrency limit
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_EXECUTOR_WORKERS = int(os.getenv("LLM_EXECUTOR_WORKERS", "32"))
+
+# LLM completion cache keyed on model, sampling parameters, instructions and
+# normalized prompt (set LLM_CACHE_PATH to persist across restarts)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+
+# Hedged LLM requests: duplicate to the fallback once the primary is slower than
+# this percentile of its recent latency, for at most LLM_HEDGE_BUDGET of requests
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.1"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+
+# API failover health scoring: EWMA smoothing, failures before the breaker opens,
+# and exponential cooldown (base doubled per consecutive trip, capped, with jitter)
+FAILOVER_EWMA_ALPHA = float(os.getenv("FAILOVER_EWMA_ALPHA", "0.2"))
+FAILOVER_MAX_FAILURES = int(os.getenv("FAILOVER_MAX_FAILURES", "3"))
+FAILOVER_BASE_COOLDOWN = float(os.getenv("FAILOVER_BASE_COOLDOWN", "30"))
+FAILOVER_MAX_COOLDOWN = float(os.getenv("FAILOVER_MAX_COOLDOWN", "600"))
+FAILOVER_COOLDOWN_JITTER = float(os.getenv("FAILOVER_COOLDOWN_JITTER", "0.2"))
+FAILOVER_PROBE_TIMEOUT = float(os.getenv("FAILOVER_PROBE_TIMEOUT", "60"))
+FAILOVER_ERROR_HALF_LIFE = float(os.getenv("FAILOVER_ERROR_HALF_LIFE", "60"))
+# Share of calls routed to a runner-up to keep its health measured; costs fallback spend, so opt-in
+FAILOVER_EXPLORATION_RATE = float(os.getenv("FAILOVER_EXPLORATION_RATE", "0"))
+
+# API key pools: keys are picked "round_robin" or "least_loaded", each limited to
+# <PROVIDER>_KEY_RPS requests per second (0 = unlimited). A key answering 429 is
+# parked for KEY_RATE_LIMIT_COOLDOWN seconds (or its Retry-After) and traffic
+# spills to the provider's next key
+KEY_SELECTION_STRATEGY = os.getenv("KEY_SELECTION_STRATEGY", "round_robin")
+KEY_RATE_LIMIT_COOLDOWN = float(os.getenv("KEY_RATE_LIMIT_COOLDOWN", "60"))
+KEY_RATE_LIMITS = {
+    "openrouter": float(os.getenv("OPENROUTER_KEY_RPS", "0")),
+    "openai": float(os.getenv("OPENAI_KEY_RPS", "0")),
+    "serper": float(os.getenv("SERPER_KEY_RPS", "0")),
+    "cohere": float(os.getenv("COHERE_KEY_RPS", "0"))
+}
+
+# Semantic answer cache in front of the search pipeline: answers with at least
+# SEMANTIC_CACHE_MIN_CONFIDENCE are reused for queries whose embedding cosine
+# similarity reaches the threshold. Queries are embedded locally by default so a
+# lookup never waits on a remote call. TTLs per query class as "class=seconds,..."
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+SEMANTIC_CACHE_MIN_CONFIDENCE = float(os.getenv("SEMANTIC_CACHE_MIN_CONFIDENCE", "70"))
+SEMANTIC_CACHE_EMBEDDER = os.getenv("SEMANTIC_CACHE_EMBEDDER", "hashing")
+SEMANTIC_CACHE_TTLS = {
+    name.strip(): float(seconds)
+    for name, seconds in (
+        item.split("=") for item in
+        os.getenv("SEMANTIC_CACHE_TTLS", "time_sensitive=600,evergreen=86400,default=3600").split(",") if item.strip()
+    )
+}
+
+# Client-side rate limits per provider, shared by every outbound client
+# (requests/second and LLM tokens/minute, 0 = unlimited). Callers block for up to
+# RATE_LIMIT_TIMEOUT seconds, or fail fast with RATE_LIMIT_MODE=fail_fast
+RATE_LIMIT_MODE = os.getenv("RATE_LIMIT_MODE", "block")
+RATE_LIMIT_TIMEOUT = float(os.getenv("RATE_LIMIT_TIMEOUT", "30"))
+RATE_LIMITS = {
+    "openrouter": {
+        "requests_per_second": float(os.getenv("OPENROUTER_RPS", "0")),
+        "tokens_per_minute": float(os.getenv("OPENROUTER_TPM", "0"))
+    },
+    "openai": {
+        "requests_per_second": float(os.getenv("OPENAI_RPS", "0")),
+        "tokens_per_minute": float(os.getenv("OPENAI_TPM", "0"))
+    },
+    "serper": {"requests_per_second": float(os.getenv("SERPER_RPS", "0"))},
+    "cohere": {"requests_per_second": float(os.getenv("COHERE_RPS", "0"))},
+    "jira": {"requests_per_second": float(os.getenv("JIRA_RPS", "0"))}
+}
+
+# Query complexity routing for the reasoning pass. Queries scoring below
+# QUERY_COMPLEXITY_SKIP_BELOW get a direct search, those at or above
+# QUERY_COMPLEXITY_SEPARATE_ABOVE get a separate reasoning call, and the rest fold
+# the analysis into the search prompt. QUERY_COMPLEXITY_MODEL_PATH optionally
+# points to a JSON file of logistic regression weights over the classifier features
+QUERY_COMPLEXITY_SKIP_BELOW = float(os.getenv("QUERY_COMPLEXITY_SKIP_BELOW", "0.35"))
+QUERY_COMPLEXITY_SEPARATE_ABOVE = float(os.getenv("QUERY_COMPLEXITY_SEPARATE_ABOVE", "0.75"))
+QUERY_COMPLEXITY_MODEL_PATH = os.getenv("QUERY_COMPLEXITY_MODEL_PATH", "")
+
+# Local intent router: the coordinator LLM is only asked when rule/model
+# confidence is below INTENT_ROUTER_MIN_CONFIDENCE. INTENT_LOG_PATH appends routed
+# queries as JSON lines for training the optional INTENT_MODEL_PATH model
+INTENT_ROUTER_MIN_CONFIDENCE = float(os.getenv("INTENT_ROUTER_MIN_CONFIDENCE", "0.5"))
+INTENT_MODEL_PATH = os.getenv("INTENT_MODEL_PATH", "")
+INTENT_LOG_PATH = os.getenv("INTENT_LOG_PATH", "")
+
+# Agent team pipeline
+AGENT_TEAM_MAX_WORKERS = int(os.getenv("AGENT_TEAM_MAX_WORKERS", "16"))
 
 # Environment
 ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
\ No newline at end of file
@@ -0,0 +1,387 @@
+from agno.embedder.base import Embedder
+from agno.embedder.openai import OpenAIEmbedder
+from config import (
+    EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_PATH, EMBEDDER_BACKEND, EMBEDDER_DIMENSIONS,
+    EMBEDDER_BATCH_SIZE, ONNX_MODEL_PATH, ONNX_TOKENIZER_PATH
+)
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+import numpy as np
+import logging
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: appends are then only serialized within one process
+    fcntl = None
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def text_hash(text: str) -> str:
+    """SHA-256 of a text, used as its embedding cache key."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model id, text hash).
+    
+    Vectors are appended as raw float32 rows to one file per model and read
+    back through a memory map; a SQLite index maps each key to its row. Rows are
+    written before they are indexed, so a crash can leave an unused row at the
+    end of a file but never an index entry pointing at missing data. Appends
+    hold an exclusive lock on the file until their rows are indexed, so
+    processes sharing the cache cannot interleave rows, and a partial row left
+    by a crashed write is cut off before the next append.
+    """
+    
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._arrays = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0}
+        self._conn = sqlite3.connect(os.path.join(path, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings "
+            "(model TEXT NOT NULL, text_hash TEXT NOT NULL, row INTEGER NOT NULL, "
+            "PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+    
+    def _array(self, model: str, dimensions: int) -> dict:
+        """Get the vector file of a model, refreshing its memory map if it grew. Caller holds the lock."""
+        key = f"{model}:{dimensions}"
+        array = self._arrays.get(key)
+        if array is None:
+            name = re.sub(r"[^A-Za-z0-9_.-]", "_", key)
+            array = {"key": key, "file": os.path.join(self.path, f"{name}.f32"), "map": None, "mapped_rows": 0}
+            self._arrays[key] = array
+        
+        row_bytes = 4 * dimensions
+        size = os.path.getsize(array["file"]) if os.path.exists(array["file"]) else 0
+        array["rows"] = size // row_bytes
+        if array["rows"] and array["rows"] != array["mapped_rows"]:
+            array["map"] = np.memmap(array["file"], dtype=np.float32, mode="r", shape=(array["rows"], dimensions))
+            array["mapped_rows"] = array["rows"]
+        return array
+    
+    def get_many(self, model: str, dimensions: int, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached vectors.
+        
+        Args:
+            model (str): Embedding model id
+            dimensions (int): Vector dimensions
+            texts (List[str]): Texts to look up
+        
+        Returns:
+            List[Optional[np.ndarray]]: float32 vector per text, None on a miss
+        """
+        hashes = [text_hash(text) for text in texts]
+        with self._lock:
+            array = self._array(model, dimensions)
+            rows = {}
+            unique = list(set(hashes))
+            for start in range(0, len(unique), 500):
+                chunk = unique[start:start + 500]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows.update(self._conn.execute(
+                    f"SELECT text_hash, row FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [array["key"], *chunk]
+                ).fetchall())
+            
+            vectors = []
+            for digest in hashes:
+                row = rows.get(digest)
+                if row is not None and row < array["rows"]:
+                    vectors.append(array["map"][row])
+                    self._stats["hits"] += 1
+                else:
+                    vectors.append(None)
+                    self._stats["misses"] += 1
+        return vectors
+    
+    def put_many(self, model: str, dimensions: int, texts: List[str], vectors: List[List[float]]):
+        """
+        Store vectors for texts.
+        
+        Args:
+            model (str): Embedding model id
+            dimensions (int): Vector dimensions
+            texts (List[str]): Embedded texts
+            vectors (List[List[float]]): One vector per text
+        """
+        if not texts:
+            return
+        data = np.asarray(vectors, dtype=np.float32).reshape(len(texts), dimensions)
+        with self._lock:
+            array = self._array(model, dimensions)
+            with open(array["file"], "ab") as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                try:
+                    # Re-read the size under the file lock; another process may have appended
+                    array = self._array(model, dimensions)
+                    first_row = array["rows"]
+                    f.truncate(first_row * 4 * dimensions)
+                    f.write(data.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (model, text_hash, row) VALUES (?, ?, ?)",
+                        [(array["key"], text_hash(text), first_row + i) for i, text in enumerate(texts)]
+                    )
+                    self._conn.commit()
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+        
+        Returns:
+            dict: Hits, misses and hit rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+# Global embedding cache instance
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Get the process-wide embedding cache, creating it on first use.
+    
+    Returns:
+        EmbeddingCache: Shared cache stored under EMBEDDING_CACHE_PATH
+    """
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _embedding_cache_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH)
+    return _embedding_cache
+
+@dataclass
+class CachedEmbedder(Embedder):
+    """
+    Embedder wrapper that serves vectors from an EmbeddingCache.
+    
+    Misses from a batch are deduplicated and sent to the wrapped embedder in a
+    single call when it supports batched input.
+    """
+    
+    embedder: Optional[Embedder] = None
+    cache: Optional[EmbeddingCache] = None
+    
+    def __post_init__(self):
+        if self.embedder is None:
+            raise ValueError("CachedEmbedder requires an embedder to wrap")
+        self.dimensions = self.embedder.dimensions
+        if self.cache is None:
+            self.cache = get_embedding_cache()
+    
+    @property
+    def model_id(self) -> str:
+        return getattr(self.embedder, "id", type(self.embedder).__name__)
+    
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts with the wrapped embedder, in one request when possible."""
+        if hasattr(self.embedder, "get_embeddings"):
+            return self.embedder.get_embeddings(texts)
+        if isinstance(self.embedder, OpenAIEmbedder):
+            response = self.embedder.response(text=texts)
+            return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        return [self.embedder.get_embedding(text) for text in texts]
+    
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts, calling the wrapped embedder once for all misses.
+        
+        Args:
+            texts (List[str]): Texts to embed
+        
+        Returns:
+            List[List[float]]: One vector per text
+        """
+        cached = self.cache.get_many(self.model_id, self.dimensions, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        
+        fresh = {}
+        if missing:
+            vectors = self._embed_batch(missing)
+            valid = [(text, vector) for text, vector in zip(missing, vectors) if vector]
+            self.cache.put_many(self.model_id, self.dimensions, [t for t, _ in valid], [v for _, v in valid])
+            fresh = dict(zip(missing, vectors))
+        
+        return [vector.tolist() if vector is not None else fresh.get(text, []) for text, vector in zip(texts, cached)]
+    
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embeddings([text])[0]
+    
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+@dataclass
+class HashingEmbedder(Embedder):
+    """
+    Dependency-free local embedder using signed feature hashing.
+    
+    Lower-cased word unigrams and bigrams are hashed with CRC32 into a fixed
+    number of buckets and the resulting vector is L2-normalised. Whole batches
+    are accumulated into one NumPy matrix, so embedding needs no network and no
+    model weights; quality is lexical rather than semantic.
+    """
+    
+    id: str = "hashing"
+    dimensions: int = EMBEDDER_DIMENSIONS
+    
+    def _features(self, text: str) -> List[str]:
+        tokens = _TOKEN_PATTERN.findall(text.lower())
+        return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts in one vectorised pass.
+        
+        Args:
+            texts (List[str]): Texts to embed
+        
+        Returns:
+            List[List[float]]: One unit-length vector per text
+        """
+        rows, columns, signs = [], [], []
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                digest = zlib.crc32(feature.encode("utf-8"))
+                rows.append(row)
+                columns.append(digest % self.dimensions)
+                signs.append(1.0 if digest & 0x80000000 else -1.0)
+        
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        np.add.at(matrix, (np.asarray(rows, dtype=np.int64), np.asarray(columns, dtype=np.int64)), signs)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+        return matrix.tolist()
+    
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embeddings([text])[0]
+    
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+@dataclass
+class OnnxEmbedder(Embedder):
+    """
+    Local sentence-embedding model run with ONNX Runtime on the CPU.
+    
+    Expects a sentence-transformers style model exported to ONNX together with
+    its `tokenizer.json`. Token embeddings are mean-pooled over the attention
+    mask and L2-normalised. The session uses one intra-op thread per core.
+    Requires the optional `onnxruntime` and `tokenizers` packages.
+    """
+    
+    id: str = "onnx"
+    dimensions: int = EMBEDDER_DIMENSIONS
+    model_path: str = ONNX_MODEL_PATH
+    tokenizer_path: str = ONNX_TOKENIZER_PATH
+    batch_size: int = EMBEDDER_BATCH_SIZE
+    max_length: int = 256
+    
+    def __post_init__(self):
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError("`onnxruntime` and `tokenizers` are required for the ONNX embedder")
+        
+        if not self.model_path or not self.tokenizer_path:
+            raise ValueError("ONNX_MODEL_PATH and ONNX_TOKENIZER_PATH must be set for the ONNX embedder")
+        
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = os.cpu_count() or 1
+        self._session = onnxruntime.InferenceSession(
+            self.model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {model_input.name for model_input in self._session.get_inputs()}
+        
+        self._tokenizer = Tokenizer.from_file(self.tokenizer_path)
+        self._tokenizer.enable_truncation(max_length=self.max_length)
+        self._tokenizer.enable_padding()
+    
+    def get_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts, running the model once per batch.
+        
+        Args:
+            texts (List[str]): Texts to embed
+        
+        Returns:
+            List[List[float]]: One unit-length vector per text
+        """
+        vectors = []
+        for start in range(0, len(texts), self.batch_size):
+            encodings = self._tokenizer.encode_batch(texts[start:start + self.batch_size])
+            input_ids = np.asarray([encoding.ids for encoding in encodings], dtype=np.int64)
+            mask = np.asarray([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+            
+            feeds = {"input_ids": input_ids, "attention_mask": mask}
+            if "token_type_ids" in self._input_names:
+                feeds["token_type_ids"] = np.zeros_like(input_ids)
+            
+            tokens = self._session.run(None, feeds)[0]
+            weights = mask[..., None].astype(np.float32)
+            pooled = (tokens * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            vectors.extend(pooled.astype(np.float32).tolist())
+        return vectors
+    
+    def get_embedding(self, text: str) -> List[float]:
+        return self.get_embeddings([text])[0]
+    
+    def get_embedding_and_usage(self, text: str) -> Tuple[List[float], Optional[Dict]]:
+        return self.get_embedding(text), None
+
+def create_embedder(backend: str = EMBEDDER_BACKEND, embedder_id: str = "text-embedding-3-small",
+                    api_key: str = None, base_url: str = None) -> Embedder:
+    """
+    Create the embedder selected by EMBEDDER_BACKEND.
+    
+    Args:
+        backend (str): "openai" (remote), "onnx" (local model) or "hashing" (local, no model)
+        embedder_id (str): Remote embedding model id, used by the openai backend
+        api_key (str): API key for the remote endpoint
+        base_url (str): Base URL of the remote endpoint
+    
+    Returns:
+        Embedder: Embedder, wrapped in CachedEmbedder when the embedding cache is enabled
+    """
+    if backend == "hashing":
+        # Hashing is cheaper than a cache lookup, so it is never wrapped
+        return HashingEmbedder()
+    if backend == "onnx":
+        embedder = OnnxEmbedder()
+    elif backend == "openai":
+        embedder = OpenAIEmbedder(id=embedder_id, api_key=api_key, base_url=base_url)
+    else:
+        raise ValueError(f"Unknown embedder backend: {backend}")
+    
+    if EMBEDDING_CACHE_ENABLED:
+        embedder = CachedEmbedder(embedder=embedder)
+    return embedder
@@ -0,0 +1,612 @@
+from agno.knowledge.url import UrlKnowledge
+from agno.vectordb.lancedb import LanceDb, SearchType
+from agno.document import Document
+from knowledge.embeddings import create_embedder
+from knowledge.lexical_index import get_lexical_index
+from knowledge.reranker import create_reranker
+from config import (
+    OPENROUTER_API_KEY, OPENROUTER_BASE_URL, COHERE_API_KEY,
+    KNOWLEDGE_MANIFEST_PATH, KNOWLEDGE_INGEST_BATCH_SIZE, EMBEDDER_BACKEND, LEXICAL_INDEX_ENABLED,
+    RERANKER_BACKEND, VECTOR_INDEX_TYPE, VECTOR_INDEX_MIN_ROWS, KNOWLEDGE_SEARCH_DEPTH
+)
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from typing import List, Optional
+import hashlib
+import math
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Default knowledge base definition shared by the search agents
+DEFAULT_KNOWLEDGE_URLS = [
+    "https://en.wikipedia.org/wiki/Web_search_engine",
+    "https://en.wikipedia.org/wiki/Information_retrieval"
+]
+DEFAULT_KNOWLEDGE_URI = "./data/knowledge"
+DEFAULT_TABLE_NAME = "search_kb"
+DEFAULT_EMBEDDER_ID = "text-embedding-3-small"
+DEFAULT_RERANKER_MODEL = "rerank-english-v3.0"
+
+# ANN query knobs per search depth. nprobes is the number of IVF partitions
+# scanned, refine_factor re-ranks that many times the limit with exact
+# distances, and ef is the HNSW candidate list size.
+SEARCH_DEPTH_PROFILES = {
+    "quick": {"nprobes": 10, "refine_factor": None, "ef": 32},
+    "standard": {"nprobes": 20, "refine_factor": 5, "ef": 64},
+    "deep": {"nprobes": 64, "refine_factor": 20, "ef": 160}
+}
+
+_search_depth = ContextVar("knowledge_search_depth", default=None)
+
+@contextmanager
+def search_depth(depth: str):
+    """
+    Run knowledge lookups in the current context with the given depth profile.
+    
+    Args:
+        depth (str): "quick", "standard" or "deep"
+    """
+    if depth not in SEARCH_DEPTH_PROFILES:
+        raise ValueError(f"Unknown search depth: {depth}")
+    token = _search_depth.set(depth)
+    try:
+        yield
+    finally:
+        _search_depth.reset(token)
+
+class TunedLanceDb(LanceDb):
+    """
+    LanceDb with ANN query knobs taken from the active search depth profile.
+    
+    The depth comes from `search_depth(...)` when set, otherwise from
+    `default_depth`. The full-text index is reused when it already exists on
+    disk instead of being rebuilt by the first hybrid search of every process.
+    """
+    
+    def __init__(self, *args, default_depth: str = KNOWLEDGE_SEARCH_DEPTH, **kwargs):
+        kwargs.setdefault("use_tantivy", False)
+        super().__init__(*args, **kwargs)
+        self.default_depth = default_depth
+        self.fts_index_exists = self._has_fts_index()
+    
+    def _has_fts_index(self) -> bool:
+        try:
+            return any(index.index_type == "FTS" for index in self.table.list_indices())
+        except Exception:
+            return False
+    
+    def _tune(self, query_builder):
+        profile = SEARCH_DEPTH_PROFILES[_search_depth.get() or self.default_depth]
+        if profile["nprobes"]:
+            query_builder = query_builder.nprobes(self.nprobes or profile["nprobes"])
+        if profile["refine_factor"]:
+            query_builder = query_builder.refine_factor(profile["refine_factor"])
+        if profile["ef"]:
+            query_builder = query_builder.ef(profile["ef"])
+        return query_builder
+    
+    def vector_search(self, query: str, limit: int = 5):
+        query_embedding = self.embedder.get_embedding(query)
+        if not query_embedding or self.table is None:
+            logger.error(f"Vector search unavailable for query: {query}")
+            return None
+        
+        results = self.table.search(query=query_embedding, vector_column_name=self._vector_col).limit(limit)
+        return self._tune(results).to_pandas()
+    
+    def hybrid_search(self, query: str, limit: int = 5):
+        query_embedding = self.embedder.get_embedding(query)
+        if not query_embedding or self.table is None:
+            logger.error(f"Hybrid search unavailable for query: {query}")
+            return None
+        
+        if not self.fts_index_exists:
+            self.table.create_fts_index("payload", use_tantivy=self.use_tantivy, replace=True)
+            self.fts_index_exists = True
+        
+        results = (
+            self.table.search(vector_column_name=self._vector_col, query_type="hybrid")
+            .vector(query_embedding)
+            .text(query)
+            .limit(limit)
+        )
+        return self._tune(results).to_pandas()
+
+class KnowledgeIndexManager:
+    """
+    Lifecycle of the ANN and full-text indexes of a knowledge base table.
+    
+    Brute-force search is exact and fast while the table is small, so the
+    vector index is only built once the row count reaches `min_rows`; after
+    that, compaction through `optimize()` folds new fragments into the
+    existing indexes. The number of IVF partitions follows sqrt(rows) and PQ
+    uses 16-dimensional sub-vectors when the vector size allows it.
+    """
+    
+    def __init__(self, vector_db: LanceDb, min_rows: int = VECTOR_INDEX_MIN_ROWS,
+                 index_type: str = VECTOR_INDEX_TYPE):
+        self.vector_db = vector_db
+        self.min_rows = min_rows
+        self.index_type = index_type
+    
+    @property
+    def table(self):
+        return self.vector_db.table
+    
+    def _indices(self) -> list:
+        return list(self.table.list_indices())
+    
+    def has_vector_index(self) -> bool:
+        return any(self.vector_db._vector_col in index.columns and index.index_type != "FTS"
+                   for index in self._indices())
+    
+    def has_fts_index(self) -> bool:
+        return any(index.index_type == "FTS" for index in self._indices())
+    
+    def _num_sub_vectors(self) -> int:
+        dimensions = self.vector_db.dimensions
+        for divisor in (16, 8, 4, 2, 1):
+            if dimensions % divisor == 0:
+                return dimensions // divisor
+        return 1
+    
+    def ensure_vector_index(self, force: bool = False) -> bool:
+        """
+        Build the ANN index once the table is large enough.
+        
+        Args:
+            force (bool): Rebuild even if an index already exists
+        
+        Returns:
+            bool: True if an index was built
+        """
+        rows = self.table.count_rows()
+        if rows < self.min_rows or (self.has_vector_index() and not force):
+            return False
+        
+        num_partitions = max(1, int(math.sqrt(rows)))
+        logger.info(f"Building {self.index_type} index over {rows} rows with {num_partitions} partitions")
+        self.table.create_index(
+            metric=self.vector_db.distance.value,
+            num_partitions=num_partitions,
+            num_sub_vectors=self._num_sub_vectors() if "PQ" in self.index_type else None,
+            vector_column_name=self.vector_db._vector_col,
+            index_type=self.index_type,
+            replace=True
+        )
+        return True
+    
+    def ensure_fts_index(self) -> bool:
+        """
+        Build the full-text index over document payloads if it is missing.
+        
+        Returns:
+            bool: True if an index was built
+        """
+        if self.has_fts_index():
+            self.vector_db.fts_index_exists = True
+            return False
+        self.table.create_fts_index("payload", use_tantivy=False, replace=True)
+        self.vector_db.fts_index_exists = True
+        return True
+    
+    def compact(self, cleanup_older_than: timedelta = timedelta(days=7)):
+        """Merge small fragments, fold new rows into the indexes and prune old versions."""
+        self.table.optimize(cleanup_older_than=cleanup_older_than)
+    
+    def maintain(self) -> dict:
+        """
+        Run compaction and make sure both indexes exist.
+        
+        Returns:
+            dict: Row count, actions taken and current indexes
+        """
+        self.compact()
+        vector_index_built = self.ensure_vector_index()
+        fts_index_built = self.ensure_fts_index()
+        return {
+            "rows": self.table.count_rows(),
+            "vector_index_built": vector_index_built,
+            "fts_index_built": fts_index_built,
+            "indices": [f"{index.name}:{index.index_type}" for index in self._indices()]
+        }
+
+def default_table_name(backend: str = EMBEDDER_BACKEND) -> str:
+    """Table name for an embedder backend; local backends get their own table since vector sizes differ."""
+    return DEFAULT_TABLE_NAME if backend == "openai" else f"{DEFAULT_TABLE_NAME}_{backend}"
+
+def build_knowledge_base(uri: str, table_name: str, embedder_id: str, api_key: str, base_url: str,
+                         backend: str = EMBEDDER_BACKEND, urls: list = None):
+    """
+    Build a URL knowledge base over a LanceDB table with hybrid search.
+    
+    Args:
+        uri (str): LanceDB database URI
+        table_name (str): LanceDB table name
+        embedder_id (str): Embedding model id
+        api_key (str): API key for the embedding endpoint
+        base_url (str): Base URL of the embedding endpoint
+        backend (str): Embedder backend, see create_embedder
+        urls (list): Source URLs for the knowledge base
+    
+    Returns:
+        UrlKnowledge: Knowledge base
+    """
+    embedder = create_embedder(backend, embedder_id=embedder_id, api_key=api_key, base_url=base_url)
+    reranker = create_reranker(
+        RERANKER_BACKEND,
+        embedder=embedder,
+        lexical_index=get_lexical_index() if LEXICAL_INDEX_ENABLED else None,
+        cohere_api_key=COHERE_API_KEY,
+        model=DEFAULT_RERANKER_MODEL
+    )
+    
+    return UrlKnowledge(
+        urls=urls or DEFAULT_KNOWLEDGE_URLS,
+        vector_db=TunedLanceDb(
+            uri=uri,
+            table_name=table_name,
+            search_type=SearchType.hybrid,
+            embedder=embedder,
+            reranker=reranker
+        )
+    )
+
+class KnowledgeBaseRegistry:
+    """
+    Process-wide registry handing out one shared knowledge base per configuration.
+    
+    Each distinct (uri, table, embedder) configuration is opened once, on first
+    use, and every agent asking for it receives the same instance. This keeps a
+    single LanceDB handle and embedder/reranker stack per table instead of one
+    per agent. Credentials are not part of the configuration, so agents holding
+    different pooled keys still share one instance.
+    """
+    
+    def __init__(self, factory=build_knowledge_base):
+        self.factory = factory
+        self._instances = {}
+        self._lock = threading.Lock()
+    
+    def get(self, uri: str = DEFAULT_KNOWLEDGE_URI, table_name: str = None,
+            embedder_id: str = DEFAULT_EMBEDDER_ID, api_key: str = OPENROUTER_API_KEY,
+            base_url: str = OPENROUTER_BASE_URL, backend: str = EMBEDDER_BACKEND):
+        """
+        Get the shared knowledge base for a configuration, opening it on first use.
+        
+        Args:
+            uri (str): LanceDB database URI
+            table_name (str): LanceDB table name, defaults to the backend's table
+            embedder_id (str): Embedding model id
+            api_key (str): API key for the embedding endpoint, used only when the table is first opened
+            base_url (str): Base URL of the embedding endpoint
+            backend (str): Embedder backend, see create_embedder
+        
+        Returns:
+            UrlKnowledge: Shared knowledge base
+        """
+        table_name = table_name or default_table_name(backend)
+        key = (uri, table_name, backend, embedder_id, base_url)
+        
+        knowledge = self._instances.get(key)
+        if knowledge is not None:
+            return knowledge
+        
+        with self._lock:
+            knowledge = self._instances.get(key)
+            if knowledge is None:
+                logger.info(f"Opening knowledge base {uri}/{table_name} with {backend} embedder")
+                knowledge = self.factory(uri, table_name, embedder_id, api_key, base_url, backend)
+                self._instances[key] = knowledge
+            return knowledge
+    
+    def __len__(self):
+        return len(self._instances)
+    
+    def clear(self):
+        """Forget every shared instance."""
+        with self._lock:
+            self._instances.clear()
+
+# Global registry instance
+knowledge_registry = KnowledgeBaseRegistry()
+
+def get_knowledge_base(api_key: str = OPENROUTER_API_KEY, base_url: str = OPENROUTER_BASE_URL, **kwargs):
+    """
+    Get the shared search knowledge base.
+    
+    Args:
+        api_key (str): API key for the embedding endpoint
+        base_url (str): Base URL of the embedding endpoint
+        **kwargs: uri, table_name, embedder_id or backend overrides
+    
+    Returns:
+        UrlKnowledge: Shared knowledge base
+    """
+    return knowledge_registry.get(api_key=api_key, base_url=base_url, **kwargs)
+
+class IngestionManifest:
+    """
+    SQLite record of which sources and chunks have been embedded.
+    
+    Rows are kept per target (the LanceDB uri and table), since each embedder
+    backend has its own table and a source ingested into one is still missing
+    from the others. A source is marked complete only after all of its chunks
+    are stored, and every chunk is recorded as soon as its batch is upserted,
+    so an interrupted run resumes from the first chunk that was not yet written.
+    """
+    
+    def __init__(self, path: str = KNOWLEDGE_MANIFEST_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(sources)").fetchall()]
+        if columns and "target" not in columns:
+            # Manifests from before per-table tracking cannot tell which table a source went into
+            logger.info("Rebuilding ingestion manifest with per-table tracking")
+            self._conn.execute("DROP TABLE sources")
+            self._conn.execute("DROP TABLE IF EXISTS chunks")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sources ("
+            "target TEXT NOT NULL, source TEXT NOT NULL, content_hash TEXT, status TEXT NOT NULL, "
+            "chunk_count INTEGER NOT NULL DEFAULT 0, updated_at REAL NOT NULL, PRIMARY KEY (target, source))"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "target TEXT NOT NULL, source TEXT NOT NULL, chunk_hash TEXT NOT NULL, doc_id TEXT NOT NULL, "
+            "ingested_at REAL NOT NULL, PRIMARY KEY (target, source, chunk_hash))"
+        )
+        self._conn.commit()
+    
+    def source(self, target: str, source: str) -> Optional[dict]:
+        """Get the manifest row for a source in a target table, or None if it was never ingested there."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content_hash, status, chunk_count FROM sources WHERE target = ? AND source = ?",
+                (target, source)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"content_hash": row[0], "status": row[1], "chunk_count": row[2]}
+    
+    def mark_source(self, target: str, source: str, content_hash: str, status: str, chunk_count: int = 0):
+        """Record the state of a source in a target table."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sources (target, source, content_hash, status, chunk_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (target, source, content_hash, status, chunk_count, time.time())
+            )
+            self._conn.commit()
+    
+    def chunks(self, target: str, source: str) -> dict:
+        """Get the stored chunks of a source as chunk hash to LanceDB document id."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chunk_hash, doc_id FROM chunks WHERE target = ? AND source = ?", (target, source)
+            ).fetchall()
+        return dict(rows)
+    
+    def add_chunks(self, target: str, source: str, chunks: List[tuple]):
+        """Record (chunk_hash, doc_id) pairs as stored."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (target, source, chunk_hash, doc_id, ingested_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(target, source, chunk_hash, doc_id, now) for chunk_hash, doc_id in chunks]
+            )
+            self._conn.commit()
+    
+    def shared_doc_ids(self, target: str, source: str, doc_ids: List[str]) -> set:
+        """
+        Get the doc ids that other sources in the target still use.
+        
+        LanceDB ids are derived from chunk content, so a chunk repeated across
+        sources is stored once and must outlive its removal from any one of them.
+        """
+        if not doc_ids:
+            return set()
+        placeholders = ", ".join("?" for _ in doc_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT DISTINCT doc_id FROM chunks WHERE target = ? AND source != ? AND doc_id IN ({placeholders})",
+                (target, source, *doc_ids)
+            ).fetchall()
+        return {row[0] for row in rows}
+    
+    def remove_chunks(self, target: str, source: str, chunk_hashes: List[str]):
+        """Forget chunks that are no longer part of a source."""
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM chunks WHERE target = ? AND source = ? AND chunk_hash = ?",
+                [(target, source, chunk_hash) for chunk_hash in chunk_hashes]
+            )
+            self._conn.commit()
+
+class KnowledgeIngestor:
+    """
+    Incremental ingestion of knowledge base sources into LanceDB.
+    
+    Sources are read and chunked with the knowledge base's reader, each chunk
+    is identified by the SHA-256 of its content, and only chunks missing from
+    the manifest are embedded and upserted. Chunks that disappeared from a
+    changed source are deleted from the table unless another source still
+    contains them. Re-ingesting an unchanged corpus
+    therefore performs no embedding calls.
+    """
+    
+    def __init__(self, knowledge, manifest: IngestionManifest = None, batch_size: int = KNOWLEDGE_INGEST_BATCH_SIZE,
+                 lexical_index=None, index_manager: KnowledgeIndexManager = None):
+        self.knowledge = knowledge
+        self.manifest = manifest or IngestionManifest()
+        self.batch_size = batch_size
+        self.lexical_index = lexical_index
+        self.index_manager = index_manager
+        vector_db = knowledge.vector_db
+        self.target = f"{getattr(vector_db, 'uri', '')}/{getattr(vector_db, 'table_name', '')}"
+    
+    def _read_source(self, source: str) -> List[Document]:
+        """Read a URL or local file into chunked documents."""
+        reader = self.knowledge.reader
+        if os.path.isfile(source):
+            with open(source, encoding="utf-8") as f:
+                document = Document(
+                    name=os.path.basename(source),
+                    meta_data={"path": source},
+                    content=f.read()
+                )
+            return reader.chunk_document(document) if reader.chunk else [document]
+        return reader.read(url=source)
+    
+    def _delete_documents(self, doc_ids: List[str]):
+        """Remove stale chunks from the LanceDB table."""
+        table = getattr(self.knowledge.vector_db, "table", None)
+        if table is None or not doc_ids:
+            return
+        quoted = ", ".join(f"'{doc_id}'" for doc_id in doc_ids)
+        table.delete(f"id IN ({quoted})")
+    
+    def _index_lexical(self, write):
+        """Apply a write to the lexical index; a failure there must not abort the ingest."""
+        if self.lexical_index is None:
+            return
+        try:
+            write(self.lexical_index)
+        except Exception as e:
+            logger.warning(f"Failed to update lexical index: {str(e)}")
+    
+    def ingest_source(self, source: str, force: bool = False) -> dict:
+        """
+        Ingest one source, embedding only chunks that are not stored yet.
+        
+        Args:
+            source (str): URL or local file path
+            force (bool): Re-check every chunk even if the source is unchanged
+        
+        Returns:
+            dict: Counts of new, unchanged and removed chunks
+        """
+        documents = self._read_source(source)
+        cleaned = [doc.content.replace("\x00", "\ufffd") for doc in documents]
+        source_hash = hashlib.sha256("\n".join(cleaned).encode()).hexdigest()
+        
+        state = self.manifest.source(self.target, source)
+        if not force and state and state["status"] == "complete" and state["content_hash"] == source_hash:
+            return {"source": source, "new": 0, "unchanged": state["chunk_count"], "removed": 0, "skipped": True}
+        
+        self.manifest.mark_source(self.target, source, source_hash, "in_progress")
+        stored = self.manifest.chunks(self.target, source)
+        
+        current = {}
+        pending = []
+        for document, content in zip(documents, cleaned):
+            chunk_hash = hashlib.sha256(content.encode()).hexdigest()
+            if chunk_hash in current:
+                continue
+            current[chunk_hash] = hashlib.md5(content.encode()).hexdigest()
+            if chunk_hash not in stored:
+                pending.append((chunk_hash, document))
+        
+        embedder = self.knowledge.vector_db.embedder
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            if hasattr(embedder, "get_embeddings"):
+                # Warm the embedding cache with one call for the whole batch
+                embedder.get_embeddings([document.content for _, document in batch])
+            self.knowledge.vector_db.upsert([document for _, document in batch])
+            self._index_lexical(lambda index: index.add_knowledge_chunks(
+                [(current[chunk_hash], document) for chunk_hash, document in batch]
+            ))
+            self.manifest.add_chunks(self.target, source, [(chunk_hash, current[chunk_hash]) for chunk_hash, _ in batch])
+        
+        stale = [chunk_hash for chunk_hash in stored if chunk_hash not in current]
+        if stale:
+            doc_ids = {stored[chunk_hash] for chunk_hash in stale}
+            doc_ids -= self.manifest.shared_doc_ids(self.target, source, list(doc_ids))
+            doc_ids = sorted(doc_ids)
+            self._delete_documents(doc_ids)
+            self._index_lexical(lambda index: index.delete_documents(doc_ids))
+            self.manifest.remove_chunks(self.target, source, stale)
+        
+        self.manifest.mark_source(self.target, source, source_hash, "complete", len(current))
+        return {
+            "source": source,
+            "new": len(pending),
+            "unchanged": len(current) - len(pending),
+            "removed": len(stale),
+            "skipped": False
+        }
+    
+    def ingest(self, sources: List[str] = None, force: bool = False) -> dict:
+        """
+        Ingest every source of the knowledge base.
+        
+        Args:
+            sources (List[str]): URLs or file paths, defaults to the knowledge base URLs
+            force (bool): Re-check every chunk even for unchanged sources
+        
+        Returns:
+            dict: Totals plus per-source results and errors
+        """
+        sources = sources if sources is not None else list(self.knowledge.urls)
+        started = time.perf_counter()
+        report = {"new": 0, "unchanged": 0, "removed": 0, "sources": [], "errors": {}}
+        
+        for source in sources:
+            try:
+                result = self.ingest_source(source, force=force)
+            except Exception as e:
+                logger.error(f"Failed to ingest {source}: {str(e)}")
+                report["errors"][source] = str(e)
+                continue
+            report["sources"].append(result)
+            for count in ("new", "unchanged", "removed"):
+                report[count] += result[count]
+        
+        if self.index_manager is not None and (report["new"] or report["removed"]):
+            try:
+                report["indexes"] = self.index_manager.maintain()
+            except Exception as e:
+                logger.error(f"Index maintenance failed: {str(e)}")
+                report["errors"]["indexes"] = str(e)
+        
+        report["elapsed"] = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"Knowledge ingestion: {report['new']} new, {report['unchanged']} unchanged, "
+            f"{report['removed']} removed chunks in {report['elapsed']}s"
+        )
+        return report
+
+def ingest_knowledge_base(sources: List[str] = None, force: bool = False, **kwargs) -> dict:
+    """
+    Incrementally ingest sources into the shared knowledge base.
+    
+    Args:
+        sources (List[str]): URLs or file paths, defaults to DEFAULT_KNOWLEDGE_URLS
+        force (bool): Re-check every chunk even for unchanged sources
+        **kwargs: Knowledge base overrides passed to get_knowledge_base
+    
+    Returns:
+        dict: Ingestion report
+    """
+    knowledge = get_knowledge_base(**kwargs)
+    ingestor = KnowledgeIngestor(
+        knowledge,
+        lexical_index=get_lexical_index() if LEXICAL_INDEX_ENABLED else None,
+        index_manager=KnowledgeIndexManager(knowledge.vector_db)
+    )
+    return ingestor.ingest(sources, force=force)
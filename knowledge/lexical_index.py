@@ -0,0 +1,335 @@
+from config import (
+    LEXICAL_INDEX_PATH, LEXICAL_REUSE_MAX_AGE, LEXICAL_FLUSH_INTERVAL
+)
+from typing import List, Optional
+import atexit
+import hashlib
+import os
+import re
+import threading
+import time
+import tantivy
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+def _query_key(query: str) -> str:
+    """Normalize a query for reuse lookups (case and punctuation insensitive, word order kept)."""
+    return " ".join(_tokens(query))
+
+def _doc_id(*parts: str) -> str:
+    return hashlib.md5("\n".join(parts).encode()).hexdigest()
+
+class LexicalIndex:
+    """
+    In-process BM25 index over knowledge base chunks and Serper organic results.
+    
+    Backed by tantivy, either on disk or in memory. Serper results are stored
+    with the normalized query that retrieved them and their rank, so a repeat
+    query can be answered from local evidence without a network
+    round trip. Each write opens the index writer, commits and releases it
+    again, so several processes can share an on-disk index; searches use a
+    searcher that is refreshed after every commit. Serper results seen on the
+    request path are queued and committed in batches by a background timer.
+    """
+    
+    def __init__(self, path: str = LEXICAL_INDEX_PATH, flush_interval: float = LEXICAL_FLUSH_INTERVAL,
+                 lock_timeout: float = 5.0):
+        builder = tantivy.SchemaBuilder()
+        builder.add_text_field("doc_id", stored=True, tokenizer_name="raw")
+        builder.add_text_field("source", stored=True, tokenizer_name="raw")
+        builder.add_text_field("title", stored=True)
+        builder.add_text_field("body", stored=True)
+        builder.add_text_field("link", stored=True, tokenizer_name="raw")
+        builder.add_text_field("query", stored=True)
+        builder.add_text_field("query_key", stored=True, tokenizer_name="raw")
+        builder.add_integer_field("position", stored=True)
+        builder.add_float_field("added_at", stored=True)
+        self.schema = builder.build()
+        
+        if path:
+            os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.index = tantivy.Index(self.schema, path=path or None)
+        self.flush_interval = flush_interval
+        self.lock_timeout = lock_timeout
+        self._lock = threading.Lock()
+        self._searcher = self.index.searcher()
+        
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._flush_timer = None
+    
+    def _open_writer(self):
+        """
+        Open an index writer, waiting while another process holds the index lock.
+        Caller holds the lock.
+        """
+        deadline = time.time() + self.lock_timeout
+        while True:
+            try:
+                return self.index.writer(heap_size=15_000_000, num_threads=1)
+            except ValueError as e:
+                if "LockBusy" not in str(e) or time.time() >= deadline:
+                    raise
+                time.sleep(0.05)
+    
+    def _write(self, apply):
+        """Run apply(writer) with a fresh writer, commit and release the index lock."""
+        with self._lock:
+            writer = self._open_writer()
+            try:
+                apply(writer)
+                writer.commit()
+            finally:
+                # Consumes the writer and releases the lockfile for other processes
+                writer.wait_merging_threads()
+            self.index.reload()
+            self._searcher = self.index.searcher()
+    
+    def add_documents(self, documents: List[dict], replace: List[tuple] = None):
+        """
+        Add or replace documents.
+        
+        Args:
+            documents (List[dict]): Documents with doc_id, source, title, body and
+                optionally link, query, query_key and position
+            replace (List[tuple]): (field, value) terms whose documents are deleted first
+        """
+        if not documents:
+            return
+        
+        now = time.time()
+        
+        def apply(writer):
+            for field_name, value in replace or []:
+                writer.delete_documents_by_term(field_name, value)
+            for document in documents:
+                writer.delete_documents_by_term("doc_id", document["doc_id"])
+                writer.add_document(tantivy.Document(
+                    doc_id=document["doc_id"],
+                    source=document["source"],
+                    title=document.get("title", ""),
+                    body=document.get("body", ""),
+                    link=document.get("link", ""),
+                    query=document.get("query", ""),
+                    query_key=document.get("query_key", ""),
+                    position=int(document.get("position", 0)),
+                    added_at=document.get("added_at", now)
+                ))
+        
+        self._write(apply)
+    
+    def delete_documents(self, doc_ids: List[str]):
+        """Remove documents by id."""
+        if not doc_ids:
+            return
+        
+        def apply(writer):
+            for doc_id in doc_ids:
+                writer.delete_documents_by_term("doc_id", doc_id)
+        
+        self._write(apply)
+    
+    def add_serper_results(self, query: str, results: List[dict]):
+        """
+        Index Serper organic results together with the query that retrieved them.
+        
+        Args:
+            query (str): Search query
+            results (List[dict]): Serper organic results with title, snippet and link
+        """
+        query_key = _query_key(query)
+        self.add_documents(self._serper_documents(query, results, time.time()), replace=[("query_key", query_key)])
+    
+    def _serper_documents(self, query: str, results: List[dict], added_at: float) -> List[dict]:
+        query_key = _query_key(query)
+        return [
+            {
+                # One document per (query, result), so each query keeps its own ranking
+                "doc_id": _doc_id("serper", query_key, result.get("link", ""), result.get("title", "")),
+                "source": "serper",
+                "title": result.get("title", ""),
+                "body": result.get("snippet", ""),
+                "link": result.get("link", ""),
+                "query": query,
+                "query_key": query_key,
+                "position": position,
+                "added_at": added_at
+            }
+            for position, result in enumerate(results)
+        ]
+    
+    def queue_serper_results(self, query: str, results: List[dict]):
+        """
+        Queue Serper results for the next batched commit, keeping the request path free of index writes.
+        
+        Queued results are already served by lookup_serper.
+        
+        Args:
+            query (str): Search query
+            results (List[dict]): Serper organic results with title, snippet and link
+        """
+        with self._pending_lock:
+            self._pending[_query_key(query)] = (query, list(results), time.time())
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_interval, self.flush_pending)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+    
+    def flush_pending(self):
+        """Commit every queued Serper result set in one write."""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+        if not pending:
+            return
+        
+        documents = []
+        for query, results, added_at in pending.values():
+            documents.extend(self._serper_documents(query, results, added_at))
+        try:
+            self.add_documents(documents, replace=[("query_key", query_key) for query_key in pending])
+        except Exception as e:
+            logger.warning(f"Failed to index {len(pending)} queued Serper result sets: {str(e)}")
+    
+    def add_knowledge_chunks(self, chunks: List[tuple]):
+        """
+        Index knowledge base chunks.
+        
+        Args:
+            chunks (List[tuple]): (doc_id, Document) pairs, using the LanceDB document id
+        """
+        self.add_documents([
+            {
+                "doc_id": doc_id,
+                "source": "knowledge",
+                "title": document.name or "",
+                "body": document.content,
+                "link": (document.meta_data or {}).get("url", "")
+            }
+            for doc_id, document in chunks
+        ])
+    
+    def _parse(self, text: str, fields: List[str]):
+        tokens = _tokens(text)
+        if not tokens:
+            return None
+        # Only plain terms reach the parser, so user input cannot form query syntax
+        return self.index.parse_query(" ".join(tokens), fields)
+    
+    def search(self, query: str, limit: int = 10, source: str = None) -> List[dict]:
+        """
+        Run a BM25 query over titles and bodies.
+        
+        Args:
+            query (str): Free-text query
+            limit (int): Maximum number of hits
+            source (str): Restrict to "serper" or "knowledge"
+        
+        Returns:
+            List[dict]: Hits with title, body, link, source and score
+        """
+        parsed = self._parse(query, ["title", "body"])
+        if parsed is None:
+            return []
+        if source:
+            parsed = tantivy.Query.boolean_query([
+                (tantivy.Occur.Must, parsed),
+                (tantivy.Occur.Must, tantivy.Query.term_query(self.schema, "source", source))
+            ])
+        
+        searcher = self._searcher
+        hits = []
+        for score, address in searcher.search(parsed, limit).hits:
+            document = searcher.doc(address).to_dict()
+            hits.append({
+                "title": document["title"][0],
+                "body": document["body"][0],
+                "link": document["link"][0],
+                "source": document["source"][0],
+                "score": score
+            })
+        return hits
+    
+    def lookup_serper(self, query: str, num_results: int = 10,
+                      max_age: float = LEXICAL_REUSE_MAX_AGE) -> Optional[List[dict]]:
+        """
+        Serve a repeat query from previously indexed Serper results.
+        
+        Stored results qualify when their normalized query equals the new one
+        (so "paris to london" never answers "london to paris"), they are fresh
+        enough and there are at least num_results of them.
+        
+        Args:
+            query (str): Search query
+            num_results (int): Number of results needed
+            max_age (float): Maximum age of stored results in seconds, the Serper cache TTL by default
+        
+        Returns:
+            Optional[List[dict]]: Results in Serper's organic format, or None on a miss
+        """
+        query_key = _query_key(query)
+        if not query_key:
+            return None
+        
+        with self._pending_lock:
+            queued = self._pending.get(query_key)
+        if queued is not None:
+            _, results, added_at = queued
+            if time.time() - added_at <= max_age and len(results) >= num_results:
+                return [
+                    {"title": r.get("title", ""), "snippet": r.get("snippet", ""), "link": r.get("link", ""),
+                     "position": position + 1}
+                    for position, r in enumerate(results[:num_results])
+                ]
+        
+        searcher = self._searcher
+        # Re-indexing a query replaces its results, so one query has at most one result set
+        term = tantivy.Query.term_query(self.schema, "query_key", query_key)
+        documents = []
+        for _, address in searcher.search(term, max(num_results, 100)).hits:
+            document = searcher.doc(address).to_dict()
+            if document["source"][0] == "serper" and time.time() - document["added_at"][0] <= max_age:
+                documents.append(document)
+        
+        if len(documents) < num_results:
+            return None
+        
+        documents.sort(key=lambda document: document["position"][0])
+        return [
+            {"title": d["title"][0], "snippet": d["body"][0], "link": d["link"][0], "position": d["position"][0] + 1}
+            for d in documents[:num_results]
+        ]
+    
+    def __len__(self):
+        return self._searcher.num_docs
+
+# Global lexical index instance
+_lexical_index = None
+_lexical_index_lock = threading.Lock()
+
+def get_lexical_index() -> LexicalIndex:
+    """
+    Get the process-wide lexical index, creating it on first use.
+    
+    Returns:
+        LexicalIndex: Shared index, on disk when LEXICAL_INDEX_PATH is set
+    """
+    global _lexical_index
+    if _lexical_index is None:
+        with _lexical_index_lock:
+            if _lexical_index is None:
+                _lexical_index = LexicalIndex(LEXICAL_INDEX_PATH)
+                # Commit Serper results still queued when the process exits
+                atexit.register(_lexical_index.flush_pending)
+    return _lexical_index
@@ -0,0 +1,225 @@
+from agno.document import Document
+from agno.reranker.base import Reranker
+from agno.reranker.cohere import CohereReranker
+from agents.rate_limiter import get_rate_limiter
+from pydantic import Field, PrivateAttr
+from typing import Any, Dict, List, Optional
+import hashlib
+import re
+import threading
+import numpy as np
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# Weights of the cross-feature scorer: cosine similarity, BM25, query term coverage, title coverage
+FEATURE_WEIGHTS = np.array([0.45, 0.25, 0.2, 0.1], dtype=np.float32)
+
+def _doc_key(document: Document) -> str:
+    """LanceDB document id: md5 of the cleaned content."""
+    return hashlib.md5(document.content.replace("\x00", "\ufffd").encode()).hexdigest()
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> Dict[str, float]:
+    """
+    Fuse several rankings of document keys.
+    
+    Args:
+        rankings (List[List[str]]): Document keys, best first, one list per signal
+        k (int): RRF damping constant
+    
+    Returns:
+        Dict[str, float]: Fused score per key
+    """
+    scores = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, 1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return scores
+
+class HybridReranker(Reranker):
+    """
+    Local reranker fusing LanceDB, vector and BM25 rankings with reciprocal rank fusion.
+    
+    Drop-in `reranker` for LanceDb. The candidates from LanceDB's search are
+    fused with a cosine-similarity ranking computed from their stored vectors,
+    BM25 hits from the local lexical index (which may add candidates) and,
+    optionally, a vectorised NumPy cross-feature scorer. The remote fallback
+    reranker is only called when the local signals disagree on the best
+    document and the scorer cannot separate the top two.
+    """
+    
+    embedder: Optional[Any] = None
+    lexical_index: Optional[Any] = None
+    fallback: Optional[Reranker] = None
+    k: int = 60
+    top_n: Optional[int] = None
+    lexical_limit: int = 10
+    use_scorer: bool = True
+    ambiguity_margin: float = 0.05
+    stats: Dict[str, int] = Field(default_factory=lambda: {"local": 0, "fallback": 0})
+    _stats_lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    
+    def _count(self, outcome: str):
+        # The shared knowledge base reranks for every agent thread at once
+        with self._stats_lock:
+            self.stats[outcome] += 1
+    
+    def _lexical_candidates(self, query: str) -> List[Document]:
+        if self.lexical_index is None:
+            return []
+        try:
+            hits = self.lexical_index.search(query, limit=self.lexical_limit, source="knowledge")
+        except Exception as e:
+            logger.warning(f"Lexical search failed: {str(e)}")
+            return []
+        return [
+            Document(name=hit["title"], content=hit["body"], meta_data={"url": hit["link"]}, reranking_score=hit["score"])
+            for hit in hits
+        ]
+    
+    def _embeddings(self, query: str, documents: List[Document]):
+        """Query vector and document matrix; documents without a stored vector are embedded in one batch."""
+        missing = [doc for doc in documents if doc.embedding is None or len(doc.embedding) == 0]
+        if missing and hasattr(self.embedder, "get_embeddings"):
+            for doc, vector in zip(missing, self.embedder.get_embeddings([doc.content for doc in missing])):
+                doc.embedding = vector
+        
+        query_vector = np.asarray(self.embedder.get_embedding(query), dtype=np.float32)
+        matrix = np.zeros((len(documents), query_vector.shape[0]), dtype=np.float32)
+        for row, doc in enumerate(documents):
+            if doc.embedding is not None and len(doc.embedding) == query_vector.shape[0]:
+                matrix[row] = doc.embedding
+        return query_vector, matrix
+    
+    def _cosine(self, query: str, documents: List[Document]) -> np.ndarray:
+        if self.embedder is None:
+            return np.zeros(len(documents), dtype=np.float32)
+        query_vector, matrix = self._embeddings(query, documents)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector)
+        return np.where(norms > 0, matrix @ query_vector / np.where(norms > 0, norms, 1.0), 0.0)
+    
+    def _features(self, query: str, documents: List[Document], cosine: np.ndarray, bm25: Dict[str, float],
+                  keys: List[str]) -> np.ndarray:
+        """Feature matrix: cosine, max-normalised BM25, query term coverage, title coverage."""
+        terms = set(_TOKEN_PATTERN.findall(query.lower()))
+        bm25_scores = np.asarray([bm25.get(key, 0.0) for key in keys], dtype=np.float32)
+        if bm25_scores.max(initial=0.0) > 0:
+            bm25_scores /= bm25_scores.max()
+        
+        coverage = np.zeros(len(documents), dtype=np.float32)
+        title_coverage = np.zeros(len(documents), dtype=np.float32)
+        if terms:
+            for row, doc in enumerate(documents):
+                coverage[row] = len(terms & set(_TOKEN_PATTERN.findall(doc.content.lower()))) / len(terms)
+                title_coverage[row] = len(terms & set(_TOKEN_PATTERN.findall((doc.name or "").lower()))) / len(terms)
+        
+        return np.column_stack([np.clip(cosine, 0.0, 1.0), bm25_scores, coverage, title_coverage])
+    
+    def rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        """
+        Rerank LanceDB candidates locally, deferring to the fallback only when ambiguous.
+        
+        Args:
+            query (str): Search query
+            documents (List[Document]): Candidates from LanceDB, best first
+        
+        Returns:
+            List[Document]: Reranked documents with reranking_score set to the fused score
+        """
+        try:
+            return self._rerank(query, documents)
+        except Exception as e:
+            logger.error(f"Local reranking failed: {str(e)}. Returning original documents")
+            return documents
+    
+    def _rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        candidates = {}
+        for doc in documents:
+            candidates.setdefault(_doc_key(doc), doc)
+        
+        lexical = self._lexical_candidates(query)
+        bm25 = {}
+        for doc in lexical:
+            key = _doc_key(doc)
+            bm25[key] = doc.reranking_score
+            candidates.setdefault(key, doc)
+        
+        if not candidates:
+            return []
+        
+        keys = list(candidates)
+        docs = [candidates[key] for key in keys]
+        cosine = self._cosine(query, docs)
+        
+        rankings = [
+            list(dict.fromkeys(_doc_key(doc) for doc in documents)),
+            [keys[i] for i in np.argsort(-cosine, kind="stable")] if self.embedder is not None else [],
+            [_doc_key(doc) for doc in lexical]
+        ]
+        
+        feature_scores = None
+        if self.use_scorer:
+            feature_scores = self._features(query, docs, cosine, bm25, keys) @ FEATURE_WEIGHTS
+            rankings.append([keys[i] for i in np.argsort(-feature_scores, kind="stable")])
+        
+        fused = reciprocal_rank_fusion([ranking for ranking in rankings if ranking], self.k)
+        ordered = sorted(keys, key=lambda key: fused[key], reverse=True)
+        for key in keys:
+            candidates[key].reranking_score = fused[key]
+        reranked = [candidates[key] for key in ordered]
+        
+        if self.fallback is not None and self._is_ambiguous(rankings, feature_scores, keys):
+            self._count("fallback")
+            logger.info("Local rankings are ambiguous, using remote reranker")
+            reranked = self.fallback.rerank(query=query, documents=reranked)
+        else:
+            self._count("local")
+        
+        return reranked[:self.top_n] if self.top_n else reranked
+    
+    def _is_ambiguous(self, rankings: List[List[str]], feature_scores: Optional[np.ndarray], keys: List[str]) -> bool:
+        """True when the signals disagree on the best document and the scorer cannot separate the top two."""
+        leaders = {ranking[0] for ranking in rankings if ranking}
+        if len(leaders) <= 1 or len(keys) < 2:
+            return False
+        if feature_scores is None:
+            return True
+        top_two = np.sort(feature_scores)[-2:]
+        return float(top_two[1] - top_two[0]) < self.ambiguity_margin
+
+class RateLimitedCohereReranker(CohereReranker):
+    """CohereReranker that draws from the shared client-side rate limiter before each call."""
+    
+    def _rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        # Throttling surfaces as an error, so rerank() returns the documents unchanged
+        get_rate_limiter().acquire("cohere")
+        return super()._rerank(query=query, documents=documents)
+
+def create_reranker(backend: str, embedder=None, lexical_index=None, cohere_api_key: str = None,
+                    model: str = "rerank-english-v3.0") -> Reranker:
+    """
+    Create the knowledge base reranker selected by RERANKER_BACKEND.
+    
+    Args:
+        backend (str): "local" (hybrid RRF with remote fallback) or "cohere"
+        embedder: Knowledge base embedder, used for cosine scores
+        lexical_index: Lexical index used as an extra BM25 signal
+        cohere_api_key (str): Cohere key; without one the local reranker has no fallback
+        model (str): Cohere rerank model
+    
+    Returns:
+        Reranker: Reranker for LanceDb
+    """
+    if backend == "cohere":
+        return RateLimitedCohereReranker(model=model, api_key=cohere_api_key)
+    if backend == "local":
+        return HybridReranker(
+            embedder=embedder,
+            lexical_index=lexical_index,
+            fallback=RateLimitedCohereReranker(model=model, api_key=cohere_api_key) if cohere_api_key else None
+        )
+    raise ValueError(f"Unknown reranker backend: {backend}")
@@ -0,0 +1,200 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from agents.agent_team import AgentTeam
+from agents.stage_scheduler import StageScheduler
+from agents.llm_engine import LLMExecutionEngine, LLMProvider
+from agents.intent_router import IntentRouter
+
+class FakeRunResponse:
+    def __init__(self, content):
+        self.content = content
+
+class FakeCoordinator:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.prompts = []
+    
+    def run(self, prompt):
+        self.prompts.append(prompt)
+        time.sleep(self.delay)
+        return FakeRunResponse("Synthesized answer")
+
+class FakeSearchAgent:
+    def __init__(self, delay=0.1):
+        self.delay = delay
+        self.evidence = []
+    
+    def search(self, query, user_id="default", evidence=None):
+        self.evidence.append(evidence)
+        evidence.serper_organic(10)
+        time.sleep(self.delay)
+        return {"results": f"Answer for {query}", "verification": "ok", "confidence": 90}
+    
+    def search_stream(self, query, user_id="default", evidence=None):
+        self.evidence.append(evidence)
+        for word in ("Answer ", "for ", query):
+            time.sleep(self.delay / 3)
+            yield {"event": "token", "content": word}
+        result = {"results": f"Answer for {query}", "verification": "ok", "confidence": 90}
+        yield {"event": "verification", "verification": "ok", "confidence": 90}
+        yield {"event": "result", "result": result}
+
+class FakeSerperClient:
+    def __init__(self):
+        self.calls = 0
+    
+    def get_organic_search_results(self, query, num_results=10):
+        self.calls += 1
+        return [{"title": query, "snippet": "snippet", "link": "https://example.com"}] * num_results
+
+class FakeTaskManager:
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.jira = None
+        self.outbox = None
+        self.activities = []
+        self.updates = []
+    
+    def create_search_task(self, query, user_id="default"):
+        time.sleep(self.delay)
+        return {"key": "AI-1"}
+    
+    def update_task_with_results(self, issue_key, results):
+        self.updates.append((issue_key, results))
+        return True
+    
+    def log_agent_activity(self, activity, details=None):
+        self.activities.append(activity)
+
+def make_team():
+    team = AgentTeam.__new__(AgentTeam)
+    team.coordinator = FakeCoordinator()
+    team.engine = LLMExecutionEngine([LLMProvider("openrouter", team.coordinator)], use_cache=False)
+    team.search_agent = FakeSearchAgent()
+    team.task_manager = FakeTaskManager()
+    team.serper_client = FakeSerperClient()
+    team.executor = ThreadPoolExecutor(max_workers=8)
+    team.scheduler = StageScheduler(team.executor)
+    team.lexical_index = None
+    team.semantic_cache = None
+    team.intent_router = IntentRouter(log_path="")
+    team.activities = []
+    return team
+
+def test_search_runs_independent_stages_concurrently():
+    team = make_team()
+    
+    started = time.perf_counter()
+    result = team.search("capital of France", "user-1")
+    elapsed = time.perf_counter() - started
+    
+    # primary (0.1s) + synthesis (0.05s); intent and Jira overlap with the primary search
+    assert elapsed < 0.2
+    assert result["results"] == "Synthesized answer"
+    assert result["task_key"] == "AI-1"
+    assert team.task_manager.activities == ["Successful coordinated search"]
+
+def test_search_fetches_serper_once_per_request():
+    team = make_team()
+    
+    team.search("capital of France", "user-1")
+    
+    assert team.serper_client.calls == 1
+
+def test_secondary_context_is_served_from_local_index():
+    from agents.evidence import EvidenceContext
+    from knowledge.lexical_index import LexicalIndex
+    team = make_team()
+    team.lexical_index = LexicalIndex(path="")
+    team.lexical_index.add_serper_results("capital of France", [
+        {"title": "Paris", "snippet": "Capital of France", "link": f"https://example.com/{i}"} for i in range(10)
+    ])
+    
+    evidence = EvidenceContext("capital of France", "user-1", serper_client=team.serper_client)
+    
+    context = team._fetch_secondary_context(evidence)
+    
+    assert len(context[0]["results"]) == 5
+    assert team.serper_client.calls == 0
+
+def test_near_duplicate_search_is_served_from_semantic_cache():
+    from agents.semantic_cache import SemanticCache
+    from knowledge.embeddings import HashingEmbedder
+    team = make_team()
+    team.semantic_cache = SemanticCache(embedder=HashingEmbedder(), threshold=0.9, min_confidence=0)
+    
+    first = team.search("capital of France", "user-1")
+    second = team.search("Capital of France?", "user-1")
+    
+    assert first["task_key"] == "AI-1"
+    assert second["cached"] is True
+    assert second["results"] == first["results"]
+    assert "task_key" not in second
+    assert team.serper_client.calls == 1
+    assert team.search("capital of France", "user-2").get("cached") is None
+
+def test_intent_is_routed_locally_without_a_coordinator_call():
+    team = make_team()
+    
+    coordinated = team._coordinate_agents("capital of France", "user-1")
+    
+    assert coordinated["intent_analysis"]["query_type"] == "factual"
+    assert coordinated["intent_analysis"]["source"] == "rules"
+    assert len(team.coordinator.prompts) == 1
+
+def test_search_stream_yields_tokens_before_the_answer_completes():
+    team = make_team()
+    
+    started = time.perf_counter()
+    stream = team.search_stream("capital of France", "user-1")
+    first = next(stream)
+    first_token = time.perf_counter() - started
+    events = [first] + list(stream)
+    
+    assert first == {"event": "token", "content": "Answer "}
+    assert first_token < 0.08
+    assert "".join(e["content"] for e in events if e["event"] == "token") == "Answer for capital of France"
+    assert events[-2] == {"event": "verification", "verification": "ok", "confidence": 90}
+    assert events[-1]["result"]["task_key"] == "AI-1"
+    assert team.coordinator.prompts == []
+    assert team.task_manager.activities == ["Successful coordinated search"]
+
+def test_streamed_answers_are_not_cached_for_synthesized_searches():
+    from agents.semantic_cache import SemanticCache
+    from knowledge.embeddings import HashingEmbedder
+    team = make_team()
+    team.semantic_cache = SemanticCache(embedder=HashingEmbedder(), threshold=0.9, min_confidence=0)
+    
+    list(team.search_stream("capital of France", "user-1"))
+    result = team.search("capital of France", "user-1")
+    
+    assert result.get("cached") is None
+    assert result["results"] == "Synthesized answer"
+
+def test_search_stream_reports_errors_as_trailing_events():
+    team = make_team()
+    
+    def failing_stream(query, user_id="default", evidence=None):
+        raise Exception("LLM down")
+        yield
+    
+    team.search_agent.search_stream = failing_stream
+    events = list(team.search_stream("capital of France", "user-1"))
+    
+    assert [e["event"] for e in events] == ["error", "verification", "result"]
+    assert events[-1]["result"]["error"] is True
+    assert team.task_manager.activities == ["Failed coordinated search"]
+    assert events[-1]["result"]["task_key"] == "AI-1"
+
+def test_failed_search_still_links_its_jira_task():
+    team = make_team()
+    
+    def failing_search(query, user_id="default", evidence=None):
+        raise Exception("LLM down")
+    
+    team.search_agent.search = failing_search
+    result = team.search("capital of France", "user-1")
+    
+    assert result["error"] is True
+    assert result["task_key"] == "AI-1"
+    assert team.task_manager.updates == [("AI-1", result)]
@@ -0,0 +1,194 @@
+import time
+from agents.api_failover import APIFailover, KeyPool
+
+def make_failover():
+    failover = APIFailover()
+    failover.api_configs = {
+        "llm": [
+            {"name": "primary", "key": "key-1", "available": True, "priority": 1},
+            {"name": "secondary", "key": "key-2", "available": True, "priority": 2}
+        ]
+    }
+    failover.cooldown_jitter = 0.0
+    failover.exploration_rate = 0.0
+    return failover
+
+def names(failover):
+    return [api["name"] for api in failover.get_available_apis("llm")]
+
+def test_priority_order_without_measurements():
+    assert names(make_failover()) == ["primary", "secondary"]
+
+def test_routes_to_best_expected_completion_time():
+    failover = make_failover()
+    failover.report_success("primary", latency=2.0)
+    failover.report_success("secondary", latency=0.5)
+    
+    assert names(failover) == ["secondary", "primary"]
+
+def test_error_rate_inflates_expected_completion():
+    failover = make_failover()
+    failover.report_success("primary", latency=1.0)
+    failover.report_success("secondary", latency=1.2)
+    failover.report_failure("primary", latency=1.0)
+    
+    assert names(failover) == ["secondary", "primary"]
+    assert failover.get_health()["llm"]["primary"]["error_rate"] > 0
+
+def test_error_rate_decays_without_traffic():
+    failover = make_failover()
+    failover.report_success("primary", latency=1.0)
+    failover.report_success("secondary", latency=1.2)
+    failover.report_failure("primary")
+    assert names(failover) == ["secondary", "primary"]
+    
+    # No calls reach the primary while it ranks second; its error rate still fades
+    failover.health["primary"].error_updated -= 10 * failover.error_half_life
+    
+    assert names(failover) == ["primary", "secondary"]
+
+def test_failure_latency_is_not_averaged():
+    failover = make_failover()
+    failover.report_success("primary", latency=2.0)
+    failover.report_failure("primary", latency=0.01)
+    
+    assert failover.health["primary"].latency == 2.0
+
+def test_exploration_sends_some_traffic_to_runner_up():
+    failover = make_failover()
+    failover.exploration_rate = 0.5
+    failover.report_success("primary", latency=1.0)
+    failover.report_success("secondary", latency=2.0)
+    
+    leaders = [names(failover)[0] for _ in range(200)]
+    
+    assert 0 < leaders.count("secondary") < 200
+
+def test_breaker_opens_after_consecutive_failures():
+    failover = make_failover()
+    for _ in range(failover.max_failures):
+        failover.report_failure("primary")
+    
+    assert names(failover) == ["secondary"]
+    assert failover.get_health()["llm"]["primary"]["state"] == "open"
+
+def test_half_open_allows_single_probe_then_closes():
+    failover = make_failover()
+    for _ in range(failover.max_failures):
+        failover.report_failure("primary")
+    failover.health["primary"].open_until = time.time() - 1
+    
+    assert names(failover) == ["primary", "secondary"]
+    assert failover.claim_probe("primary")
+    # The probe slot is taken until the probe reports back
+    assert not failover.claim_probe("primary")
+    assert names(failover) == ["secondary"]
+    
+    failover.report_success("primary", latency=0.1)
+    
+    assert failover.get_health()["llm"]["primary"]["state"] == "closed"
+    assert "primary" in names(failover)
+
+def test_ranking_does_not_take_probe():
+    failover = make_failover()
+    for _ in range(failover.max_failures):
+        failover.report_failure("primary")
+    failover.health["primary"].open_until = time.time() - 1
+    
+    # Ranked behind a healthy provider, the half-open one keeps its probe slot
+    assert "primary" in names(failover)
+    assert "primary" in names(failover)
+    assert failover.claim_probe("primary")
+
+def test_failed_probe_reopens_with_longer_cooldown():
+    failover = make_failover()
+    for _ in range(failover.max_failures):
+        failover.report_failure("primary")
+    first = failover.health["primary"].open_until - time.time()
+    failover.health["primary"].open_until = time.time() - 1
+    assert failover.claim_probe("primary")
+    
+    failover.report_failure("primary")
+    
+    health = failover.health["primary"]
+    assert health.state == "open"
+    assert health.trips == 2
+    assert health.open_until - time.time() > first * 1.5
+
+def test_cooldown_is_capped_and_jittered():
+    failover = make_failover()
+    failover.cooldown_jitter = 0.2
+    
+    cooldowns = [failover._cooldown(20) for _ in range(50)]
+    
+    assert all(failover.max_cooldown * 0.8 <= c <= failover.max_cooldown * 1.2 for c in cooldowns)
+    assert len(set(cooldowns)) > 1
+
+class RateLimitError(Exception):
+    status_code = 429
+
+def test_key_pool_round_robin():
+    pool = KeyPool(["k1", "k2", "k3"])
+    
+    picked = []
+    for _ in range(4):
+        key = pool.acquire()
+        picked.append(key)
+        pool.release(key)
+    
+    assert picked == ["k1", "k2", "k3", "k1"]
+
+def test_key_pool_least_loaded():
+    pool = KeyPool(["k1", "k2"], strategy="least_loaded")
+    
+    first = pool.acquire()
+    second = pool.acquire()
+    pool.release(first)
+    
+    assert {first, second} == {"k1", "k2"}
+    assert pool.acquire() == first
+
+def test_key_pool_enforces_per_key_rate():
+    pool = KeyPool(["k1", "k2"], rate=1.0)
+    
+    keys = [pool.acquire(), pool.acquire(), pool.acquire()]
+    
+    assert keys == ["k1", "k2", None]
+
+def test_rate_limited_key_is_parked():
+    pool = KeyPool(["k1", "k2"])
+    pool.park("k1", 60)
+    
+    assert [pool.acquire(), pool.acquire()] == ["k2", "k2"]
+    assert pool.stats()["parked"] == 1
+
+def test_rate_limits_spill_to_next_key_before_failing_over():
+    failover = make_failover()
+    failover.api_configs["llm"][0]["keys"] = ["p1", "p2"]
+    calls = []
+    
+    def operation(api_key, query):
+        calls.append(api_key)
+        if api_key == "p1":
+            raise RateLimitError("Too Many Requests")
+        return f"{api_key}: {query}"
+    
+    assert failover.execute_with_failover("llm", operation, "q") == "p2: q"
+    assert calls == ["p1", "p2"]
+    # A rate limited key is not a provider failure
+    assert failover.get_health()["llm"]["primary"]["failures"] == 0
+    assert failover.get_health()["llm"]["primary"]["keys"]["rate_limited"] == 1
+
+def test_other_errors_fail_over_to_next_provider():
+    failover = make_failover()
+    failover.api_configs["llm"][0]["keys"] = ["p1", "p2"]
+    calls = []
+    
+    def operation(api_key):
+        calls.append(api_key)
+        if api_key.startswith("p"):
+            raise Exception("server error")
+        return api_key
+    
+    assert failover.execute_with_failover("llm", operation) == "key-2"
+    assert calls == ["p1", "key-2"]
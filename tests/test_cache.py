@@ -0,0 +1,34 @@
+import time
+from utils.cache import TTLCache, SQLiteCacheBackend
+
+def test_lru_eviction():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_entries_expire():
+    cache = TTLCache(ttl=60)
+    cache.set("short", "value", ttl=0.01)
+    cache.set("long", "value")
+    time.sleep(0.02)
+    
+    assert cache.get("short") is None
+    assert cache.get("long") == "value"
+    assert cache.stats()["expirations"] == 1
+
+def test_persistent_tier_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = TTLCache(backend=SQLiteCacheBackend(path))
+    cache.set("query", {"organic": [{"title": "Paris"}]})
+    
+    restarted = TTLCache(backend=SQLiteCacheBackend(path))
+    
+    assert restarted.get("query") == {"organic": [{"title": "Paris"}]}
+    assert restarted.stats()["backend_hits"] == 1
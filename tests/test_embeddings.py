@@ -0,0 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import numpy as np
+import pytest
+from agno.document import Document
+from agno.embedder.base import Embedder
+from knowledge.embeddings import CachedEmbedder, EmbeddingCache, HashingEmbedder, create_embedder
+from knowledge import knowledge_base
+from knowledge.knowledge_base import build_knowledge_base, default_table_name
+
+@dataclass
+class BatchEmbedder(Embedder):
+    id: str = "fake-embedding"
+    dimensions: int = 3
+    batches: list = field(default_factory=list)
+    
+    def get_embeddings(self, texts):
+        self.batches.append(list(texts))
+        return [[float(len(text)), 1.0, -1.0] for text in texts]
+    
+    def get_embedding(self, text):
+        return self.get_embeddings([text])[0]
+
+def test_misses_are_batched_and_deduplicated(tmp_path):
+    inner = BatchEmbedder()
+    embedder = CachedEmbedder(embedder=inner, cache=EmbeddingCache(str(tmp_path)))
+    
+    vectors = embedder.get_embeddings(["a", "bb", "a", "ccc"])
+    
+    assert inner.batches == [["a", "bb", "ccc"]]
+    assert vectors == [[1.0, 1.0, -1.0], [2.0, 1.0, -1.0], [1.0, 1.0, -1.0], [3.0, 1.0, -1.0]]
+    
+    assert embedder.get_embedding("bb") == [2.0, 1.0, -1.0]
+    embedder.get_embeddings(["bb", "dddd"])
+    assert inner.batches[1:] == [["dddd"]]
+
+def test_cache_persists_across_instances(tmp_path):
+    CachedEmbedder(embedder=BatchEmbedder(), cache=EmbeddingCache(str(tmp_path))).get_embeddings(["query", "chunk"])
+    
+    inner = BatchEmbedder()
+    cache = EmbeddingCache(str(tmp_path))
+    embedder = CachedEmbedder(embedder=inner, cache=cache)
+    vector, usage = embedder.get_embedding_and_usage("chunk")
+    
+    assert vector == [5.0, 1.0, -1.0]
+    assert inner.batches == []
+    assert cache.stats()["hits"] == 1
+
+def test_cache_is_keyed_by_model(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    CachedEmbedder(embedder=BatchEmbedder(id="model-a"), cache=cache).get_embedding("text")
+    
+    other = BatchEmbedder(id="model-b")
+    CachedEmbedder(embedder=other, cache=cache).get_embedding("text")
+    
+    assert other.batches == [["text"]]
+
+def test_partial_row_from_crashed_write_is_cut_off(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many("model", 3, ["first"], [[1.0, 2.0, 3.0]])
+    with open(tmp_path / "model_3.f32", "ab") as f:
+        f.write(b"\x00" * 5)
+    
+    cache.put_many("model", 3, ["second"], [[4.0, 5.0, 6.0]])
+    
+    first, second = cache.get_many("model", 3, ["first", "second"])
+    assert first.tolist() == [1.0, 2.0, 3.0]
+    assert second.tolist() == [4.0, 5.0, 6.0]
+
+def test_writers_sharing_a_cache_keep_rows_aligned(tmp_path):
+    caches = [EmbeddingCache(str(tmp_path)) for _ in range(4)]
+    
+    def write(i):
+        for j in range(20):
+            caches[i].put_many("model", 2, [f"{i}-{j}"], [[float(i), float(j)]])
+    
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        list(pool.map(write, range(4)))
+    
+    texts = [f"{i}-{j}" for i in range(4) for j in range(20)]
+    vectors = EmbeddingCache(str(tmp_path)).get_many("model", 2, texts)
+    assert [vector.tolist() for vector in vectors] == [[float(i), float(j)] for i in range(4) for j in range(20)]
+
+def test_hashing_embedder_is_deterministic_and_normalised():
+    embedder = HashingEmbedder(dimensions=64)
+    
+    first, second, unrelated = embedder.get_embeddings([
+        "Capital of France", "capital of france", "quantum error correction"
+    ])
+    
+    assert len(first) == 64
+    assert first == second
+    assert np.isclose(np.linalg.norm(first), 1.0)
+    assert np.dot(first, second) > np.dot(first, unrelated)
+
+def test_create_embedder_selects_backend():
+    assert isinstance(create_embedder("hashing"), HashingEmbedder)
+    with pytest.raises(ValueError):
+        create_embedder("unknown")
+
+def test_local_backend_builds_offline_knowledge_base(tmp_path, monkeypatch):
+    monkeypatch.setattr(knowledge_base, "LEXICAL_INDEX_ENABLED", False)
+    knowledge = build_knowledge_base(str(tmp_path), default_table_name("hashing"), "unused", None, None, "hashing")
+    knowledge.vector_db.insert([Document(content="LanceDB stores vectors on local disk")])
+    
+    results = knowledge.vector_db.search("where are vectors stored", limit=1)
+    
+    assert knowledge.vector_db.table_name == "search_kb_hashing"
+    assert results[0].content == "LanceDB stores vectors on local disk"
@@ -0,0 +1,38 @@
+import threading
+import time
+from agents.evidence import EvidenceContext
+
+class CountingSerperClient:
+    def __init__(self):
+        self.calls = []
+    
+    def get_organic_search_results(self, query, num_results=10):
+        self.calls.append((query, num_results))
+        time.sleep(0.01)
+        return [{"title": f"{query} {i}"} for i in range(num_results)]
+
+def test_serper_evidence_is_fetched_once_per_request():
+    client = CountingSerperClient()
+    evidence = EvidenceContext("capital of France", serper_client=client)
+    
+    primary = evidence.serper_organic(10)
+    secondary = evidence.serper_organic(5)
+    
+    assert len(client.calls) == 1
+    assert secondary == primary[:5]
+
+def test_concurrent_stages_share_one_fetch():
+    client = CountingSerperClient()
+    evidence = EvidenceContext("capital of France", serper_client=client)
+    
+    threads = [threading.Thread(target=evidence.serper_organic, args=(5,)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(client.calls) == 1
+    assert "serper:organic" in evidence.fetched_sources()
+
+def test_missing_serper_client_returns_no_evidence():
+    assert EvidenceContext("anything").serper_organic() == []
@@ -0,0 +1,97 @@
+import json
+from agents.intent_router import IntentRouter, QueryIntent, train_intent_model, load_intent_log
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+class FakeLLM:
+    def __init__(self, content):
+        self.content = content
+        self.prompts = []
+    
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        return FakeResponse(self.content)
+
+def make_router(**kwargs):
+    kwargs.setdefault("log_path", "")
+    kwargs.setdefault("min_confidence", 0.5)
+    return IntentRouter(**kwargs)
+
+def test_rules_route_common_query_types_without_llm():
+    router = make_router()
+    llm = FakeLLM("{}")
+    
+    assert router.route("capital of France", llm=llm).query_type == "factual"
+    assert router.route("latest news on the election", llm=llm).query_type == "news"
+    assert router.route("python vs rust for web servers", llm=llm).query_type == "comparison"
+    assert router.route("write a poem about autumn", llm=llm).query_type == "creative"
+    assert router.route("TypeError: NoneType object is not subscriptable", llm=llm).query_type == "technical"
+    assert llm.prompts == []
+    assert router.stats()["sources"]["rules"] == 5
+
+def test_intent_is_typed_and_serialisable():
+    intent = make_router().route("latest news on the election", user_id="user-1")
+    
+    assert isinstance(intent, QueryIntent)
+    assert intent.to_dict()["query_type"] == "news"
+    assert intent.search_strategy == "recent"
+    assert intent.confidence_threshold == 75
+    assert intent.required_agents == ["search", "verification", "serper", "personalization"]
+    assert intent.complexity in ("simple", "medium", "complex")
+
+def test_llm_is_consulted_only_when_unsure():
+    router = make_router()
+    llm = FakeLLM('Sure: {"query_type": "technical", "complexity": "complex", "confidence_threshold": 85}')
+    
+    intent = router.route("quantum entanglement", llm=llm)
+    
+    assert len(llm.prompts) == 1
+    assert intent.source == "llm"
+    assert intent.query_type == "technical"
+    assert intent.complexity == "complex"
+    assert intent.confidence_threshold == 85
+    assert router.stats()["llm_rate"] == 1.0
+
+def test_unparseable_llm_answer_keeps_local_intent():
+    router = make_router()
+    
+    intent = router.route("quantum entanglement", llm=FakeLLM("I think it is scientific"))
+    
+    assert intent.source == "rules"
+    assert intent.query_type == "general"
+    assert router.stats()["llm_failures"] == 1
+
+def test_without_llm_low_confidence_intent_is_returned():
+    intent = make_router().route("quantum entanglement")
+    
+    assert intent.query_type == "general"
+    assert intent.confidence < 0.5
+
+def test_model_trained_from_log_routes_unseen_phrasing(tmp_path):
+    log_path = tmp_path / "intents.jsonl"
+    router = make_router(log_path=str(log_path))
+    llm = FakeLLM('{"query_type": "technical"}')
+    for topic in ("entanglement", "superposition", "qubits", "decoherence"):
+        router.route(f"quantum {topic}", llm=llm)
+    for city in ("Paris", "Rome", "Berlin", "Madrid"):
+        router.route(f"capital of {city}")
+    
+    queries, labels = load_intent_log(str(log_path))
+    assert len(queries) == 8
+    assert load_intent_log(str(log_path), sources=("llm",))[1] == ["technical"] * 4
+    
+    model = train_intent_model(queries, labels, dimensions=256)
+    json.dumps(model)
+    trained = make_router(model=model)
+    intent = trained.route("quantum tunnelling")
+    
+    assert intent.source == "model"
+    assert intent.query_type == "technical"
+
+def test_missing_model_file_falls_back_to_rules(tmp_path):
+    router = make_router(model_path=str(tmp_path / "missing.json"))
+    
+    assert router.stats()["model"] is False
+    assert router.route("capital of France").query_type == "factual"
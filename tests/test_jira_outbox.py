@@ -0,0 +1,223 @@
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from agents.jira_integration import JiraOutbox, AgentTaskManager, ActivityCoalescer, flush_activity_summaries
+
+class FakeJira:
+    def __init__(self, failures=0):
+        self.failures = failures
+        self.created = []
+        self.comments = []
+        self.updates = []
+        self.bulk_calls = []
+    
+    def create_issue(self, project_key, summary, description="", issue_type="Task", priority="Medium"):
+        if self.failures:
+            self.failures -= 1
+            raise Exception("Jira unavailable")
+        self.created.append(summary)
+        return {"key": f"AI-{len(self.created)}"}
+    
+    def bulk_create_issues(self, issues):
+        self.bulk_calls.append(len(issues))
+        response = {"issues": [], "errors": []}
+        for index, issue in enumerate(issues):
+            if issue["summary"] == "rejected":
+                response["errors"].append({"failedElementNumber": index, "elementErrors": {"summary": "bad"}})
+            else:
+                self.created.append(issue["summary"])
+                response["issues"].append({"key": f"AI-{len(self.created)}"})
+        return response
+    
+    def add_comment(self, issue_key, comment):
+        self.comments.append(issue_key)
+        return {}
+    
+    def update_issue(self, issue_key, fields):
+        self.updates.append((issue_key, fields))
+        return {}
+
+def make_manager(tmp_path, jira):
+    outbox = JiraOutbox(path=str(tmp_path / "outbox.db"), base_backoff=0)
+    manager = AgentTaskManager(use_outbox=False)
+    manager.jira = jira
+    manager.outbox = outbox
+    manager.coalescer.executor = None
+    return manager, outbox
+
+def test_writes_are_queued_and_resolved_by_reference(tmp_path):
+    jira = FakeJira()
+    manager, outbox = make_manager(tmp_path, jira)
+    
+    task = manager.create_search_task("capital of France", "user-1")
+    manager.update_task_with_results(task["ref"], {"results": "Paris", "confidence": 95})
+    
+    assert task["key"] is None
+    assert jira.created == []
+    
+    outbox.drain_once(jira)
+    
+    assert manager.resolve_task_key(task["ref"]) == "AI-1"
+    assert jira.comments == ["AI-1"]
+    assert jira.updates == [("AI-1", {"status": "Done"})]
+    assert outbox.stats() == {"pending": 0, "done": 3, "failed": 0}
+
+def test_failed_writes_are_retried(tmp_path):
+    jira = FakeJira(failures=2)
+    manager, outbox = make_manager(tmp_path, jira)
+    
+    manager.create_search_task("capital of France")
+    for _ in range(3):
+        outbox.drain_once(jira)
+    
+    assert len(jira.created) == 1
+    assert outbox.stats()["done"] == 1
+
+def test_outbox_survives_restart(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    JiraOutbox(path=path).enqueue("create_issue", {"project_key": "AI", "summary": "queued"}, ref="local-abc")
+    
+    jira = FakeJira()
+    restarted = JiraOutbox(path=path)
+    restarted.drain_once(jira)
+    
+    assert jira.created == ["queued"]
+    assert restarted.resolve("local-abc") == "AI-1"
+
+
+def test_creates_are_sent_in_bulk(tmp_path):
+    jira = FakeJira()
+    outbox = JiraOutbox(path=str(tmp_path / "outbox.db"), base_backoff=0, max_attempts=1, batch_size=3)
+    refs = [outbox.new_ref() for _ in range(5)]
+    for i, ref in enumerate(refs):
+        summary = "rejected" if i == 1 else f"issue {i}"
+        outbox.enqueue("create_issue", {"project_key": "AI", "summary": summary}, ref=ref)
+    
+    assert outbox.flush_due()
+    outbox.drain_once(jira)
+    
+    assert jira.bulk_calls == [3, 2]
+    assert outbox.resolve(refs[0]) == "AI-1"
+    assert outbox.resolve(refs[1]) is None
+    assert outbox.resolve(refs[4]) == "AI-4"
+    assert outbox.stats() == {"pending": 0, "done": 4, "failed": 1}
+
+class SlowJira(FakeJira):
+    def bulk_create_issues(self, issues):
+        time.sleep(0.05)
+        return super().bulk_create_issues(issues)
+
+def test_workers_sharing_an_outbox_send_each_entry_once(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    outboxes = [JiraOutbox(path=path), JiraOutbox(path=path)]
+    for i in range(4):
+        outboxes[0].enqueue("create_issue", {"project_key": "AI", "summary": f"issue {i}"}, ref=outboxes[0].new_ref())
+    jira = SlowJira()
+    
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        list(pool.map(lambda outbox: outbox.drain_once(jira), outboxes))
+    
+    assert sorted(jira.created) == [f"issue {i}" for i in range(4)]
+    assert outboxes[1].stats() == {"pending": 0, "done": 4, "failed": 0}
+
+def test_abandoned_claims_are_retried(tmp_path):
+    outbox = JiraOutbox(path=str(tmp_path / "outbox.db"), claim_timeout=0)
+    outbox.enqueue("create_issue", {"project_key": "AI", "summary": "one"}, ref=outbox.new_ref())
+    outbox._claim_due(10)
+    
+    jira = FakeJira()
+    outbox.drain_once(jira)
+    
+    assert jira.created == ["one"]
+
+class HTTPFailingJira(FakeJira):
+    def __init__(self, status):
+        super().__init__()
+        self.status = status
+        self.update_calls = 0
+    
+    def update_issue(self, issue_key, fields):
+        self.update_calls += 1
+        response = requests.Response()
+        response.status_code = self.status
+        try:
+            raise requests.HTTPError(f"{self.status} Error", response=response)
+        except requests.HTTPError as e:
+            raise Exception(f"Failed to update Jira issue {issue_key}: {str(e)}") from e
+
+def test_client_errors_fail_permanently_on_first_attempt(tmp_path):
+    outbox = JiraOutbox(path=str(tmp_path / "outbox.db"), base_backoff=0)
+    outbox.enqueue("update_issue", {"fields": {"status": "Done"}}, issue="AI-1")
+    jira = HTTPFailingJira(400)
+    
+    for _ in range(3):
+        outbox.drain_once(jira)
+    
+    assert jira.update_calls == 1
+    assert outbox.stats()["failed"] == 1
+
+def test_rate_limits_and_server_errors_are_retried(tmp_path):
+    for status in (429, 503):
+        outbox = JiraOutbox(path=str(tmp_path / f"outbox-{status}.db"), base_backoff=0)
+        outbox.enqueue("update_issue", {"fields": {"status": "Done"}}, issue="AI-1")
+        jira = HTTPFailingJira(status)
+        
+        for _ in range(3):
+            outbox.drain_once(jira)
+        
+        assert jira.update_calls == 3
+        assert outbox.stats()["pending"] == 1
+
+def test_flush_waits_for_size_or_time_threshold(tmp_path):
+    outbox = JiraOutbox(path=str(tmp_path / "outbox.db"), batch_size=10, batch_max_wait=60)
+    outbox.enqueue("create_issue", {"project_key": "AI", "summary": "one"}, ref=outbox.new_ref())
+    
+    assert not outbox.flush_due()
+    
+    outbox.batch_max_wait = 0
+    assert outbox.flush_due()
+
+def test_successful_searches_are_coalesced_into_summaries(tmp_path):
+    jira = FakeJira()
+    manager, outbox = make_manager(tmp_path, jira)
+    manager.coalescer.max_events = 50
+    
+    for i in range(120):
+        manager.log_agent_activity(
+            "Successful coordinated search",
+            {"query": f"query {i}", "user_id": f"user-{i % 3}", "confidence": 90}
+        )
+    manager.coalescer.flush()
+    outbox.drain_once(jira)
+    
+    assert jira.created == [
+        "Agent Activity Summary: 50 x Successful coordinated search",
+        "Agent Activity Summary: 50 x Successful coordinated search",
+        "Agent Activity Summary: 20 x Successful coordinated search"
+    ]
+    assert jira.bulk_calls == [3]
+
+def test_open_windows_are_flushed_at_shutdown():
+    written = []
+    coalescer = ActivityCoalescer(lambda summary, description: written.append(summary), interval=3600)
+    coalescer.add("Successful coordinated search", {"user_id": "user-1"})
+    
+    flush_activity_summaries()
+    
+    assert written == ["Agent Activity Summary: 1 x Successful coordinated search"]
+
+def test_size_flush_runs_off_the_request_thread():
+    written = threading.Event()
+    
+    def slow_write(summary, description):
+        time.sleep(0.2)
+        written.set()
+    
+    coalescer = ActivityCoalescer(slow_write, max_events=2, interval=3600, executor=ThreadPoolExecutor(max_workers=1))
+    started = time.perf_counter()
+    for _ in range(2):
+        coalescer.add("Successful coordinated search")
+    
+    assert time.perf_counter() - started < 0.1
+    assert written.wait(1)
@@ -0,0 +1,56 @@
+import threading
+from knowledge.knowledge_base import KnowledgeBaseRegistry
+
+def test_registry_shares_one_instance_per_configuration():
+    """Agents asking for the same table and embedder should get the same knowledge base."""
+    built = []
+    
+    def factory(uri, table_name, embedder_id, api_key, base_url, backend):
+        built.append((uri, table_name, embedder_id))
+        return object()
+    
+    registry = KnowledgeBaseRegistry(factory=factory)
+    
+    first = registry.get(api_key="key", base_url="https://example.test")
+    second = registry.get(api_key="key", base_url="https://example.test")
+    other_table = registry.get(table_name="other_kb", api_key="key", base_url="https://example.test")
+    
+    assert first is second
+    assert other_table is not first
+    assert len(built) == 2
+    assert len(registry) == 2
+
+def test_registry_shares_instance_across_api_keys():
+    built = []
+    
+    def factory(uri, table_name, embedder_id, api_key, base_url, backend):
+        built.append(api_key)
+        return object()
+    
+    registry = KnowledgeBaseRegistry(factory=factory)
+    
+    first = registry.get(api_key="key-1", base_url="https://example.test")
+    second = registry.get(api_key="key-2", base_url="https://example.test")
+    
+    assert first is second
+    assert built == ["key-1"]
+
+def test_registry_opens_each_configuration_once_under_concurrency():
+    calls = []
+    gate = threading.Event()
+    
+    def factory(*args):
+        calls.append(args)
+        gate.wait(0.05)
+        return object()
+    
+    registry = KnowledgeBaseRegistry(factory=factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get(api_key="key"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
@@ -0,0 +1,49 @@
+import pytest
+from agno.document import Document
+from agno.vectordb.lancedb import SearchType
+from knowledge.embeddings import HashingEmbedder
+from knowledge.knowledge_base import KnowledgeIndexManager, TunedLanceDb, search_depth
+
+def make_table(tmp_path, rows):
+    vector_db = TunedLanceDb(
+        uri=str(tmp_path),
+        table_name="kb",
+        search_type=SearchType.hybrid,
+        embedder=HashingEmbedder(dimensions=32)
+    )
+    vector_db.insert([Document(content=f"document {i} about topic {i % 17} and search") for i in range(rows)])
+    return vector_db
+
+def test_small_tables_stay_brute_force(tmp_path):
+    vector_db = make_table(tmp_path, 20)
+    manager = KnowledgeIndexManager(vector_db, min_rows=256)
+    
+    report = manager.maintain()
+    
+    assert report["rows"] == 20
+    assert not report["vector_index_built"]
+    assert report["fts_index_built"]
+    assert not manager.has_vector_index()
+
+def test_index_built_past_threshold_and_reused(tmp_path):
+    vector_db = make_table(tmp_path, 300)
+    manager = KnowledgeIndexManager(vector_db, min_rows=256, index_type="IVF_PQ")
+    
+    report = manager.maintain()
+    
+    assert report["vector_index_built"] and manager.has_vector_index()
+    assert not manager.ensure_vector_index()
+    
+    with search_depth("deep"):
+        deep = vector_db.search("topic 3 search", limit=3)
+    quick = vector_db.search("topic 3 search", limit=3)
+    assert len(deep) == 3 and len(quick) == 3
+    
+    reopened = TunedLanceDb(uri=str(tmp_path), table_name="kb", search_type=SearchType.hybrid,
+                            embedder=HashingEmbedder(dimensions=32))
+    assert reopened.fts_index_exists
+
+def test_unknown_depth_is_rejected():
+    with pytest.raises(ValueError):
+        with search_depth("exhaustive"):
+            pass
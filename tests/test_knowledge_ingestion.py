@@ -0,0 +1,139 @@
+from dataclasses import dataclass
+from agno.embedder.base import Embedder
+from agno.document.reader.url_reader import URLReader
+from agno.knowledge.url import UrlKnowledge
+from agno.vectordb.lancedb import LanceDb, SearchType
+from knowledge.knowledge_base import IngestionManifest, KnowledgeIngestor
+
+@dataclass
+class CountingEmbedder(Embedder):
+    dimensions: int = 4
+    calls: int = 0
+    
+    def get_embedding(self, text):
+        self.calls += 1
+        return [float(len(text) % 7), 1.0, 0.5, float(text.count(" "))]
+    
+    def get_embedding_and_usage(self, text):
+        return self.get_embedding(text), None
+
+def make_ingestor(tmp_path, table_name="kb"):
+    embedder = CountingEmbedder()
+    knowledge = UrlKnowledge(
+        urls=[],
+        vector_db=LanceDb(
+            uri=str(tmp_path / "lancedb"),
+            table_name=table_name,
+            search_type=SearchType.vector,
+            embedder=embedder
+        )
+    )
+    knowledge.reader = URLReader(chunk_size=20)
+    embedder.calls = 0
+    manifest = IngestionManifest(str(tmp_path / "manifest.db"))
+    return KnowledgeIngestor(knowledge, manifest=manifest, batch_size=2), embedder
+
+def test_unchanged_corpus_costs_no_embeddings(tmp_path):
+    source = tmp_path / "doc.txt"
+    source.write_text("alpha beta gamma delta " * 5)
+    ingestor, embedder = make_ingestor(tmp_path)
+    
+    first = ingestor.ingest([str(source)])
+    calls = embedder.calls
+    second = ingestor.ingest([str(source)])
+    
+    assert first["new"] > 0 and calls == first["new"]
+    assert second["new"] == 0 and second["sources"][0]["skipped"]
+    assert embedder.calls == calls
+    assert ingestor.knowledge.vector_db.get_count() == first["new"]
+
+def test_changed_source_embeds_only_new_chunks_and_drops_stale_ones(tmp_path):
+    source = tmp_path / "doc.txt"
+    source.write_text("first chunk of text. second chunk text. third chunk here.")
+    ingestor, embedder = make_ingestor(tmp_path)
+    first = ingestor.ingest([str(source)])
+    
+    source.write_text("first chunk of text. second chunk text. a replaced ending.")
+    calls = embedder.calls
+    second = ingestor.ingest([str(source)])
+    
+    assert second["new"] == embedder.calls - calls
+    assert second["new"] < first["new"]
+    assert second["removed"] >= 1
+    assert ingestor.knowledge.vector_db.get_count() == second["new"] + second["unchanged"]
+
+def test_chunk_shared_with_another_source_survives_its_removal(tmp_path):
+    first = tmp_path / "first.txt"
+    second = tmp_path / "second.txt"
+    first.write_text("shared chunk.")
+    second.write_text("shared chunk.")
+    ingestor, _ = make_ingestor(tmp_path)
+    ingestor.ingest([str(first), str(second)])
+    doc_id = ingestor.manifest.chunks(ingestor.target, str(second)).popitem()[1]
+    
+    first.write_text("other chunk.")
+    report = ingestor.ingest([str(first)])
+    
+    assert report["removed"] == 1
+    # The chunk is gone from the first source but the second one still needs it
+    table = ingestor.knowledge.vector_db.table
+    assert table.count_rows(f"id = '{doc_id}'") >= 1
+
+def test_interrupted_run_resumes(tmp_path, monkeypatch):
+    source = tmp_path / "doc.txt"
+    source.write_text("one two three four five six seven eight nine ten " * 4)
+    ingestor, embedder = make_ingestor(tmp_path)
+    
+    upsert = ingestor.knowledge.vector_db.upsert
+    batches = {"count": 0}
+    
+    def failing_upsert(documents, filters=None):
+        batches["count"] += 1
+        if batches["count"] == 2:
+            raise RuntimeError("connection lost")
+        upsert(documents, filters)
+    
+    monkeypatch.setattr(ingestor.knowledge.vector_db, "upsert", failing_upsert)
+    interrupted = ingestor.ingest([str(source)])
+    assert str(source) in interrupted["errors"]
+    assert ingestor.manifest.source(ingestor.target, str(source))["status"] == "in_progress"
+    
+    monkeypatch.setattr(ingestor.knowledge.vector_db, "upsert", upsert)
+    calls = embedder.calls
+    resumed = ingestor.ingest([str(source)])
+    
+    assert resumed["unchanged"] == 2
+    assert embedder.calls - calls == resumed["new"]
+    assert ingestor.manifest.source(ingestor.target, str(source))["status"] == "complete"
+
+def test_new_table_is_ingested_despite_manifest_of_another(tmp_path):
+    source = tmp_path / "doc.txt"
+    source.write_text("alpha beta gamma delta " * 5)
+    first, _ = make_ingestor(tmp_path, table_name="kb_openai")
+    first.ingest([str(source)])
+    
+    # A different embedder backend writes to its own table through the same manifest
+    second, embedder = make_ingestor(tmp_path, table_name="kb_hashing")
+    report = second.ingest([str(source)])
+    
+    assert not report["sources"][0]["skipped"]
+    assert embedder.calls == report["new"] > 0
+    assert second.knowledge.vector_db.get_count() == report["new"]
+
+class FailingLexicalIndex:
+    def add_knowledge_chunks(self, chunks):
+        raise ValueError("Failed to acquire Lockfile: LockBusy")
+    
+    def delete_documents(self, doc_ids):
+        raise ValueError("Failed to acquire Lockfile: LockBusy")
+
+def test_lexical_index_failure_does_not_abort_ingest(tmp_path):
+    source = tmp_path / "doc.txt"
+    source.write_text("alpha beta gamma delta " * 5)
+    ingestor, _ = make_ingestor(tmp_path)
+    ingestor.lexical_index = FailingLexicalIndex()
+    
+    report = ingestor.ingest([str(source)])
+    
+    assert report["errors"] == {}
+    assert ingestor.manifest.source(ingestor.target, str(source))["status"] == "complete"
@@ -0,0 +1,115 @@
+import time
+from agno.document import Document
+from agents.evidence import EvidenceContext
+from agents.serper_enhanced_search import SerperEnhancedSearchAgent
+from knowledge.lexical_index import LexicalIndex
+
+RESULTS = [
+    {"title": "Paris - Wikipedia", "snippet": "Paris is the capital of France.", "link": "https://en.wikipedia.org/wiki/Paris"},
+    {"title": "France facts", "snippet": "The French capital city is Paris.", "link": "https://example.com/france"},
+    {"title": "Eiffel Tower", "snippet": "Landmark in Paris.", "link": "https://example.com/eiffel"}
+]
+
+def test_bm25_search_over_serper_and_knowledge():
+    index = LexicalIndex(path="")
+    index.add_serper_results("capital of France", RESULTS)
+    index.add_knowledge_chunks([("kb-1", Document(name="Search", content="A web search engine indexes pages", meta_data={"url": "https://kb"}))])
+    
+    started = time.perf_counter()
+    hits = index.search("capital France", limit=5)
+    elapsed = time.perf_counter() - started
+    
+    assert hits[0]["link"] in {r["link"] for r in RESULTS}
+    assert index.search("search engine", source="knowledge")[0]["link"] == "https://kb"
+    assert index.search("search engine", source="serper") == []
+    assert elapsed < 0.05
+    assert len(index) == 4
+
+def test_repeat_queries_are_served_locally():
+    index = LexicalIndex(path="")
+    index.add_serper_results("What is the capital of France?", RESULTS)
+    
+    local = index.lookup_serper("what is the capital of france", num_results=2)
+    
+    assert [r["link"] for r in local] == [RESULTS[0]["link"], RESULTS[1]["link"]]
+    assert local[0]["snippet"] == RESULTS[0]["snippet"]
+    assert index.lookup_serper("capital of Germany", num_results=2) is None
+    assert index.lookup_serper("what is the capital of france", num_results=10) is None
+
+def test_reordered_query_is_not_a_repeat():
+    index = LexicalIndex(path="")
+    index.add_serper_results("flights paris to london", RESULTS)
+    
+    assert index.lookup_serper("flights london to paris", num_results=2) is None
+    assert index.lookup_serper("Flights Paris to London", num_results=2) is not None
+
+def test_stale_results_are_not_reused():
+    index = LexicalIndex(path="")
+    index.add_serper_results("capital of France", RESULTS)
+    
+    assert index.lookup_serper("capital of France", num_results=2, max_age=0) is None
+
+def test_lookup_finds_query_among_many_sharing_its_terms():
+    index = LexicalIndex(path="")
+    for i in range(250):
+        index.add_serper_results(f"capital of France {i}", RESULTS[:1])
+    index.add_serper_results("capital of France", RESULTS)
+    
+    assert len(index.lookup_serper("capital of France", num_results=3)) == 3
+
+def test_reindexing_a_query_replaces_its_results(tmp_path):
+    index = LexicalIndex(path=str(tmp_path / "index"))
+    index.add_serper_results("capital of France", RESULTS)
+    index.add_serper_results("capital of France", RESULTS[:1])
+    
+    assert len(index) == 1
+    
+    reopened = LexicalIndex(path=str(tmp_path / "index"))
+    assert reopened.lookup_serper("capital of france", num_results=1)[0]["link"] == RESULTS[0]["link"]
+
+def test_indexes_sharing_a_path_can_both_write(tmp_path):
+    first = LexicalIndex(path=str(tmp_path / "index"))
+    second = LexicalIndex(path=str(tmp_path / "index"))
+    
+    first.add_serper_results("capital of France", RESULTS)
+    second.add_serper_results("capital of Germany", RESULTS[:1])
+    first.add_serper_results("capital of Spain", RESULTS[:1])
+    
+    assert len(LexicalIndex(path=str(tmp_path / "index"))) == 5
+
+def test_queued_results_are_served_and_committed_in_one_batch(tmp_path):
+    index = LexicalIndex(path=str(tmp_path / "index"), flush_interval=3600)
+    index.queue_serper_results("capital of France", RESULTS)
+    index.queue_serper_results("capital of Germany", RESULTS[:1])
+    
+    assert len(index) == 0
+    assert index.lookup_serper("capital of France", num_results=3)[2]["link"] == RESULTS[2]["link"]
+    
+    index.flush_pending()
+    
+    assert len(index) == 4
+    assert index.lookup_serper("capital of Germany", num_results=1)[0]["link"] == RESULTS[0]["link"]
+
+class CountingSerperClient:
+    def __init__(self):
+        self.calls = 0
+    
+    def get_organic_search_results(self, query, num_results=10):
+        self.calls += 1
+        return RESULTS[:num_results]
+
+def test_agent_serves_repeat_queries_from_local_index():
+    agent = SerperEnhancedSearchAgent.__new__(SerperEnhancedSearchAgent)
+    agent.serper_client = CountingSerperClient()
+    agent.lexical_index = LexicalIndex(path="")
+    
+    first = agent._get_serper_results("Capital of France", num_results=3)
+    second = agent._get_serper_results("capital of france?", num_results=3)
+    
+    evidence = EvidenceContext("Capital of France!", serper_client=agent.serper_client)
+    seeded = agent._get_serper_results("rewritten prompt", num_results=2, evidence=evidence)
+    
+    assert agent.serper_client.calls == 1
+    assert [r["link"] for r in second] == [r["link"] for r in first]
+    assert evidence.serper_organic(2) == seeded
+    assert agent.serper_client.calls == 1
@@ -0,0 +1,382 @@
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from agents.api_failover import APIFailover
+from agents.llm_engine import LLMExecutionEngine, LLMProvider, LLMResult, completion_key
+from agents.rate_limiter import RateLimiter
+from utils.cache import TTLCache, SQLiteCacheBackend
+
+class FakeRunResponse:
+    def __init__(self, content, metrics=None):
+        self.content = content
+        self.metrics = metrics or {}
+
+class FakeAgent:
+    def __init__(self, content="answer", delay=0.0, error=None, metrics=None):
+        self.content = content
+        self.delay = delay
+        self.error = error
+        self.metrics = metrics
+        self.calls = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+    
+    def run(self, prompt):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.error:
+                raise Exception(self.error)
+            return FakeRunResponse(f"{self.content}: {prompt}", self.metrics)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+class FakeFailover:
+    def __init__(self, available=("openrouter", "openai")):
+        self.available = list(available)
+        self.failures = []
+        self.successes = []
+    
+    def get_available_apis(self, api_type):
+        return [{"name": name} for name in self.available]
+    
+    def claim_probe(self, api_name):
+        return True
+    
+    def report_failure(self, api_name, latency=None):
+        self.failures.append(api_name)
+    
+    def report_success(self, api_name, latency=None):
+        self.successes.append(api_name)
+
+def make_engine(primary, fallback, failover=None, **provider_kwargs):
+    return LLMExecutionEngine(
+        [LLMProvider("openrouter", primary, **provider_kwargs), LLMProvider("openai", fallback, **provider_kwargs)],
+        failover=failover or FakeFailover(),
+        executor=ThreadPoolExecutor(max_workers=8),
+        use_cache=False,
+        semaphores={}
+    )
+
+def test_run_returns_result_metadata():
+    primary = FakeAgent(metrics={"input_tokens": [10, 5], "output_tokens": [7]})
+    failover = FakeFailover()
+    engine = make_engine(primary, FakeAgent(), failover)
+    
+    result = engine.run("hello")
+    
+    assert isinstance(result, LLMResult)
+    assert result.content == "answer: hello"
+    assert result.provider == "openrouter"
+    assert result.used_fallback is False
+    assert (result.input_tokens, result.output_tokens) == (15, 7)
+    assert failover.successes == ["openrouter"]
+
+def test_failure_falls_back_to_next_provider():
+    failover = FakeFailover()
+    engine = make_engine(FakeAgent(error="boom"), FakeAgent(content="fallback"), failover)
+    
+    result = engine.run("hello")
+    
+    assert result.provider == "openai"
+    assert result.used_fallback is True
+    assert result.errors == ["openrouter: boom"]
+    assert failover.failures == ["openrouter"]
+    assert engine.stats()["openrouter"]["failures"] == 1
+
+def test_providers_in_cooldown_are_skipped():
+    primary = FakeAgent()
+    engine = make_engine(primary, FakeAgent(content="fallback"), FakeFailover(available=["openai"]))
+    
+    result = engine.run("hello")
+    
+    assert result.provider == "openai"
+    assert primary.calls == 0
+
+def make_half_open_failover():
+    failover = APIFailover()
+    failover.api_configs = {"llm": [
+        {"name": "openrouter", "key": "k1", "available": True, "priority": 1},
+        {"name": "openai", "key": "k2", "available": True, "priority": 2}
+    ]}
+    failover.exploration_rate = 0.0
+    failover.report_success("openai", latency=0.01)
+    for _ in range(failover.max_failures):
+        failover.report_failure("openrouter")
+    failover.health["openrouter"].open_until = time.time() - 1
+    failover.health["openrouter"].latency = 1.0
+    return failover
+
+def test_half_open_provider_keeps_probe_until_called():
+    failover = make_half_open_failover()
+    primary = FakeAgent()
+    engine = make_engine(primary, FakeAgent(content="fallback"), failover)
+    
+    assert engine.run("hello").provider == "openai"
+    
+    # Ranked behind a healthy provider, the half-open one was never sent its probe
+    assert primary.calls == 0
+    assert failover.claim_probe("openrouter")
+
+def test_probe_sent_when_half_open_provider_is_called():
+    failover = make_half_open_failover()
+    engine = make_engine(FakeAgent(), FakeAgent(error="down"), failover)
+    
+    assert engine.run("hello").provider == "openrouter"
+    assert failover.get_health()["llm"]["openrouter"]["state"] == "closed"
+
+def test_exploration_pick_is_not_reported_as_fallback():
+    failover = APIFailover()
+    failover.api_configs = {"llm": [
+        {"name": "openrouter", "key": "k1", "available": True, "priority": 1},
+        {"name": "openai", "key": "k2", "available": True, "priority": 2}
+    ]}
+    failover.exploration_rate = 1.0
+    engine = make_engine(FakeAgent(), FakeAgent(content="explored"), failover)
+    
+    result = engine.run("hello")
+    
+    assert result.provider == "openai"
+    assert result.explored is True
+    assert result.used_fallback is False
+
+def test_timeout_moves_on_to_fallback():
+    engine = make_engine(FakeAgent(delay=0.5), FakeAgent(content="fallback"), timeout=0.1)
+    
+    started = time.perf_counter()
+    result = engine.run("hello")
+    
+    assert time.perf_counter() - started < 0.4
+    assert result.provider == "openai"
+    assert engine.stats()["openrouter"]["timeouts"] == 1
+
+def test_all_providers_failing_raises():
+    engine = make_engine(FakeAgent(error="down"), FakeAgent(error="also down"))
+    
+    with pytest.raises(Exception, match="All LLM providers failed"):
+        engine.run("hello")
+
+def test_concurrency_limit_per_provider():
+    primary = FakeAgent(delay=0.05)
+    engine = make_engine(primary, FakeAgent(), max_concurrency=2)
+    
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(engine.run, [f"q{i}" for i in range(6)]))
+    
+    assert all(result.provider == "openrouter" for result in results)
+    assert primary.max_active == 2
+    assert engine.stats()["openrouter"]["calls"] == 6
+
+def test_concurrency_limit_is_shared_across_engines():
+    primary = FakeAgent(delay=0.05)
+    semaphores = {}
+    engines = [
+        LLMExecutionEngine([LLMProvider("openrouter", primary, max_concurrency=2)],
+                           failover=FakeFailover(["openrouter"]), executor=ThreadPoolExecutor(max_workers=4),
+                           use_cache=False, semaphores=semaphores)
+        for _ in range(3)
+    ]
+    
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        list(pool.map(lambda i: engines[i % 3].run(f"q{i}"), range(6)))
+    
+    assert primary.max_active == 2
+
+def test_backpressure_does_not_hurt_provider_health():
+    failover = FakeFailover()
+    engine = make_engine(FakeAgent(delay=0.3), FakeAgent(content="fallback"), failover, max_concurrency=1)
+    engine.providers[0].timeout = 0.05
+    
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        results = list(pool.map(engine.run, ["first", "second"]))
+    
+    assert "openai" in [result.provider for result in results]
+    assert engine.stats()["openrouter"]["rejected"] == 1
+    assert failover.failures.count("openrouter") == 1
+
+def make_hedging_engine(primary, fallback, budget=1.0):
+    engine = LLMExecutionEngine(
+        [LLMProvider("openrouter", primary), LLMProvider("openai", fallback)],
+        failover=FakeFailover(),
+        executor=ThreadPoolExecutor(max_workers=8),
+        use_cache=False,
+        hedging=True,
+        hedge_percentile=95,
+        hedge_budget=budget,
+        hedge_min_samples=3
+    )
+    engine._latencies["openrouter"].extend([0.02, 0.03, 0.05])
+    return engine
+
+def test_slow_primary_is_hedged_and_first_answer_wins():
+    engine = make_hedging_engine(FakeAgent(delay=0.5), FakeAgent(content="fallback"))
+    
+    started = time.perf_counter()
+    result = engine.run("hello")
+    
+    assert time.perf_counter() - started < 0.3
+    assert result.provider == "openai"
+    assert result.hedged is True
+    assert result.used_fallback is True
+    assert engine.stats()["hedging"]["hedge_wins"] == 1
+
+def test_running_hedge_loser_counts_against_budget():
+    primary = FakeAgent(delay=0.3)
+    engine = make_hedging_engine(primary, FakeAgent(content="fallback"), budget=1.0)
+    
+    assert engine.run("first").hedged is True
+    assert engine.stats()["hedging"]["running_losers"] == 1
+    
+    # The abandoned primary still holds capacity, so the next slow call is not hedged
+    assert engine.run("second").hedged is False
+    time.sleep(0.35)
+    assert engine.stats()["hedging"]["running_losers"] == 0
+
+def test_abandoned_call_does_not_start():
+    agent = FakeAgent()
+    engine = make_engine(agent, FakeAgent())
+    abandoned = threading.Event()
+    abandoned.set()
+    
+    with pytest.raises(Exception, match="abandoned"):
+        engine._run_agent(engine.providers[0], "hello", abandoned)
+    assert agent.calls == 0
+
+def test_fast_primary_is_not_hedged():
+    fallback = FakeAgent(content="fallback")
+    engine = make_hedging_engine(FakeAgent(), fallback)
+    
+    result = engine.run("hello")
+    
+    assert result.provider == "openrouter"
+    assert result.hedged is False
+    assert fallback.calls == 0
+
+def test_hedge_budget_caps_hedge_rate():
+    fallback = FakeAgent(content="fallback")
+    engine = make_hedging_engine(FakeAgent(delay=0.15), fallback, budget=0.5)
+    
+    results = [engine.run(f"q{i}") for i in range(4)]
+    
+    hedging = engine.stats()["hedging"]
+    assert hedging["requests"] == 4
+    assert hedging["hedges"] <= 2
+    assert sum(result.hedged for result in results) == hedging["hedges"]
+
+def test_hedging_skipped_without_latency_history():
+    fallback = FakeAgent(content="fallback")
+    engine = make_hedging_engine(FakeAgent(delay=0.1), fallback)
+    engine._latencies["openrouter"].clear()
+    
+    result = engine.run("hello")
+    
+    assert result.provider == "openrouter"
+    assert fallback.calls == 0
+
+class RateLimitError(Exception):
+    status_code = 429
+
+class RateLimitedAgent:
+    def run(self, prompt):
+        raise RateLimitError("Too Many Requests")
+
+def test_rate_limited_key_spills_to_next_key():
+    failover = APIFailover()
+    failover.api_configs = {"llm": [{"name": "openrouter", "keys": ["k1", "k2"], "available": True, "priority": 1}]}
+    limited = RateLimitedAgent()
+    engine = LLMExecutionEngine(
+        [LLMProvider("openrouter", limited, keyed_agents={"k1": limited, "k2": FakeAgent(content="second key")})],
+        failover=failover,
+        executor=ThreadPoolExecutor(max_workers=2),
+        use_cache=False
+    )
+    
+    result = engine.run("hello")
+    
+    assert result.content == "second key: hello"
+    assert result.used_fallback is False
+    assert failover.get_key_pool("openrouter").stats()["rate_limited"] == 1
+
+def test_local_throttling_moves_on_without_hurting_provider_health():
+    limiter = RateLimiter({"openrouter": {"requests_per_second": 0.01}}, mode="fail_fast")
+    failover = FakeFailover()
+    engine = LLMExecutionEngine(
+        [LLMProvider("openrouter", FakeAgent()), LLMProvider("openai", FakeAgent(content="fallback"))],
+        failover=failover,
+        executor=ThreadPoolExecutor(max_workers=2),
+        rate_limiter=limiter,
+        use_cache=False
+    )
+    
+    assert engine.run("first").provider == "openrouter"
+    assert engine.run("second").provider == "openai"
+    assert failover.failures == []
+    assert engine.stats()["openrouter"]["throttled"] == 1
+
+class FakeModel:
+    def __init__(self, model_id="gpt-4o-mini", temperature=None):
+        self.id = model_id
+        self.temperature = temperature
+
+def make_cached_engine(agent, cache):
+    return LLMExecutionEngine(
+        [LLMProvider("openrouter", agent)],
+        failover=FakeFailover(),
+        executor=ThreadPoolExecutor(max_workers=2),
+        cache=cache
+    )
+
+def test_repeat_prompts_are_served_from_cache():
+    agent = FakeAgent()
+    agent.model = FakeModel()
+    engine = make_cached_engine(agent, TTLCache())
+    
+    first = engine.run("Analyze this query:\n    capital of France")
+    second = engine.run("Analyze this query: capital of France")
+    
+    assert agent.calls == 1
+    assert first.cached is False
+    assert second.cached is True
+    assert second.content == first.content
+    assert engine.stats()["cache"]["hits"] == 1
+
+def test_cache_key_covers_model_params_and_instructions():
+    agent = FakeAgent()
+    agent.model = FakeModel()
+    agent.instructions = ["Cite sources"]
+    
+    key = completion_key(agent, "hello")
+    agent.instructions = ["Be brief"]
+    other_instructions = completion_key(agent, "hello")
+    agent.model = FakeModel(temperature=0.7)
+    other_params = completion_key(agent, "hello")
+    
+    assert len({key, other_instructions, other_params}) == 3
+    assert completion_key(agent, "hello", {"stream": False}) != other_params
+
+def test_failures_are_not_cached():
+    agent = FakeAgent(error="boom")
+    cache = TTLCache()
+    engine = make_cached_engine(agent, cache)
+    
+    with pytest.raises(Exception):
+        engine.run("hello")
+    
+    assert len(cache) == 0
+
+def test_completions_persist_through_backend(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "llm.db"), table="llm_completions")
+    make_cached_engine(FakeAgent(), TTLCache(backend=backend)).run("hello")
+    
+    agent = FakeAgent(content="fresh")
+    result = make_cached_engine(agent, TTLCache(backend=backend)).run("hello")
+    
+    assert result.cached is True
+    assert result.content == "answer: hello"
+    assert agent.calls == 0
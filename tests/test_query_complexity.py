@@ -0,0 +1,94 @@
+import json
+import pytest
+from agents.enhanced_search_agent import EnhancedSmartSearchAgent
+from agents.llm_engine import LLMResult
+from agents.query_complexity import QueryComplexityClassifier, query_features, FEATURES, SKIP, FOLD, SEPARATE
+
+SIMPLE = "capital of France"
+MEDIUM = "how does photosynthesis work"
+COMPLEX = "Compare the economic impact of remote work versus office work, and why does it differ by industry?"
+
+class FakeEngine:
+    def __init__(self, latency=0.5):
+        self.latency = latency
+        self.prompts = []
+    
+    def run(self, prompt):
+        self.prompts.append(prompt)
+        return LLMResult(content=f"response {len(self.prompts)}", response=None, provider="openrouter",
+                         latency=self.latency)
+
+def make_agent(classifier):
+    agent = EnhancedSmartSearchAgent.__new__(EnhancedSmartSearchAgent)
+    agent.engine = FakeEngine()
+    agent.complexity = classifier
+    return agent
+
+def test_heuristic_modes_follow_query_complexity():
+    classifier = QueryComplexityClassifier(skip_below=0.35, separate_above=0.75)
+    
+    assert classifier.decide(SIMPLE) == SKIP
+    assert classifier.decide("what is python") == SKIP
+    assert classifier.decide(MEDIUM) == FOLD
+    assert classifier.decide(COMPLEX) == SEPARATE
+    assert classifier.stats()["decisions"] == {SKIP: 2, FOLD: 1, SEPARATE: 1}
+
+def test_explicit_use_reasoning_overrides_the_classifier():
+    classifier = QueryComplexityClassifier()
+    
+    assert classifier.decide(SIMPLE, use_reasoning=True) == SEPARATE
+    assert classifier.decide(COMPLEX, use_reasoning=False) == SKIP
+    assert classifier.stats()["forced"] == 2
+    assert sum(classifier.stats()["decisions"].values()) == 0
+
+def test_linear_model_replaces_heuristic_weights(tmp_path):
+    path = tmp_path / "model.json"
+    path.write_text(json.dumps({"bias": -3.0, "weights": {"words": 8.0}}))
+    classifier = QueryComplexityClassifier(model_path=str(path))
+    
+    assert classifier.stats()["model"] is True
+    assert classifier.decide("why") == SKIP
+    assert classifier.decide(" ".join(["word"] * 30)) == SEPARATE
+
+def test_unreadable_model_falls_back_to_heuristics(tmp_path):
+    classifier = QueryComplexityClassifier(model_path=str(tmp_path / "missing.json"))
+    
+    assert classifier.uses_model is False
+    assert classifier.decide(SIMPLE) == SKIP
+
+def test_invalid_thresholds_are_rejected():
+    with pytest.raises(ValueError):
+        QueryComplexityClassifier(skip_below=0.8, separate_above=0.5)
+
+def test_features_are_bounded():
+    features = query_features(COMPLEX + " " + COMPLEX)
+    
+    assert features.shape == (len(FEATURES),)
+    assert features.min() >= 0 and features.max() <= 1
+
+def test_agent_makes_one_call_unless_query_is_complex():
+    agent = make_agent(QueryComplexityClassifier())
+    
+    agent.search(SIMPLE)
+    assert agent.engine.prompts == [SIMPLE]
+    
+    agent.search(MEDIUM)
+    assert len(agent.engine.prompts) == 2
+    assert "identify the key concepts" in agent.engine.prompts[1]
+    
+    agent.search(COMPLEX)
+    assert len(agent.engine.prompts) == 4
+    assert agent.engine.prompts[2].startswith("Analyze this search query")
+
+def test_stats_report_skip_rate_and_latency_saved():
+    classifier = QueryComplexityClassifier()
+    agent = make_agent(classifier)
+    
+    agent.search(COMPLEX)
+    agent.search(SIMPLE)
+    agent.search(MEDIUM)
+    stats = classifier.stats()
+    
+    assert stats["skip_rate"] == pytest.approx(2 / 3, abs=1e-4)
+    assert stats["avg_reasoning_latency"] == 0.5
+    assert stats["estimated_latency_saved"] == 1.0
@@ -0,0 +1,104 @@
+import asyncio
+import threading
+import time
+import pytest
+from agents.rate_limiter import TokenBucket, RateLimiter, RateLimitExceeded
+
+def test_token_bucket_allows_burst_then_limits():
+    bucket = TokenBucket(rate=2.0, capacity=2.0)
+    
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert 0 < bucket.wait_time() <= 0.5
+
+def test_token_bucket_refills_over_time():
+    bucket = TokenBucket(rate=20.0, capacity=1.0)
+    bucket.try_acquire()
+    
+    time.sleep(0.06)
+    
+    assert bucket.try_acquire()
+
+def test_zero_rate_is_unlimited():
+    bucket = TokenBucket(rate=0)
+    
+    assert all(bucket.try_acquire() for _ in range(100))
+    assert bucket.wait_time() == 0.0
+
+def test_fail_fast_raises_without_capacity():
+    limiter = RateLimiter({"serper": {"requests_per_second": 1.0}})
+    
+    limiter.acquire("serper", mode="fail_fast")
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("serper", mode="fail_fast")
+    
+    assert limiter.stats()["serper"]["rejected"] == 1
+
+def test_block_waits_for_capacity():
+    limiter = RateLimiter({"serper": {"requests_per_second": 20.0, "burst": 1}})
+    
+    started = time.monotonic()
+    for _ in range(3):
+        limiter.acquire("serper")
+    
+    assert time.monotonic() - started >= 0.09
+    assert limiter.stats()["serper"]["throttled"] == 2
+
+def test_block_times_out():
+    limiter = RateLimiter({"serper": {"requests_per_second": 0.1}}, timeout=0.05)
+    limiter.acquire("serper")
+    
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("serper")
+
+def test_tokens_per_minute_limit_and_settlement():
+    limiter = RateLimiter({"openrouter": {"tokens_per_minute": 600}})
+    
+    limiter.acquire("openrouter", tokens=100, mode="fail_fast")
+    # The response used far more tokens than estimated
+    limiter.record_tokens("openrouter", 500)
+    
+    with pytest.raises(RateLimitExceeded):
+        limiter.acquire("openrouter", tokens=100, mode="fail_fast")
+
+def test_queue_depth_is_observable():
+    limiter = RateLimiter({"jira": {"requests_per_second": 10.0, "burst": 1}})
+    limiter.acquire("jira")
+    
+    threads = [threading.Thread(target=limiter.acquire, args=("jira",)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.02)
+    waiting = limiter.stats()["jira"]["waiting"]
+    for thread in threads:
+        thread.join()
+    
+    assert waiting == 3
+    assert limiter.stats()["jira"]["max_waiting"] == 3
+    assert limiter.stats()["jira"]["waiting"] == 0
+
+def test_async_acquire_does_not_block_the_loop():
+    limiter = RateLimiter({"serper": {"requests_per_second": 20.0, "burst": 1}})
+    ticks = []
+    
+    async def ticker():
+        for _ in range(5):
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+    
+    async def main():
+        await asyncio.gather(ticker(), *(limiter.acquire_async("serper") for _ in range(3)))
+    
+    asyncio.run(main())
+    
+    assert len(ticks) == 5
+    assert limiter.stats()["serper"]["acquired"] == 3
+
+def test_unknown_providers_are_unlimited():
+    limiter = RateLimiter()
+    
+    for _ in range(50):
+        limiter.acquire("cohere", mode="fail_fast")
+    
+    assert limiter.stats()["cohere"]["acquired"] == 50
@@ -0,0 +1,78 @@
+from concurrent.futures import ThreadPoolExecutor
+from agno.document import Document
+from agno.reranker.base import Reranker
+from knowledge.embeddings import HashingEmbedder
+from knowledge.lexical_index import LexicalIndex
+from knowledge.reranker import HybridReranker, create_reranker, reciprocal_rank_fusion
+
+class RecordingReranker(Reranker):
+    calls: int = 0
+    
+    def rerank(self, query, documents):
+        self.calls += 1
+        return list(reversed(documents))
+
+def embedded(content, embedder, name="doc"):
+    return Document(name=name, content=content, embedding=embedder.get_embedding(content))
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    scores = reciprocal_rank_fusion([["a", "b", "c"], ["b", "a"], ["b"]], k=60)
+    
+    assert max(scores, key=scores.get) == "b"
+    assert scores["c"] == 1 / 63
+
+def test_confident_local_ranking_skips_remote_reranker():
+    embedder = HashingEmbedder(dimensions=128)
+    fallback = RecordingReranker()
+    reranker = HybridReranker(embedder=embedder, fallback=fallback)
+    documents = [
+        embedded("lancedb hybrid search combines vectors and keywords", embedder),
+        embedded("the weather in paris is mild", embedder)
+    ]
+    
+    results = reranker.rerank("lancedb hybrid search", documents)
+    
+    assert results[0].content.startswith("lancedb")
+    assert results[0].reranking_score > results[1].reranking_score
+    assert fallback.calls == 0
+    assert reranker.stats == {"local": 1, "fallback": 0}
+
+def test_ambiguous_ranking_defers_to_remote_reranker():
+    embedder = HashingEmbedder(dimensions=128)
+    fallback = RecordingReranker()
+    reranker = HybridReranker(embedder=embedder, fallback=fallback, use_scorer=False)
+    # LanceDB's order disagrees with the vector similarity ranking
+    documents = [
+        embedded("the weather in paris is mild", embedder),
+        embedded("lancedb hybrid search combines vectors and keywords", embedder)
+    ]
+    
+    reranker.rerank("lancedb hybrid search", documents)
+    
+    assert fallback.calls == 1
+    assert reranker.stats["fallback"] == 1
+
+def test_lexical_hits_add_candidates_and_top_n_applies():
+    embedder = HashingEmbedder(dimensions=128)
+    index = LexicalIndex(path="")
+    index.add_knowledge_chunks([("kb-1", Document(name="Tantivy", content="tantivy is a full text search engine library"))])
+    reranker = HybridReranker(embedder=embedder, lexical_index=index, top_n=1)
+    
+    results = reranker.rerank("full text search engine", [embedded("unrelated cooking recipe", embedder)])
+    
+    assert len(results) == 1
+    assert results[0].content == "tantivy is a full text search engine library"
+
+def test_concurrent_reranks_are_all_counted():
+    embedder = HashingEmbedder(dimensions=32)
+    reranker = HybridReranker(embedder=embedder)
+    documents = [embedded("lancedb hybrid search", embedder), embedded("paris weather", embedder)]
+    
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda _: reranker.rerank("lancedb", list(documents)), range(200)))
+    
+    assert reranker.stats["local"] + reranker.stats["fallback"] == 200
+
+def test_local_reranker_has_no_cohere_fallback_without_a_key():
+    assert create_reranker("local", cohere_api_key=None).fallback is None
+    assert create_reranker("local", cohere_api_key="").fallback is None
@@ -0,0 +1,142 @@
+import time
+import numpy as np
+from agents.semantic_cache import SemanticCache, classify_query
+from knowledge.embeddings import HashingEmbedder
+
+class FakeEmbedder:
+    """Embeds known queries to fixed vectors so similarities are exact."""
+    
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = 0
+    
+    def get_embedding(self, text):
+        self.calls += 1
+        return self.vectors[text]
+
+VECTORS = {
+    "capital of france": [1.0, 0.0, 0.0],
+    "france capital": [0.96, 0.28, 0.0],
+    "population of france": [0.6, 0.8, 0.0],
+    "python release date": [0.0, 0.0, 1.0]
+}
+
+def make_cache(**kwargs):
+    kwargs.setdefault("threshold", 0.92)
+    kwargs.setdefault("ttls", {"time_sensitive": 600, "evergreen": 86400, "default": 3600})
+    kwargs.setdefault("min_confidence", 70)
+    return SemanticCache(embedder=FakeEmbedder(VECTORS), **kwargs)
+
+def answer(text="Paris", confidence=95):
+    return {"results": text, "verification": "Verified", "confidence": confidence}
+
+def test_near_duplicate_query_is_served_from_cache():
+    cache = make_cache()
+    assert cache.store("Capital of France?", answer())
+    
+    hit = cache.lookup("France capital")
+    
+    assert hit["results"] == "Paris"
+    assert hit["cached"] is True
+    assert hit["semantic_cache"]["matched_query"] == "Capital of France?"
+    assert hit["semantic_cache"]["similarity"] == 0.96
+    assert cache.stats()["hits"] == 1
+
+def test_query_below_threshold_misses():
+    cache = make_cache()
+    cache.store("capital of france", answer())
+    
+    assert cache.lookup("population of france") is None
+    assert cache.lookup("python release date") is None
+    assert cache.stats()["misses"] == 2
+
+def test_cached_result_is_a_copy():
+    cache = make_cache()
+    cache.store("capital of france", answer())
+    
+    cache.lookup("capital of france")["results"] = "changed"
+    
+    assert cache.lookup("capital of france")["results"] == "Paris"
+
+def test_answers_are_scoped_per_user():
+    cache = make_cache()
+    cache.store("capital of france", answer("Paris for alice"), scope="alice")
+    
+    assert cache.lookup("capital of france", scope="bob") is None
+    assert cache.lookup("capital of france", scope="alice")["results"] == "Paris for alice"
+
+def test_low_confidence_answers_are_not_cached():
+    cache = make_cache()
+    
+    assert not cache.store("capital of france", answer(confidence=50))
+    assert not cache.store("capital of france", "plain text")
+    assert len(cache) == 0
+
+def test_restoring_a_query_replaces_the_entry():
+    cache = make_cache()
+    cache.store("capital of france", answer("Paris"))
+    cache.store("Capital of France", answer("Paris, France"))
+    
+    assert len(cache) == 1
+    assert cache.lookup("capital of france")["results"] == "Paris, France"
+
+def test_ttl_depends_on_query_class():
+    cache = make_cache(ttls={"short": 0.05, "default": 3600})
+    cache.store("capital of france", answer(), query_class="short")
+    cache.store("python release date", answer("1991"))
+    
+    time.sleep(0.1)
+    
+    assert cache.lookup("capital of france") is None
+    assert cache.lookup("python release date")["results"] == "1991"
+
+def test_classify_query():
+    assert classify_query("latest news about the election") == "time_sensitive"
+    assert classify_query("bitcoin price today") == "time_sensitive"
+    assert classify_query("What is photosynthesis") == "evergreen"
+    assert classify_query("history of the roman empire") == "evergreen"
+    assert classify_query("best laptop for programming") == "default"
+
+def test_oldest_entries_are_evicted_beyond_max_entries():
+    cache = make_cache(max_entries=2)
+    cache.store("capital of france", answer())
+    cache.store("population of france", answer("68 million"))
+    cache.store("python release date", answer("1991"))
+    
+    assert len(cache) == 2
+    assert cache.lookup("capital of france") is None
+    assert cache.stats()["evictions"] == 1
+
+def test_invalidate_by_query_scope_and_class():
+    cache = make_cache()
+    cache.store("capital of france", answer(), scope="alice")
+    cache.store("capital of france", answer(), scope="bob", query_class="default")
+    cache.store("python release date", answer("1991"), scope="alice", query_class="evergreen")
+    
+    assert cache.invalidate(query="france capital", scope="alice") == 1
+    assert cache.lookup("capital of france", scope="bob") is not None
+    assert cache.invalidate(query_class="evergreen") == 1
+    assert cache.invalidate() == 1
+    assert len(cache) == 0
+
+def test_embedding_failure_is_a_miss():
+    cache = make_cache()
+    
+    assert cache.lookup("unknown query") is None
+    assert not cache.store("unknown query", answer())
+
+def test_lookup_is_one_matrix_product_over_many_entries():
+    vectors = np.random.default_rng(0).normal(size=(500, 32))
+    embedder = FakeEmbedder({f"query {i}": vector for i, vector in enumerate(vectors)})
+    cache = SemanticCache(embedder=embedder, threshold=0.99, max_entries=1000, ttls={"default": 3600})
+    for i in range(500):
+        cache.store(f"query {i}", answer(f"answer {i}"), query_class="default")
+    
+    assert len(cache) == 500
+    assert cache.lookup("query 321")["results"] == "answer 321"
+
+def test_hashing_embedder_matches_reworded_punctuation_and_case():
+    cache = SemanticCache(embedder=HashingEmbedder(), threshold=0.92, ttls={"default": 3600})
+    cache.store("What is the capital of France?", answer())
+    
+    assert cache.lookup("what is the capital of france")["results"] == "Paris"
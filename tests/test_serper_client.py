@@ -0,0 +1,183 @@
+import asyncio
+import json
+import time
+import httpx
+import pytest
+from agents import serper_client
+from agents.api_failover import APIFailover
+from agents.serper_client import SerperAPIClient, AsyncSerperAPIClient, get_shared_session
+from utils.cache import TTLCache
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200, headers=None):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+    
+    def raise_for_status(self):
+        pass
+    
+    def json(self):
+        return self.payload
+
+class FakeSession:
+    def __init__(self, payload=None):
+        self.payload = payload or {"organic": [{"title": "Paris"}]}
+        self.calls = []
+    
+    def post(self, url, headers=None, json=None, timeout=None):
+        self.calls.append({"url": url, "json": json, "timeout": timeout})
+        return FakeResponse(self.payload)
+
+@pytest.fixture(autouse=True)
+def serper_key(monkeypatch):
+    monkeypatch.setattr(serper_client, "SERPER_API_KEY", "test-key")
+
+def test_clients_share_pooled_session():
+    """Every client in the process should reuse the same connection pool."""
+    first = SerperAPIClient()
+    second = SerperAPIClient()
+    
+    assert first.session is second.session
+    assert first.session is get_shared_session()
+    
+    adapter = first.session.get_adapter("https://google.serper.dev")
+    assert adapter._pool_maxsize == serper_client.SERPER_POOL_SIZE
+    assert adapter.max_retries.total == serper_client.SERPER_MAX_RETRIES
+    # Rate limits are handed to the key pool instead of being retried on the same key
+    assert 429 not in adapter.max_retries.status_forcelist
+
+def test_search_uses_session_and_timeout():
+    session = FakeSession()
+    client = SerperAPIClient(session=session, timeout=(1, 2), cache=TTLCache())
+    
+    results = client.get_organic_search_results("capital of France", 5)
+    
+    assert results == [{"title": "Paris"}]
+    assert session.calls[0]["url"] == "https://google.serper.dev/search"
+    assert session.calls[0]["json"] == {"q": "capital of France", "num": 5}
+    assert session.calls[0]["timeout"] == (1, 2)
+
+def test_async_search_many_preserves_order_and_limits_concurrency():
+    """search_many should fan out under the concurrency limit and keep query order."""
+    in_flight = {"current": 0, "peak": 0}
+    
+    async def handler(request):
+        in_flight["current"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["current"])
+        await asyncio.sleep(0.01)
+        in_flight["current"] -= 1
+        query = json.loads(request.content)["q"]
+        if query == "broken":
+            return httpx.Response(400)
+        return httpx.Response(200, json={"organic": [{"title": query}], "path": request.url.path})
+    
+    async def run():
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        async with AsyncSerperAPIClient(client=http_client, max_concurrency=3, cache=TTLCache()) as client:
+            queries = [f"query {i}" for i in range(10)] + ["broken"]
+            results = await client.search_many(queries, "news")
+            organic = await client.get_organic_search_results("single")
+        await http_client.aclose()
+        return queries, results, organic
+    
+    queries, results, organic = asyncio.run(run())
+    
+    assert [r["organic"][0]["title"] for r in results[:-1]] == queries[:-1]
+    assert all(r["path"] == "/news" for r in results[:-1])
+    assert results[-1] == {}
+    assert in_flight["peak"] <= 3
+    assert organic == [{"title": "single"}]
+
+def test_facets_share_one_round_trip():
+    """Organic, knowledge graph and related searches should come from one request."""
+    session = FakeSession({
+        "organic": [{"title": "Paris"}],
+        "knowledgeGraph": {"title": "France"},
+        "relatedSearches": [{"query": "capital of Germany"}],
+        "peopleAlsoAsk": [{"question": "Is Paris the capital?"}],
+        "topStories": [{"title": "News"}]
+    })
+    client = SerperAPIClient(session=session, cache=TTLCache())
+    
+    assert client.get_organic_search_results("capital of France") == [{"title": "Paris"}]
+    assert client.get_knowledge_graph("capital of France") == {"title": "France"}
+    assert client.get_related_searches("capital of France") == [{"query": "capital of Germany"}]
+    
+    response = client.fetch("capital of France", num=10)
+    assert response.people_also_ask == [{"question": "Is Paris the capital?"}]
+    assert response.news == [{"title": "News"}]
+    assert len(session.calls) == 1
+
+def test_facets_share_one_round_trip_with_cache_disabled(monkeypatch):
+    monkeypatch.setattr(serper_client, "SERPER_CACHE_TTL", 0)
+    session = FakeSession({"organic": [{"title": "Paris"}], "knowledgeGraph": {"title": "France"}})
+    cache = TTLCache()
+    client = SerperAPIClient(session=session, cache=cache)
+    
+    client.get_organic_search_results("capital of France")
+    client.get_knowledge_graph("capital of France")
+    client.get_related_searches("capital of France")
+    
+    assert len(session.calls) == 1
+    assert cache.stats()["misses"] == 0
+
+def test_async_search_many_goes_through_response_cache():
+    calls = []
+    
+    async def handler(request):
+        calls.append(json.loads(request.content)["q"])
+        return httpx.Response(200, json={"organic": [{"title": "Paris"}]})
+    
+    async def run():
+        http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        cache = TTLCache()
+        async with AsyncSerperAPIClient(client=http_client, cache=cache) as client:
+            await client.search_many(["capital of France"])
+            results = await client.search_many(["Capital of  France"])
+        await http_client.aclose()
+        return results, cache
+    
+    results, cache = asyncio.run(run())
+    
+    assert results == [{"organic": [{"title": "Paris"}]}]
+    assert calls == ["capital of France"]
+    assert cache.stats()["hits"] == 1
+
+
+def test_repeat_queries_are_served_from_cache():
+    """Normalized repeats of a query should not hit the network again."""
+    session = FakeSession()
+    cache = TTLCache()
+    client = SerperAPIClient(session=session, cache=cache)
+    
+    client.get_organic_search_results("Capital of  France")
+    client.get_organic_search_results("capital of france ")
+    client.get_organic_search_results("capital of france", 5)
+    
+    assert len(session.calls) == 2
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+class RateLimitedSession(FakeSession):
+    """Answers 429 for the first key and succeeds for the others."""
+    
+    def post(self, url, headers=None, json=None, timeout=None):
+        self.calls.append({"url": url, "json": json, "key": headers["X-API-KEY"]})
+        if headers["X-API-KEY"] == "key-1":
+            return FakeResponse({}, status_code=429, headers={"Retry-After": "30"})
+        return FakeResponse(self.payload)
+
+def test_rate_limited_key_spills_to_next_key(monkeypatch):
+    failover = APIFailover()
+    failover.api_configs = {"search": [{"name": "serper", "keys": ["key-1", "key-2"], "available": True, "priority": 1}]}
+    monkeypatch.setattr(serper_client, "api_failover", failover)
+    session = RateLimitedSession()
+    client = SerperAPIClient(session=session, cache=TTLCache())
+    
+    assert client.search("capital of France") == {"organic": [{"title": "Paris"}]}
+    assert [call["key"] for call in session.calls] == ["key-1", "key-2"]
+    
+    pool = failover.get_key_pool("serper")
+    assert pool.stats()["parked"] == 1
+    assert pool.parked_until["key-1"] - time.time() > 20
@@ -0,0 +1,73 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from agents.stage_scheduler import Stage, StageScheduler, StageError
+
+def sleeper(value, delay=0.05):
+    def run(**kwargs):
+        time.sleep(delay)
+        return value
+    return run
+
+def test_independent_stages_overlap():
+    scheduler = StageScheduler(ThreadPoolExecutor(max_workers=4))
+    stages = [
+        Stage("a", sleeper(1)),
+        Stage("b", sleeper(2)),
+        Stage("c", sleeper(3)),
+        Stage("total", lambda a, b, c: a + b + c, inputs=("a", "b", "c"))
+    ]
+    
+    started = time.perf_counter()
+    results = scheduler.run(stages)
+    elapsed = time.perf_counter() - started
+    
+    assert results.outputs["total"] == 6
+    assert elapsed < 0.12  # critical path, not the 0.15s sum
+    assert set(results.timings) == {"a", "b", "c", "total"}
+
+def test_optional_stage_failure_uses_default():
+    scheduler = StageScheduler(ThreadPoolExecutor(max_workers=2))
+    
+    def broken():
+        raise RuntimeError("upstream down")
+    
+    stages = [
+        Stage("context", broken, required=False, default=[]),
+        Stage("answer", lambda context: len(context), inputs=("context",))
+    ]
+    results = scheduler.run(stages)
+    
+    assert results.outputs["answer"] == 0
+    assert "context" in results.errors
+
+def test_required_stage_failure_raises():
+    scheduler = StageScheduler(ThreadPoolExecutor(max_workers=2))
+    
+    def broken():
+        raise RuntimeError("llm down")
+    
+    with pytest.raises(StageError) as excinfo:
+        scheduler.run([Stage("primary", broken)])
+    assert excinfo.value.stage == "primary"
+
+def test_required_stage_failure_keeps_outputs_of_running_stages():
+    scheduler = StageScheduler(ThreadPoolExecutor(max_workers=2))
+    
+    def broken():
+        raise RuntimeError("llm down")
+    
+    with pytest.raises(StageError) as excinfo:
+        scheduler.run([Stage("primary", broken), Stage("ticket", sleeper("AI-1"), required=False)])
+    assert excinfo.value.results.outputs["ticket"] == "AI-1"
+    assert "primary" in excinfo.value.results.errors
+
+def test_cycles_are_rejected():
+    scheduler = StageScheduler(ThreadPoolExecutor(max_workers=2))
+    stages = [
+        Stage("a", lambda b: b, inputs=("b",)),
+        Stage("b", lambda a: a, inputs=("a",))
+    ]
+    
+    with pytest.raises(ValueError):
+        scheduler.run(stages)
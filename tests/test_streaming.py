@@ -0,0 +1,207 @@
+import asyncio
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from agents.api_failover import APIFailover
+from agents.llm_engine import LLMExecutionEngine, LLMProvider
+from agents.query_complexity import QueryComplexityClassifier
+from agents.rate_limiter import RateLimiter
+from agents.serper_enhanced_search import SerperEnhancedSearchAgent
+from agents.personalization import PersonalizationEngine
+from agents.streaming import astream, forward_tokens, trailing_events, token_event
+from utils.cache import TTLCache
+
+class FakeEvent:
+    def __init__(self, content, event="RunResponseContent"):
+        self.content = content
+        self.event = event
+
+class FakeStreamingAgent:
+    def __init__(self, chunks=("Par", "is"), delay=0.0, error=None, fail_after=None):
+        self.chunks = list(chunks)
+        self.delay = delay
+        self.error = error
+        self.fail_after = fail_after
+        self.prompts = []
+    
+    def run(self, prompt, stream=False):
+        assert stream
+        self.prompts.append(prompt)
+        if self.error and self.fail_after is None:
+            raise Exception(self.error)
+        return self._events()
+    
+    def _events(self):
+        yield FakeEvent(None, event="RunStarted")
+        for i, chunk in enumerate(self.chunks):
+            if self.fail_after is not None and i == self.fail_after:
+                raise Exception(self.error)
+            time.sleep(self.delay)
+            yield FakeEvent(chunk)
+        yield FakeEvent("".join(self.chunks), event="RunCompleted")
+
+class FakeFailover:
+    def __init__(self):
+        self.failures = []
+        self.successes = []
+    
+    def get_available_apis(self, api_type):
+        return [{"name": "openrouter"}, {"name": "openai"}]
+    
+    def claim_probe(self, api_name):
+        return True
+    
+    def release_probe(self, api_name):
+        pass
+    
+    def report_failure(self, api_name, latency=None):
+        self.failures.append(api_name)
+    
+    def report_success(self, api_name, latency=None):
+        self.successes.append(api_name)
+
+def make_engine(primary, fallback=None, **kwargs):
+    kwargs.setdefault("use_cache", False)
+    return LLMExecutionEngine(
+        [LLMProvider("openrouter", primary), LLMProvider("openai", fallback or FakeStreamingAgent(("fallback",)))],
+        failover=FakeFailover(),
+        executor=ThreadPoolExecutor(max_workers=4),
+        rate_limiter=RateLimiter(),
+        **kwargs
+    )
+
+def drain(stream):
+    """Collect a generator's items and its return value."""
+    items = []
+    while True:
+        try:
+            items.append(next(stream))
+        except StopIteration as stop:
+            return items, stop.value
+
+def test_engine_streams_content_deltas_and_returns_result():
+    engine = make_engine(FakeStreamingAgent())
+    
+    chunks, result = drain(engine.stream("capital of France"))
+    
+    assert chunks == ["Par", "is"]
+    assert result.content == "Paris"
+    assert result.provider == "openrouter"
+    assert engine.failover.successes == ["openrouter"]
+    assert engine.stats()["streaming"]["streams"] == 1
+
+def test_engine_fails_over_before_first_token():
+    engine = make_engine(FakeStreamingAgent(error="boom"))
+    
+    chunks, result = drain(engine.stream("capital of France"))
+    
+    assert chunks == ["fallback"]
+    assert result.used_fallback is True
+    assert engine.failover.failures == ["openrouter"]
+
+def test_engine_does_not_fail_over_mid_stream():
+    fallback = FakeStreamingAgent(("fallback",))
+    engine = make_engine(FakeStreamingAgent(chunks=("Par", "is"), error="boom", fail_after=1), fallback)
+    stream = engine.stream("capital of France")
+    
+    assert next(stream) == "Par"
+    with pytest.raises(Exception, match="mid-stream"):
+        next(stream)
+    assert fallback.prompts == []
+
+def test_abandoned_stream_releases_probe_slot():
+    failover = APIFailover()
+    failover.api_configs = {"llm": [{"name": "openrouter", "key": "k1", "available": True, "priority": 1}]}
+    failover.exploration_rate = 0.0
+    for _ in range(failover.max_failures):
+        failover.report_failure("openrouter")
+    failover.health["openrouter"].open_until = time.time() - 1
+    engine = LLMExecutionEngine(
+        [LLMProvider("openrouter", FakeStreamingAgent())],
+        failover=failover,
+        executor=ThreadPoolExecutor(max_workers=1),
+        rate_limiter=RateLimiter(),
+        use_cache=False
+    )
+    stream = engine.stream("capital of France")
+    
+    assert next(stream) == "Par"
+    assert failover.claim_probe("openrouter") is False
+    stream.close()
+    
+    # Neither a success nor a failure was reported, but the next request may probe right away
+    assert failover.health["openrouter"].state == "half_open"
+    assert failover.claim_probe("openrouter") is True
+
+def test_engine_streams_cached_completion_in_one_chunk():
+    primary = FakeStreamingAgent()
+    engine = make_engine(primary, use_cache=True, cache=TTLCache(ttl=60))
+    drain(engine.stream("capital of France"))
+    
+    chunks, result = drain(engine.stream("capital of France"))
+    
+    assert chunks == ["Paris"]
+    assert result.cached is True
+    assert len(primary.prompts) == 1
+
+def test_first_token_arrives_before_the_answer_completes():
+    engine = make_engine(FakeStreamingAgent(chunks=["word "] * 10, delay=0.02))
+    
+    started = time.perf_counter()
+    stream = engine.stream("long answer")
+    next(stream)
+    first_token = time.perf_counter() - started
+    drain(stream)
+    total = time.perf_counter() - started
+    
+    assert first_token < total / 4
+
+def make_serper_agent(engine):
+    agent = SerperEnhancedSearchAgent.__new__(SerperEnhancedSearchAgent)
+    agent.serper_client = None
+    agent.lexical_index = None
+    agent.engine = engine
+    agent.complexity = QueryComplexityClassifier()
+    return agent
+
+def test_serper_agent_stream_ends_with_verification_and_result():
+    agent = make_serper_agent(make_engine(FakeStreamingAgent()))
+    
+    events = list(agent.search_stream("capital of France"))
+    
+    assert [e["event"] for e in events] == ["token", "token", "verification", "result"]
+    assert events[-2]["confidence"] == 85
+    assert events[-1]["result"]["results"] == "Paris"
+
+def test_forward_tokens_captures_inner_result():
+    inner = iter([token_event("a"), token_event("b")] + list(trailing_events({"results": "ab", "confidence": 90})))
+    
+    events, result = drain(forward_tokens(inner))
+    
+    assert [e["content"] for e in events] == ["a", "b"]
+    assert result == {"results": "ab", "confidence": 90}
+
+def test_forward_tokens_requires_a_result():
+    with pytest.raises(Exception, match="without a result"):
+        drain(forward_tokens(iter([token_event("a")])))
+
+def test_personalization_stream_falls_back_to_original_results():
+    personalization = PersonalizationEngine.__new__(PersonalizationEngine)
+    personalization.engine = make_engine(FakeStreamingAgent(error="boom"), FakeStreamingAgent(error="boom"))
+    personalization.user_profiles = {"user-1": {"preferred_tone": "casual"}}
+    
+    events, content = drain(personalization.personalize_results_stream("user-1", "original", "query"))
+    
+    assert events == [token_event("original")]
+    assert content == "original"
+
+def test_astream_iterates_blocking_stream_from_event_loop():
+    def slow():
+        for i in range(3):
+            time.sleep(0.01)
+            yield i
+    
+    async def collect():
+        return [item async for item in astream(slow())]
+    
+    assert asyncio.run(collect()) == [0, 1, 2]
@@ -0,0 +1,202 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+import logging
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+class SQLiteCacheBackend:
+    """Persistent cache tier storing JSON values with expiry times in SQLite."""
+    
+    def __init__(self, path: str, table: str = "cache"):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+    
+    def get(self, key: str) -> Optional[tuple]:
+        """
+        Read an entry.
+        
+        Args:
+            key (str): Cache key
+        
+        Returns:
+            Optional[tuple]: (value, expires_at) or None if missing or expired
+        """
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return json.loads(row[0]), row[1]
+    
+    def set(self, key: str, value: Any, expires_at: float):
+        """Write an entry that expires at the given wall-clock time."""
+        payload = json.dumps(value)
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, payload, expires_at)
+            )
+            self._conn.commit()
+    
+    def delete(self, key: str):
+        """Remove an entry."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+    
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+    
+    def purge_expired(self) -> int:
+        """
+        Remove expired entries.
+        
+        Returns:
+            int: Number of entries removed
+        """
+        with self._lock:
+            cursor = self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (time.time(),))
+            self._conn.commit()
+            return cursor.rowcount
+
+class TTLCache:
+    """Thread-safe in-memory LRU cache with per-entry TTL and an optional persistent tier."""
+    
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600, backend: SQLiteCacheBackend = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "backend_hits": 0,
+            "evictions": 0,
+            "expirations": 0
+        }
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Look up a key, falling back to the persistent tier on a memory miss.
+        
+        Args:
+            key (str): Cache key
+            default (Any): Value returned on a miss
+        
+        Returns:
+            Any: Cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > time.time():
+                    self._entries.move_to_end(key)
+                    self._stats["hits"] += 1
+                    return entry[1]
+                del self._entries[key]
+                self._stats["expirations"] += 1
+        
+        if self.backend is not None:
+            try:
+                stored = self.backend.get(key)
+            except Exception as e:
+                logger.warning(f"Persistent cache read failed: {str(e)}")
+                stored = None
+            if stored is not None:
+                value, expires_at = stored
+                with self._lock:
+                    self._store(key, value, expires_at)
+                    self._stats["hits"] += 1
+                    self._stats["backend_hits"] += 1
+                return value
+        
+        with self._lock:
+            self._stats["misses"] += 1
+        return default
+    
+    def set(self, key: str, value: Any, ttl: float = None):
+        """
+        Store a value.
+        
+        Args:
+            key (str): Cache key
+            value (Any): JSON-serialisable value
+            ttl (float): Seconds to keep the entry, defaults to the cache TTL
+        """
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._store(key, value, expires_at)
+        
+        if self.backend is not None:
+            try:
+                self.backend.set(key, value, expires_at)
+            except Exception as e:
+                logger.warning(f"Persistent cache write failed: {str(e)}")
+    
+    def _store(self, key: str, value: Any, expires_at: float):
+        """Insert into the memory tier and evict least recently used entries. Caller holds the lock."""
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+    
+    def delete(self, key: str):
+        """Remove a key from both tiers."""
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(key)
+    
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._entries.clear()
+        if self.backend is not None:
+            self.backend.clear()
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def stats(self) -> dict:
+        """
+        Get cache counters.
+        
+        Returns:
+            dict: Hits, misses, evictions, expirations, size and hit rate
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["persistent"] = self.backend is not None
+        return stats